@@ -0,0 +1,144 @@
+# areas/availability.py
+"""
+Motor de disponibilidad de áreas comunes.
+
+Las reservas activas de un rango de días se cargan en una sola consulta y se
+guardan por área como intervalos ocupados ordenados y fusionados (disjuntos),
+de modo que consultar solapamientos es una búsqueda binaria (bisect) y los
+huecos libres entre opening_time y closing_time salen de un único recorrido.
+La exclusión definitiva contra reservas concurrentes la garantiza la
+restricción reservation_no_overlap en PostgreSQL.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import Reservation
+
+ACTIVE_STATUSES = ('PENDING', 'CONFIRMED')
+
+
+class IntervalSet:
+    """Intervalos semiabiertos [inicio, fin) ordenados y fusionados"""
+
+    def __init__(self, intervalos=()):
+        self.inicios, self.fines = [], []
+        for inicio, fin in sorted(intervalos):
+            if self.fines and inicio <= self.fines[-1]:
+                self.fines[-1] = max(self.fines[-1], fin)
+            else:
+                self.inicios.append(inicio)
+                self.fines.append(fin)
+
+    def __iter__(self):
+        return zip(self.inicios, self.fines)
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def overlaps(self, inicio, fin):
+        """True si [inicio, fin) se solapa con algún intervalo ocupado"""
+        i = bisect_right(self.inicios, inicio)
+        if i and self.fines[i - 1] > inicio:
+            return True
+        return i < len(self.inicios) and self.inicios[i] < fin
+
+    def free(self, desde, hasta, minimo=None):
+        """Huecos libres dentro de [desde, hasta) de al menos `minimo` (timedelta)"""
+        huecos, cursor = [], desde
+        i = bisect_right(self.fines, desde)  # Primer intervalo que termina después de `desde`
+        while i < len(self.inicios) and self.inicios[i] < hasta:
+            if self.inicios[i] > cursor:
+                huecos.append((cursor, self.inicios[i]))
+            cursor = max(cursor, self.fines[i])
+            i += 1
+        if cursor < hasta:
+            huecos.append((cursor, hasta))
+        return [(a, b) for a, b in huecos if b > a and (minimo is None or b - a >= minimo)]
+
+
+def conflicts(area_id, inicio, fin, exclude_id=None):
+    """Consulta puntual (EXISTS) de solapamiento para validar una reserva"""
+    reservas = Reservation.objects.filter(
+        area_id=area_id,
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=fin,
+        end_time__gt=inicio,
+    )
+    if exclude_id is not None:
+        reservas = reservas.exclude(pk=exclude_id)
+    return reservas.exists()
+
+
+def opening_window(area, dia, tz=None):
+    """(apertura, cierre) del área en el día dado; si cierra después de medianoche, el cierre es al día siguiente"""
+    tz = tz or timezone.get_current_timezone()
+    apertura = timezone.make_aware(datetime.combine(dia, area.opening_time), tz)
+    cierre = timezone.make_aware(datetime.combine(dia, area.closing_time), tz)
+    if cierre <= apertura:
+        cierre += timedelta(days=1)
+    return apertura, cierre
+
+
+def load_occupancy(areas, desde, hasta):
+    """{area_id: IntervalSet} con las reservas activas que tocan [desde, hasta), en una consulta"""
+    por_area = defaultdict(list)
+    reservas = Reservation.objects.filter(
+        area__in=areas,
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=hasta,
+        end_time__gt=desde,
+    ).values_list('area_id', 'start_time', 'end_time')
+    for area_id, inicio, fin in reservas:
+        por_area[area_id].append((inicio, fin))
+    return {area.pk: IntervalSet(por_area.get(area.pk, ())) for area in areas}
+
+
+def day_availability(area, dia, ocupacion=None, duracion=None):
+    """Ocupados y libres del área en un día, dentro de su horario"""
+    apertura, cierre = opening_window(area, dia)
+    if ocupacion is None:
+        ocupacion = load_occupancy([area], apertura, cierre)[area.pk]
+    ocupados = [
+        (max(inicio, apertura), min(fin, cierre))
+        for inicio, fin in ocupacion if inicio < cierre and fin > apertura
+    ]
+    libres = ocupacion.free(apertura, cierre, duracion) if area.is_available else []
+    return {
+        'opening': apertura,
+        'closing': cierre,
+        'reserved': ocupados,
+        'free': libres,
+    }
+
+
+def find_slots(areas, primer_dia, dias=1, duracion=None):
+    """
+    Huecos de al menos `duracion` en cada área y cada día de
+    [primer_dia, primer_dia + dias). Una sola consulta para todas las áreas.
+    """
+    areas = [area for area in areas if area.is_available]
+    if not areas:
+        return []
+    ventanas = {
+        (area.pk, offset): opening_window(area, primer_dia + timedelta(days=offset))
+        for area in areas for offset in range(dias)
+    }
+    desde = min(apertura for apertura, _ in ventanas.values())
+    hasta = max(cierre for _, cierre in ventanas.values())
+    ocupacion = load_occupancy(areas, desde, hasta)
+
+    resultado = []
+    for area in areas:
+        for offset in range(dias):
+            apertura, cierre = ventanas[(area.pk, offset)]
+            libres = ocupacion[area.pk].free(apertura, cierre, duracion)
+            if libres:
+                resultado.append({
+                    'area': area,
+                    'date': primer_dia + timedelta(days=offset),
+                    'free': libres,
+                })
+    return resultado
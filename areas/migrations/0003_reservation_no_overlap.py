@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:38
+
+import areas.models
+import django.contrib.postgres.constraints
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def verificar_solapamientos(apps, schema_editor):
+    """Aborta con un mensaje claro si ya hay reservas activas solapadas"""
+    Reservation = apps.get_model('areas', 'Reservation')
+    activas = Reservation.objects.filter(status__in=['PENDING', 'CONFIRMED'])
+    solapadas = activas.filter(Exists(activas.filter(
+        area=OuterRef('area'),
+        id__lt=OuterRef('id'),
+        start_time__lt=OuterRef('end_time'),
+        end_time__gt=OuterRef('start_time'),
+    ))).values_list('id', flat=True)[:50]
+    ids = list(solapadas)
+    if ids:
+        raise RuntimeError(
+            'Hay reservas activas solapadas; cancélelas antes de migrar. Ids: '
+            + ', '.join(map(str, ids))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(verificar_solapamientos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['PENDING', 'CONFIRMED'])), expressions=[('area', '='), (areas.models.TsTzRange('start_time', 'end_time'), '&&')], name='reservation_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0003_reservation_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commonarea',
+            index=models.Index(fields=['is_available', 'name'], name='commonarea_available_idx'),
+        ),
+    ]
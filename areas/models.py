@@ -1,9 +1,18 @@
 # areas/models.py
 from django.db import models
+from django.db.models import Func, Q
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
 from django.core.exceptions import ValidationError
 from users.models import Usuario
 
 
+class TsTzRange(Func):
+    """tstzrange(inicio, fin) semiabierto '[)', para la restricción de exclusión"""
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
 class CommonArea(models.Model):
     """Áreas comunes del condominio"""
     name = models.CharField(max_length=100)  # Ej: Churrasquera, Salón de Eventos
@@ -19,6 +28,9 @@ class CommonArea(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['is_available', 'name'], name='commonarea_available_idx'),
+        ]
         verbose_name = "Área Común"
         verbose_name_plural = "Áreas Comunes"
     
@@ -48,6 +60,17 @@ class Reservation(models.Model):
     
     class Meta:
         ordering = ['-start_time']
+        constraints = [
+            # Dos reservas activas de la misma área no pueden solaparse (requiere btree_gist)
+            ExclusionConstraint(
+                name='reservation_no_overlap',
+                expressions=[
+                    ('area', RangeOperators.EQUAL),
+                    (TsTzRange('start_time', 'end_time'), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(status__in=['PENDING', 'CONFIRMED']),
+            ),
+        ]
         verbose_name = "Reserva"
         verbose_name_plural = "Reservas"
     
@@ -60,15 +83,8 @@ class Reservation(models.Model):
             raise ValidationError("La hora de inicio debe ser anterior a la hora de fin")
         
         # Validar que no haya solapamiento de reservas
-        overlapping = Reservation.objects.filter(
-            area=self.area,
-            status__in=['PENDING', 'CONFIRMED']
-        ).exclude(id=self.id).filter(
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time
-        )
-        
-        if overlapping.exists():
+        from .availability import conflicts
+        if conflicts(self.area_id, self.start_time, self.end_time, exclude_id=self.id):
             raise ValidationError("Ya existe una reserva en ese horario para esta área")
     
     def save(self, *args, **kwargs):
@@ -1,17 +1,20 @@
 from rest_framework import serializers
 from .models import CommonArea, Reservation
+from .availability import conflicts
 from users.serializers import UsuarioSerializer
+from mediastore.fields import ImageVariantsField
 
 
 class CommonAreaSerializer(serializers.ModelSerializer):
     """Serializer para CommonArea"""
     active_reservations_count = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = CommonArea
         fields = [
             'id', 'name', 'description', 'capacity', 'cost_per_hour',
-            'is_available', 'opening_time', 'closing_time', 'image',
+            'is_available', 'opening_time', 'closing_time', 'image', 'image_variants',
             'active_reservations_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -75,21 +78,27 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         if data['start_time'] >= data['end_time']:
             raise serializers.ValidationError("La hora de inicio debe ser antes que la hora de fin")
         
-        # Verificar solapamiento
-        overlapping = Reservation.objects.filter(
-            area=data['area'],
-            status__in=['PENDING', 'CONFIRMED']
-        ).filter(
-            start_time__lt=data['end_time'],
-            end_time__gt=data['start_time']
-        )
-        
-        if overlapping.exists():
+        # Verificar solapamiento (la restricción reservation_no_overlap cubre las carreras)
+        if conflicts(data['area'].pk, data['start_time'], data['end_time']):
             raise serializers.ValidationError("Ya existe una reserva en ese horario para esta área")
         
         return data
 
 
+class SlotSearchSerializer(serializers.Serializer):
+    """Parámetros para buscar huecos libres en varias áreas"""
+    date = serializers.DateField()
+    days = serializers.IntegerField(min_value=1, max_value=14, default=1)
+    duration = serializers.IntegerField(min_value=15, max_value=24 * 60, help_text='Minutos')
+    areas = serializers.CharField(required=False, help_text='Ids separados por coma')
+
+    def validate_areas(self, value):
+        try:
+            return [int(area_id) for area_id in value.split(',') if area_id.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Use ids separados por coma, p. ej. 1,2,3")
+
+
 class AvailabilityCheckSerializer(serializers.Serializer):
     """Serializer para verificar disponibilidad"""
     area_id = serializers.IntegerField()
@@ -1,3 +1,70 @@
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import Usuario
+from .models import CommonArea, Reservation
+
+
+class ReservationOverlapTests(TestCase):
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(username='adm', email='adm@x.com', password='p', rol='ADMIN')
+        self.area = CommonArea.objects.create(name='Salón', capacity=20)
+        self.inicio = timezone.now() + timedelta(days=1)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.admin)
+
+    def _reserva(self, status='PENDING', horas=(0, 2)):
+        return Reservation.objects.create(
+            area=self.area, user=self.admin, status=status,
+            start_time=self.inicio + timedelta(hours=horas[0]),
+            end_time=self.inicio + timedelta(hours=horas[1]),
+        )
+
+    def test_confirmar_con_solapamiento_responde_400(self):
+        reserva = self._reserva()
+        error = IntegrityError('conflicting key value violates exclusion constraint "reservation_no_overlap"')
+        for accion in ('confirm', 'cancel', 'confirm_payment'):
+            with self.subTest(accion=accion), mock.patch.object(Reservation, 'save', side_effect=error):
+                respuesta = self.cliente.post(f'/api/areas/reservations/{reserva.pk}/{accion}/')
+                self.assertEqual(respuesta.status_code, 400)
+
+    @skipUnless(connection.vendor == 'postgresql', 'reservation_no_overlap es una restricción de PostgreSQL')
+    def test_crear_reserva_solapada_responde_400(self):
+        self._reserva()
+        respuesta = self.cliente.post('/api/areas/reservations/', {
+            'area': self.area.pk,
+            'start_time': (self.inicio + timedelta(hours=1)).isoformat(),
+            'end_time': (self.inicio + timedelta(hours=3)).isoformat(),
+        })
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ReservationScopeTests(TestCase):
+
+    def setUp(self):
+        self.residente = Usuario.objects.create_user(username='res', email='res@x.com', password='p', rol='RESIDENTE')
+        self.vecino = Usuario.objects.create_user(username='vec', email='vec@x.com', password='p', rol='RESIDENTE')
+        area = CommonArea.objects.create(name='Salón', capacity=20)
+        inicio = timezone.now() + timedelta(days=1)
+        self.propia, self.ajena = [
+            Reservation.objects.create(
+                area=area, user=usuario,
+                start_time=inicio + timedelta(hours=horas), end_time=inicio + timedelta(hours=horas + 1),
+            )
+            for usuario, horas in ((self.residente, 0), (self.vecino, 2))
+        ]
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.residente)
 
-# Create your tests here.
+    def test_residente_solo_ve_sus_reservas(self):
+        respuesta = self.cliente.get('/api/areas/reservations/')
+        filas = respuesta.data['results'] if isinstance(respuesta.data, dict) else respuesta.data
+        self.assertEqual([fila['id'] for fila in filas], [self.propia.pk])
+        self.assertEqual(self.cliente.get('/api/areas/reservations/upcoming/').data[0]['id'], self.propia.pk)
+        self.assertEqual(self.cliente.post(f'/api/areas/reservations/{self.ajena.pk}/confirm/').status_code, 404)
@@ -1,35 +1,77 @@
-from rest_framework import viewsets, status, filters
+from contextlib import contextmanager
+
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Q, Count
+from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import CommonArea, Reservation
 from .serializers import (
     CommonAreaSerializer, CommonAreaCreateSerializer,
     ReservationSerializer, ReservationCreateSerializer,
-    AvailabilityCheckSerializer
+    AvailabilityCheckSerializer, SlotSearchSerializer
 )
+from . import availability
 from users.permissions import IsAdmin, IsAdminOrReadOnly, CanManageAreas
+from users.scoping import UnitScopedQuerysetMixin
+from smartcondominioia.metrics import InstrumentedViewMixin
+from smartcondominioia.pagination import BoundedListMixin
+from smartcondominioia.filters import TypedQueryFilter
+
+
+def _slot(inicio, fin):
+    """Horario en la zona local, como en el resto de la API de áreas"""
+    return {
+        'start': timezone.localtime(inicio).strftime('%H:%M'),
+        'end': timezone.localtime(fin).strftime('%H:%M'),
+        'start_time': inicio,
+        'end_time': fin,
+    }
+
+
+@contextmanager
+def _sin_solapamiento():
+    """Traduce la violación de reservation_no_overlap (reserva concurrente) a un 400"""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if 'reservation_no_overlap' not in str(exc):
+            raise
+        raise ValidationError({"non_field_errors": ["Ya existe una reserva en ese horario para esta área"]})
+
+
+def _guardar_reserva(reserva_o_serializer, **kwargs):
+    """Guarda una reserva (o su serializer) respetando reservation_no_overlap"""
+    with _sin_solapamiento():
+        reserva_o_serializer.save(**kwargs)
 
 
-class CommonAreaViewSet(viewsets.ModelViewSet):
+class CommonAreaViewSet(InstrumentedViewMixin, BoundedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de áreas comunes
     Endpoints:
-    - GET /areas/ - Listar todas las áreas
+    - GET /areas/ - Listar todas las áreas (filtro: is_available)
     - POST /areas/ - Crear nueva área
     - GET /areas/{id}/ - Obtener detalle de área
     - PUT /areas/{id}/ - Actualizar área
     - DELETE /areas/{id}/ - Eliminar área
-    - GET /areas/available/ - Listar áreas disponibles
-    - POST /areas/{id}/check_availability/ - Verificar disponibilidad
+    - GET /areas/available/ - Listar áreas disponibles (paginado; ?stream=true para NDJSON completo)
+    - POST /areas/{id}/check_availability/ - Verificar disponibilidad (horarios reservados y libres)
+    - GET /areas/search_slots/?date=YYYY-MM-DD&days=1&duration=120&areas=1,2 - Huecos libres en varias áreas
     """
     queryset = CommonArea.objects.all()
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'cost_per_hour', 'capacity']
+    query_filters = {
+        'is_available': ('is_available', serializers.BooleanField()),
+    }
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -39,9 +81,8 @@ class CommonAreaViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Obtener solo áreas disponibles"""
-        areas = CommonArea.objects.filter(is_available=True)
-        serializer = CommonAreaSerializer(areas, many=True)
-        return Response(serializer.data)
+        areas = self.get_queryset().filter(is_available=True)
+        return self.bounded_list(areas, CommonAreaSerializer)
     
     @action(detail=True, methods=['post'])
     def check_availability(self, request, pk=None):
@@ -63,30 +104,50 @@ class CommonAreaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Obtener reservas del día
-        reservations = Reservation.objects.filter(
-            area=area,
-            status__in=['PENDING', 'CONFIRMED'],
-            start_time__date=check_date
-        ).order_by('start_time')
+        duracion = request.data.get('duration')
+        try:
+            duracion = timedelta(minutes=int(duracion)) if duracion else None
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "El parámetro 'duration' debe ser un número de minutos"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Generar slots disponibles (simplificado)
-        reserved_slots = [
-            {
-                'start': res.start_time.strftime('%H:%M'),
-                'end': res.end_time.strftime('%H:%M')
-            } for res in reservations
-        ]
+        dia = availability.day_availability(area, check_date, duracion=duracion)
         
         return Response({
             'area_id': area.id,
             'date': date_str,
             'is_available': area.is_available,
-            'reserved_slots': reserved_slots,
+            'reserved_slots': [_slot(inicio, fin) for inicio, fin in dia['reserved']],
+            'free_slots': [_slot(inicio, fin) for inicio, fin in dia['free']],
             'opening_time': area.opening_time.strftime('%H:%M'),
             'closing_time': area.closing_time.strftime('%H:%M')
         })
     
+    @action(detail=False, methods=['get'])
+    def search_slots(self, request):
+        """Buscar en qué áreas hay un hueco de `duration` minutos (una consulta para todas las áreas)"""
+        parametros = SlotSearchSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+        
+        areas = CommonArea.objects.filter(is_available=True)
+        if datos.get('areas'):
+            areas = areas.filter(pk__in=datos['areas'])
+        resultados = availability.find_slots(
+            list(areas), datos['date'], datos['days'], timedelta(minutes=datos['duration'])
+        )
+        
+        return Response([
+            {
+                'area_id': resultado['area'].id,
+                'area_name': resultado['area'].name,
+                'date': resultado['date'],
+                'free_slots': [_slot(inicio, fin) for inicio, fin in resultado['free']],
+            } for resultado in resultados
+        ])
+    
     @action(detail=False, methods=['get'])
     def usage_report(self, request):
         """Reporte de uso de áreas comunes"""
@@ -108,11 +169,11 @@ class CommonAreaViewSet(viewsets.ModelViewSet):
         return Response(report)
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, viewsets.ModelViewSet):
     """
-    ViewSet para gestión de reservas
+    ViewSet para gestión de reservas (RESIDENTE solo ve y gestiona las propias)
     Endpoints:
-    - GET /reservations/ - Listar todas las reservas
+    - GET /reservations/ - Listar reservas
     - POST /reservations/ - Crear nueva reserva
     - GET /reservations/{id}/ - Obtener detalle de reserva
     - PUT /reservations/{id}/ - Actualizar reserva
@@ -123,6 +184,9 @@ class ReservationViewSet(viewsets.ModelViewSet):
     """
     queryset = Reservation.objects.all()
     permission_classes = [CanManageAreas]
+    unit_scope_resource = 'reservas'
+    unit_scope_field = None
+    unit_scope_user_field = 'user_id'
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['area__name', 'user__username']
     ordering_fields = ['start_time', 'created_at']
@@ -134,7 +198,10 @@ class ReservationViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """Asignar usuario actual al crear reserva"""
-        serializer.save(user=self.request.user)
+        _guardar_reserva(serializer, user=self.request.user)
+    
+    def perform_update(self, serializer):
+        _guardar_reserva(serializer)
     
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
@@ -148,7 +215,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
             )
         
         reservation.status = 'CONFIRMED'
-        reservation.save()
+        _guardar_reserva(reservation)
         
         return Response(
             {"message": "Reserva confirmada correctamente"},
@@ -167,7 +234,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
             )
         
         reservation.status = 'CANCELLED'
-        reservation.save()
+        _guardar_reserva(reservation)
         
         return Response(
             {"message": "Reserva cancelada correctamente"},
@@ -179,7 +246,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
         """Confirmar pago de reserva"""
         reservation = self.get_object()
         reservation.payment_confirmed = True
-        reservation.save()
+        _guardar_reserva(reservation)
         
         return Response(
             {"message": "Pago confirmado correctamente"},
@@ -197,7 +264,7 @@ class ReservationViewSet(viewsets.ModelViewSet):
     def upcoming(self, request):
         """Obtener reservas próximas"""
         now = datetime.now()
-        reservations = Reservation.objects.filter(
+        reservations = self.get_queryset().filter(
             start_time__gte=now,
             status__in=['PENDING', 'CONFIRMED']
         ).order_by('start_time')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Announcement, Notification
+from .models import Announcement, BroadcastReadMark, Notification, NotificationReceipt
 
 
 @admin.register(Announcement)
@@ -12,7 +12,24 @@ class AnnouncementAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['title', 'user', 'notification_type', 'is_read', 'created_at']
-    list_filter = ['notification_type', 'is_read', 'created_at']
+    list_display = ['title', 'user', 'audience', 'notification_type', 'is_read', 'created_at']
+    list_filter = ['notification_type', 'audience', 'is_read', 'created_at']
     search_fields = ['title', 'message', 'user__username']
+    list_select_related = ['user']
     date_hierarchy = 'created_at'
+
+
+@admin.register(NotificationReceipt)
+class NotificationReceiptAdmin(admin.ModelAdmin):
+    list_display = ['notification', 'user', 'read_at']
+    search_fields = ['notification__title', 'user__username']
+    list_select_related = ['notification', 'user']
+    raw_id_fields = ['notification', 'user']
+
+
+@admin.register(BroadcastReadMark)
+class BroadcastReadMarkAdmin(admin.ModelAdmin):
+    list_display = ['user', 'last_read_id', 'read_at']
+    search_fields = ['user__username']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CommunicationConfig(AppConfig):
     name = 'communication'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from smartcondominioia import shared_cache  # noqa: F401  (registra el check de la caché)
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min, Count
+
+
+def eliminar_duplicados(apps, schema_editor):
+    """Publicar dos veces un aviso creaba notificaciones repetidas: conserva la primera"""
+    Notification = apps.get_model('communication', 'Notification')
+    repetidas = (
+        Notification.objects.filter(related_announcement__isnull=False)
+        .values('related_announcement', 'user')
+        .annotate(primera=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in list(repetidas):
+        Notification.objects.filter(
+            related_announcement=grupo['related_announcement'], user=grupo['user']
+        ).exclude(id=grupo['primera']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0003_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('related_announcement__isnull', False)), fields=('related_announcement', 'user'), name='notification_unique_announcement_user'),
+        ),
+    ]
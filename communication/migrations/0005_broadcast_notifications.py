@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def colapsar_avisos(apps, schema_editor):
+    """Reemplaza las copias por usuario de cada aviso por una difusión + lecturas"""
+    Notification = apps.get_model('communication', 'Notification')
+    NotificationReceipt = apps.get_model('communication', 'NotificationReceipt')
+    avisos = (
+        Notification.objects.filter(related_announcement__isnull=False, user__isnull=False)
+        .order_by().values_list('related_announcement_id', flat=True).distinct()
+    )
+    for anuncio_id in list(avisos):
+        copias = Notification.objects.filter(related_announcement_id=anuncio_id, user__isnull=False)
+        primera = copias.order_by('created_at', 'id').first()
+        difusion = Notification.objects.create(
+            audience='ALL',
+            title=primera.title,
+            message=primera.message,
+            notification_type=primera.notification_type,
+            link=primera.link,
+            related_announcement_id=anuncio_id,
+        )
+        Notification.objects.filter(pk=difusion.pk).update(created_at=primera.created_at)
+        NotificationReceipt.objects.bulk_create([
+            NotificationReceipt(notification=difusion, user_id=user_id, read_at=read_at or primera.created_at)
+            for user_id, read_at in copias.filter(is_read=True).values_list('user_id', 'read_at').iterator()
+        ], batch_size=1000)
+        copias.delete()
+
+
+def expandir_difusiones(apps, schema_editor):
+    """Vuelve a una fila por usuario activo de la audiencia (antes de quitar user nulo)"""
+    Notification = apps.get_model('communication', 'Notification')
+    NotificationReceipt = apps.get_model('communication', 'NotificationReceipt')
+    Usuario = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    for difusion in Notification.objects.filter(user__isnull=True).iterator():
+        usuarios = Usuario.objects.filter(is_active=True)
+        if difusion.audience != 'ALL':
+            usuarios = usuarios.filter(rol=difusion.audience)
+        leidas = dict(
+            NotificationReceipt.objects.filter(notification=difusion).values_list('user_id', 'read_at')
+        )
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                title=difusion.title,
+                message=difusion.message,
+                notification_type=difusion.notification_type,
+                link=difusion.link,
+                related_announcement_id=difusion.related_announcement_id,
+                is_read=user_id in leidas,
+                read_at=leidas.get(user_id),
+            ) for user_id in usuarios.values_list('id', flat=True).iterator()
+        ], batch_size=1000)
+        difusion.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0004_notification_unique_announcement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Lectura de Notificación',
+                'verbose_name_plural': 'Lecturas de Notificaciones',
+            },
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='audience',
+            field=models.CharField(blank=True, choices=[('ALL', 'Todos'), ('ADMIN', 'Administrador'), ('RESIDENTE', 'Residente'), ('SEGURIDAD', 'Seguridad'), ('MANTENIMIENTO', 'Mantenimiento')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['audience', '-created_at', '-id'], name='notification_broadcast_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('related_announcement__isnull', False), ('user__isnull', True)), fields=('related_announcement',), name='notification_unique_announcement_broadcast'),
+        ),
+        migrations.AddField(
+            model_name='notificationreceipt',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='communication.notification'),
+        ),
+        migrations.AddField(
+            model_name='notificationreceipt',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_receipts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreceipt',
+            constraint=models.UniqueConstraint(fields=('user', 'notification'), name='receipt_unique_user_notification'),
+        ),
+        migrations.RunPython(colapsar_avisos, expandir_difusiones),
+    ]
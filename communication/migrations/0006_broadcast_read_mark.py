@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0005_broadcast_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastReadMark',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='broadcast_read_mark', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_read_id', models.BigIntegerField(default=0)),
+                ('read_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Marca de Lectura de Difusiones',
+                'verbose_name_plural': 'Marcas de Lectura de Difusiones',
+            },
+        ),
+    ]
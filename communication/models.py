@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import BooleanField, Case, Count, Exists, F, Max, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from users.models import Usuario
 
 
@@ -34,8 +37,70 @@ class Announcement(models.Model):
         return f"{self.title} ({self.get_category_display()})"
 
 
+class NotificationQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Directas del usuario + difusiones de su audiencia publicadas desde su alta"""
+        return self.filter(
+            Q(user=user)
+            | Q(user__isnull=True, audience__in=['ALL', user.rol], created_at__gte=user.fecha_creacion)
+        )
+
+    def for_user(self, user):
+        """
+        Notificaciones visibles para el usuario con su estado de lectura en
+        `leida` / `leida_en`: en las directas viene de la fila; una difusión
+        está leída si su id no supera la marca del usuario (BroadcastReadMark)
+        o si tiene su NotificationReceipt.
+        """
+        recibo = NotificationReceipt.objects.filter(notification=OuterRef('pk'), user=user)
+        marca = BroadcastReadMark.objects.filter(user=user)
+        bajo_marca = Q(pk__lte=Subquery(marca.values('last_read_id')[:1]))
+        return self.visible_to(user).annotate(
+            leida=Case(
+                When(Q(user__isnull=True) & (bajo_marca | Exists(recibo)), then=True),
+                When(user__isnull=True, then=False),
+                default=F('is_read'),
+                output_field=BooleanField(),
+            ),
+            leida_en=Case(
+                When(user__isnull=True, then=Coalesce(
+                    Subquery(recibo.values('read_at')[:1]),
+                    Case(When(bajo_marca, then=Subquery(marca.values('read_at')[:1]))),
+                )),
+                default=F('read_at'),
+            ),
+        )
+
+    def unread_for(self, user):
+        return self.for_user(user).filter(leida=False)
+
+    def mark_all_read(self, user):
+        """
+        Marca como leídas todas las notificaciones visibles del usuario; retorna cuántas.
+        Las difusiones no generan una fila por lectura: se avanza la marca del
+        usuario hasta la última y se borran los recibos que quedan cubiertos.
+        """
+        ahora = timezone.now()
+        with transaction.atomic():
+            directas = self.filter(user=user, is_read=False).update(is_read=True, read_at=ahora)
+            pendientes = self.unread_for(user).filter(user__isnull=True).aggregate(
+                cantidad=Count('id'), ultima=Max('id')
+            )
+            if pendientes['ultima'] is not None:
+                BroadcastReadMark.objects.update_or_create(
+                    user=user, defaults={'last_read_id': pendientes['ultima'], 'read_at': ahora}
+                )
+                NotificationReceipt.objects.filter(user=user, notification_id__lte=pendientes['ultima']).delete()
+        return directas + pendientes['cantidad']
+
+
 class Notification(models.Model):
-    """Notificaciones push para usuarios"""
+    """
+    Notificaciones push para usuarios.
+    Con `user` vacío es una difusión: se guarda una sola vez para toda la
+    audiencia; la lectura de cada usuario es su BroadcastReadMark (marcar todas)
+    o un NotificationReceipt (lecturas sueltas más nuevas que la marca).
+    """
     NOTIFICATION_TYPE_CHOICES = (
         ('INFO', 'Información'),
         ('WARNING', 'Advertencia'),
@@ -47,7 +112,10 @@ class Notification(models.Model):
         ('UNKNOWN_PERSON', 'Persona Desconocida'),
     )
     
-    user = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='notifications')
+    AUDIENCE_CHOICES = (('ALL', 'Todos'),) + Usuario.ROLES
+    
+    user = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='notifications', null=True, blank=True)
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, blank=True)  # Solo difusiones
     title = models.CharField(max_length=200)
     message = models.TextField()
     notification_type = models.CharField(max_length=30, choices=NOTIFICATION_TYPE_CHOICES, default='INFO')
@@ -63,17 +131,85 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(blank=True, null=True)
     
+    objects = NotificationQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='notification_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+            models.Index(
+                fields=['audience', '-created_at', '-id'], name='notification_broadcast_idx',
+                condition=Q(user__isnull=True)
+            ),
+        ]
+        constraints = [
+            # Una notificación por usuario y aviso: publicar dos veces no duplica
+            models.UniqueConstraint(
+                fields=['related_announcement', 'user'],
+                condition=Q(related_announcement__isnull=False),
+                name='notification_unique_announcement_user',
+            ),
+            models.UniqueConstraint(
+                fields=['related_announcement'],
+                condition=Q(related_announcement__isnull=False, user__isnull=True),
+                name='notification_unique_announcement_broadcast',
+            ),
+        ]
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
     
     def __str__(self):
+        if self.user_id is None:
+            return f"{self.title} - {self.get_audience_display()}"
         return f"{self.title} - {self.user.username}"
     
-    def mark_as_read(self):
-        """Marcar notificación como leída"""
-        from django.utils import timezone
+    @property
+    def is_broadcast(self):
+        return self.user_id is None
+    
+    def mark_as_read(self, user=None):
+        """Marcar notificación como leída (en difusiones, solo para `user`)"""
+        if self.is_broadcast:
+            if BroadcastReadMark.objects.filter(user=user, last_read_id__gte=self.pk).exists():
+                return
+            NotificationReceipt.objects.get_or_create(
+                notification=self, user=user, defaults={'read_at': timezone.now()}
+            )
+            return
         self.is_read = True
         self.read_at = timezone.now()
         self.save()
+
+
+class NotificationReceipt(models.Model):
+    """Lectura de una notificación de difusión por un usuario (tabla dispersa: solo las leídas)"""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='receipts')
+    user = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='notification_receipts')
+    read_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'notification'], name='receipt_unique_user_notification'),
+        ]
+        verbose_name = "Lectura de Notificación"
+        verbose_name_plural = "Lecturas de Notificaciones"
+    
+    def __str__(self):
+        return f"{self.user_id} leyó {self.notification_id}"
+
+
+class BroadcastReadMark(models.Model):
+    """Marca de lectura de difusiones por usuario: las de id <= last_read_id están leídas"""
+    user = models.OneToOneField(
+        Usuario, on_delete=models.CASCADE, primary_key=True, related_name='broadcast_read_mark'
+    )
+    last_read_id = models.BigIntegerField(default=0)
+    read_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Marca de Lectura de Difusiones"
+        verbose_name_plural = "Marcas de Lectura de Difusiones"
+    
+    def __str__(self):
+        return f"{self.user_id} leyó hasta {self.last_read_id}"
@@ -0,0 +1,36 @@
+# communication/realtime.py
+"""Publicación de notificaciones nuevas en el stream en tiempo real"""
+from django.db import transaction
+
+from smartcondominioia import pubsub
+
+
+def notification_event(notification):
+    return {
+        'id': notification.pk,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'audience': notification.audience,
+        'link': notification.link,
+        'related_announcement': notification.related_announcement_id,
+        'created_at': notification.created_at,
+        'is_read': notification.is_read,
+    }
+
+
+def publish_notifications(notifications):
+    """Publica al confirmar la transacción: a su usuario o, si es difusión, a su audiencia"""
+    eventos = [
+        (
+            pubsub.audience_channel(n.audience) if n.user_id is None else pubsub.user_channel(n.user_id),
+            notification_event(n),
+        )
+        for n in notifications
+    ]
+
+    def publicar():
+        for canal, datos in eventos:
+            pubsub.publish(canal, 'notification', datos)
+
+    transaction.on_commit(publicar)
@@ -1,18 +1,20 @@
 from rest_framework import serializers
 from .models import Announcement, Notification
 from users.models import Usuario
+from mediastore.fields import ImageVariantsField
 
 
 class AnnouncementSerializer(serializers.ModelSerializer):
     """Serializer completo para Announcement"""
     author_name = serializers.CharField(source='author.get_full_name', read_only=True)
     is_expired = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = Announcement
         fields = [
             'id', 'title', 'content', 'category', 'author',
-            'author_name', 'image', 'is_published', 'published_date',
+            'author_name', 'image', 'image_variants', 'is_published', 'published_date',
             'expiry_date', 'is_pinned', 'is_expired',
             'created_at', 'updated_at'
         ]
@@ -39,24 +41,42 @@ class AnnouncementPublishSerializer(serializers.Serializer):
 
 
 class NotificationSerializer(serializers.ModelSerializer):
-    """Serializer completo para Notification"""
-    user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    """
+    Serializer completo para Notification.
+    Con querysets de Notification.objects.for_user(), is_read / read_at son los
+    del usuario (también en las difusiones).
+    """
+    user_name = serializers.CharField(source='user.get_full_name', read_only=True, default=None)
     
     class Meta:
         model = Notification
         fields = [
-            'id', 'user', 'user_name', 'title', 'message',
+            'id', 'user', 'user_name', 'audience', 'title', 'message',
             'notification_type', 'is_read', 'link',
             'related_announcement', 'created_at', 'read_at'
         ]
         read_only_fields = ['id', 'created_at', 'read_at']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'leida'):
+            data['is_read'] = instance.leida
+            data['read_at'] = self.fields['read_at'].to_representation(instance.leida_en) if instance.leida_en else None
+        return data
 
 
 class NotificationCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear notificaciones"""
     class Meta:
         model = Notification
-        fields = ['user', 'title', 'message', 'notification_type', 'link', 'related_announcement']
+        fields = ['user', 'audience', 'title', 'message', 'notification_type', 'link', 'related_announcement']
+    
+    def validate(self, attrs):
+        if attrs.get('user') is None and not attrs.get('audience'):
+            raise serializers.ValidationError("Indique 'user' o, para una difusión, 'audience'")
+        if attrs.get('user') is not None:
+            attrs['audience'] = ''
+        return attrs
 
 
 class BulkNotificationSerializer(serializers.Serializer):
@@ -0,0 +1,51 @@
+# communication/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Notification, NotificationReceipt
+from . import realtime, unread
+
+
+@receiver(pre_save, sender=Notification)
+def capturar_lectura_previa(sender, instance, raw=False, **kwargs):
+    instance._leida_previa = None
+    if instance.pk and not raw:
+        instance._leida_previa = Notification.objects.filter(pk=instance.pk).values_list('is_read', flat=True).first()
+
+
+@receiver(post_save, sender=Notification)
+def contar_notificacion(sender, instance, created, **kwargs):
+    """Mantiene los contadores de no leídas al crear o leer notificaciones"""
+    if instance.is_broadcast:
+        if created:
+            audiencia = instance.audience
+            transaction.on_commit(lambda: unread.broadcast_added(audiencia))
+        return
+    user_id = instance.user_id
+    if created and not instance.is_read:
+        transaction.on_commit(lambda: unread.direct_added(user_id))
+    elif getattr(instance, '_leida_previa', None) is False and instance.is_read:
+        transaction.on_commit(lambda: unread.direct_read(user_id))
+
+
+@receiver(post_save, sender=Notification)
+def publicar_notificacion(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.publish_notifications([instance])
+
+
+@receiver(post_delete, sender=Notification)
+def descontar_notificacion(sender, instance, **kwargs):
+    if instance.is_broadcast:
+        transaction.on_commit(unread.broadcast_removed)
+    elif not instance.is_read:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: unread.direct_read(user_id))
+
+
+@receiver(post_save, sender=NotificationReceipt)
+def contar_lectura(sender, instance, created, **kwargs):
+    if created:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: unread.broadcast_read(user_id))
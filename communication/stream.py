@@ -0,0 +1,114 @@
+# communication/stream.py
+"""
+Stream de eventos en tiempo real (Server-Sent Events), servido bajo ASGI.
+
+Una conexión por cliente reemplaza el polling de /notifications/unread/ y
+/security/incidents/unresolved/. Eventos:
+
+- `unread`: cantidad de no leídas al conectar.
+- `notification`: notificación nueva (directa o de difusión de su audiencia).
+- `incident` / `access_log`: solo para ADMIN y SEGURIDAD.
+- `resync`: se perdieron eventos (cola llena); el cliente debe recargar por REST.
+- `revoked`: cambió el rol, el estado o las unidades del usuario
+  (users.token_revocation); el servidor cierra el stream y el cliente debe
+  reconectar con un token vigente.
+
+EventSource no permite headers, así que el access token JWT se acepta también
+como `?token=`. Requiere un servidor ASGI (uvicorn / daphne); bajo WSGI la
+respuesta no se transmite de forma incremental.
+"""
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from smartcondominioia import pubsub
+from users.authentication import ClaimsJWTAuthentication
+from users.token_revocation import revoked_at
+from . import unread
+
+
+def _token(request, autenticacion):
+    """Access token de ?token= o del header Authorization"""
+    token = request.GET.get('token')
+    if token:
+        return token
+    encabezado = autenticacion.get_header(request)
+    return autenticacion.get_raw_token(encabezado) if encabezado is not None else None
+
+
+def _usuario_jwt(request):
+    """(hay_token, usuario): usuario None si el token es inválido"""
+    autenticacion = ClaimsJWTAuthentication()
+    try:
+        token = _token(request, autenticacion)
+        if token is None:
+            return False, None
+        return True, autenticacion.user_for_token(autenticacion.get_validated_token(token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return True, None
+
+
+async def _autenticar(request):
+    hay_token, usuario = await sync_to_async(_usuario_jwt)(request)
+    if hay_token:
+        return usuario
+    usuario = await request.auser()
+    return usuario if usuario.is_authenticated else None
+
+
+def _formatear(tipo, datos, evento_id=None):
+    lineas = [f'id: {evento_id}'] if evento_id is not None else []
+    lineas.append(f'event: {tipo}')
+    lineas.append(f'data: {json.dumps(datos, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lineas) + '\n\n'
+
+
+async def _revocado_desde(usuario, conectado):
+    marca = await sync_to_async(revoked_at)(usuario.pk)
+    return marca is not None and marca >= conectado
+
+
+async def _eventos(usuario):
+    # La suscripción se crea al empezar a transmitir, en el loop que consume el stream
+    suscripcion = pubsub.get_broker().subscribe(pubsub.channels_for(usuario))
+    latido = getattr(settings, 'SSE_HEARTBEAT', 20)
+    # El usuario se autenticó al conectar: una revocación posterior cierra el stream
+    conectado = ultima_verificacion = time.time()
+    try:
+        yield f'retry: {getattr(settings, "SSE_RETRY_MS", 5000)}\n\n'
+        yield _formatear('unread', {'unread': await sync_to_async(unread.unread_count)(usuario)})
+        while True:
+            evento = await suscripcion.get(timeout=latido)
+            if time.time() - ultima_verificacion >= latido:
+                ultima_verificacion = time.time()
+                if await _revocado_desde(usuario, conectado):
+                    yield _formatear('revoked', {})
+                    return
+            if suscripcion.desbordada:
+                suscripcion.desbordada = False
+                yield _formatear('resync', {})
+            if evento is None:
+                yield ': ping\n\n'  # Mantiene viva la conexión a través de proxies
+                continue
+            yield _formatear(evento['type'], evento['data'], evento.get('id'))
+    finally:
+        suscripcion.close()
+
+
+@require_GET
+async def event_stream(request):
+    """GET /api/communication/stream/ - Eventos en tiempo real del usuario"""
+    usuario = await _autenticar(request)
+    if usuario is None:
+        return JsonResponse({'detail': 'Las credenciales de autenticación no se proveyeron o no son válidas.'}, status=401)
+
+    response = StreamingHttpResponse(_eventos(usuario), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Sin buffering en nginx
+    return response
@@ -1,3 +1,160 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users.authentication import tokens_for
+from users.models import Usuario
+from users.token_revocation import revoke
+from .models import Announcement, BroadcastReadMark, Notification, NotificationReceipt
+from .stream import _eventos
+
+
+class EventStreamTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(username='s', email='s@x.com', password='p')
+
+    def _revocar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke([self.usuario.pk])
+
+    @override_settings(SSE_HEARTBEAT=0.01)
+    def test_revocacion_cierra_el_stream(self):
+        async def consumir():
+            recibidos = []
+            async for evento in _eventos(self.usuario):
+                recibidos.append(evento)
+                if len(recibidos) == 3:  # retry, unread y el primer ping
+                    await sync_to_async(self._revocar)()
+                if len(recibidos) > 10:
+                    break
+            return recibidos
+
+        recibidos = async_to_sync(consumir)()
+        self.assertLessEqual(len(recibidos), 5)
+        self.assertTrue(recibidos[-1].startswith('event: revoked'))
+
+
+class NotificationScopeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.residente = Usuario.objects.create_user(username='res', email='res@x.com', password='p', rol='RESIDENTE')
+        self.vecino = Usuario.objects.create_user(username='vec', email='vec@x.com', password='p', rol='RESIDENTE')
+        self.admin = Usuario.objects.create_user(username='adm', email='adm@x.com', password='p', rol='ADMIN')
+        self.propia = Notification.objects.create(user=self.residente, title='t', message='m')
+        self.ajena = Notification.objects.create(user=self.vecino, title='t', message='m')
+        self.difusion = Notification.objects.create(audience='ALL', title='t', message='m')
+
+    def _cliente(self, usuario):
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        return cliente
+
+    def _url(self, notificacion):
+        return f'/api/communication/notifications/{notificacion.pk}/'
+
+    def test_solo_lista_las_visibles(self):
+        respuesta = self._cliente(self.residente).get('/api/communication/notifications/')
+        ids = {fila['id'] for fila in respuesta.data['results']}
+        self.assertEqual(ids, {self.propia.pk, self.difusion.pk})
+        self.assertEqual(self._cliente(self.residente).get(self._url(self.ajena)).status_code, 404)
+        self.assertEqual(self._cliente(self.residente).delete(self._url(self.ajena)).status_code, 404)
+
+    def test_difusion_solo_la_modifica_admin(self):
+        cliente = self._cliente(self.residente)
+        self.assertEqual(cliente.patch(self._url(self.difusion), {'title': 'x'}).status_code, 403)
+        self.assertEqual(cliente.delete(self._url(self.difusion)).status_code, 403)
+        self.assertEqual(cliente.post(self._url(self.difusion) + 'mark_read/').status_code, 200)
+
+    def test_residente_no_crea_difusiones(self):
+        cliente = self._cliente(self.residente)
+        for audiencia in ('ALL', 'RESIDENTE'):
+            with self.subTest(audiencia=audiencia):
+                datos = {'audience': audiencia, 'title': 't', 'message': 'm'}
+                self.assertEqual(cliente.post('/api/communication/notifications/', datos).status_code, 403)
+        self.assertEqual(
+            cliente.patch(self._url(self.propia), {'user': None, 'audience': 'ALL'}, format='json').status_code, 403
+        )
+        self.assertEqual(Notification.objects.filter(user__isnull=True).count(), 1)
+        datos = {'audience': 'ALL', 'title': 't', 'message': 'm'}
+        self.assertEqual(self._cliente(self.admin).post('/api/communication/notifications/', datos).status_code, 201)
+        self.assertEqual(self._cliente(self.admin).delete(self._url(self.difusion)).status_code, 204)
+
+
+class BroadcastReadMarkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(username='res', email='res@x.com', password='p')
+        self.difusiones = [
+            Notification.objects.create(audience='ALL', title=f'd{numero}', message='m') for numero in range(5)
+        ]
+        Notification.objects.create(user=self.usuario, title='t', message='m')
+
+    def test_marcar_todas_no_crea_recibos(self):
+        self.difusiones[0].mark_as_read(self.usuario)
+        self.assertEqual(Notification.objects.mark_all_read(self.usuario), 5)
+        self.assertFalse(NotificationReceipt.objects.exists())  # El recibo previo quedó cubierto por la marca
+        self.assertEqual(BroadcastReadMark.objects.get(user=self.usuario).last_read_id, self.difusiones[-1].pk)
+        self.assertFalse(Notification.objects.unread_for(self.usuario).exists())
+        leida = Notification.objects.for_user(self.usuario).get(pk=self.difusiones[2].pk)
+        self.assertIsNotNone(leida.leida_en)
+
+    def test_difusiones_nuevas_quedan_sin_leer(self):
+        Notification.objects.mark_all_read(self.usuario)
+        nueva = Notification.objects.create(audience='ALL', title='n', message='m')
+        self.difusiones[1].mark_as_read(self.usuario)  # Ya cubierta: no crea recibo
+        self.assertFalse(NotificationReceipt.objects.exists())
+        self.assertEqual(list(Notification.objects.unread_for(self.usuario)), [nueva])
+        nueva.mark_as_read(self.usuario)
+        self.assertFalse(Notification.objects.unread_for(self.usuario).exists())
+
+
+class AnnouncementPublishTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = Usuario.objects.create_user(username='adm', email='adm@x.com', password='p', rol='ADMIN')
+        self.residente = Usuario.objects.create_user(username='res', email='res@x.com', password='p')
+        self.aviso = Announcement.objects.create(title='Corte de agua', content='Mañana', author=self.admin)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.admin)
+
+    def _publicar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.cliente.post(f'/api/communication/announcements/{self.aviso.pk}/publish/')
+
+    def test_publicar_crea_una_difusion(self):
+        self.assertEqual(self._publicar().status_code, 200)
+        difusion = Notification.objects.get(related_announcement=self.aviso)
+        self.assertIsNone(difusion.user_id)
+        self.assertEqual(difusion.audience, 'ALL')
+        self.assertEqual(Notification.objects.for_user(self.residente).get(), difusion)
+
+    def test_republicar_no_duplica(self):
+        self._publicar()
+        self.cliente.post(f'/api/communication/announcements/{self.aviso.pk}/unpublish/')
+        self.assertEqual(self._publicar().status_code, 200)
+        self.assertEqual(Notification.objects.filter(related_announcement=self.aviso).count(), 1)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class NotificationQueryBudgetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(username='res', email='res@x.com', password='p')
+        for numero in range(3):
+            Notification.objects.create(user=self.usuario, title=f't{numero}', message='m')
+            Notification.objects.create(audience='ALL', title=f'd{numero}', message='m')
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for(self.usuario).access_token}')
+
+    def test_acciones_dentro_del_presupuesto(self):
+        for accion in ('my_notifications', 'unread', 'unread_count', 'stats'):
+            with self.subTest(accion=accion):
+                respuesta = self.cliente.get(f'/api/communication/notifications/{accion}/')
+                self.assertEqual(respuesta.status_code, 200)
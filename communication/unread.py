@@ -0,0 +1,124 @@
+# communication/unread.py
+"""
+Contador de notificaciones no leídas por usuario en la caché de Django.
+
+El badge de no leídas se consulta por polling desde cada cliente abierto, así
+que se sirve desde la caché sin tocar la tabla de notificaciones:
+
+- `notif:unread:<user>`: no leídas del usuario al momento de la base.
+- `notif:unread:<user>:base`: (rol, total ALL, total del rol, generación) en
+  ese momento.
+- `notif:broadcast:<audiencia>`: difusiones publicadas para la audiencia.
+- `notif:broadcast:gen`: generación; se incrementa al borrar una difusión.
+
+No leídas = contador del usuario + difusiones publicadas desde su base. Las
+inserciones, lecturas y borrados ajustan los contadores con incr/decr
+(atómicos en Redis). Si falta alguna clave, cambió el rol o la generación, se
+recalcula desde la BD en una consulta. NOTIF_UNREAD_CACHE_TTL acota la deriva
+ante condiciones de carrera.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Notification
+
+PREFIJO = 'notif'
+CLAVE_GENERACION = f'{PREFIJO}:broadcast:gen'
+
+
+def _ttl():
+    return getattr(settings, 'NOTIF_UNREAD_CACHE_TTL', 300)
+
+
+def _clave_usuario(user_id):
+    return f'{PREFIJO}:unread:{user_id}'
+
+
+def _clave_base(user_id):
+    return f'{PREFIJO}:unread:{user_id}:base'
+
+
+def _clave_audiencia(audiencia):
+    return f'{PREFIJO}:broadcast:{audiencia}'
+
+
+def _incr(clave, delta):
+    """incr/decr que ignora claves ausentes (se recalculan en la próxima lectura)"""
+    try:
+        cache.incr(clave, delta)
+    except ValueError:
+        pass
+
+
+def _totales_difusion(valores, audiencias):
+    """Totales de difusiones por audiencia; los que falten se cargan en una consulta"""
+    claves = {audiencia: _clave_audiencia(audiencia) for audiencia in audiencias}
+    totales = {a: valores[c] for a, c in claves.items() if c in valores}
+    faltantes = [a for a in audiencias if a not in totales]
+    if faltantes:
+        conteos = dict(
+            Notification.objects.filter(user__isnull=True, audience__in=faltantes)
+            .order_by().values_list('audience').annotate(total=Count('id'))
+        )
+        for audiencia in faltantes:
+            totales[audiencia] = conteos.get(audiencia, 0)
+            cache.add(claves[audiencia], totales[audiencia], timeout=None)
+    return totales
+
+
+def unread_count(user):
+    """No leídas del usuario (directas + difusiones de su audiencia)"""
+    audiencias = ['ALL', user.rol]
+    valores = cache.get_many([
+        _clave_usuario(user.pk), _clave_base(user.pk), CLAVE_GENERACION,
+        *[_clave_audiencia(a) for a in audiencias],
+    ])
+    generacion = valores.get(CLAVE_GENERACION, 0)
+    totales = _totales_difusion(valores, audiencias)
+    contador = valores.get(_clave_usuario(user.pk))
+    base = valores.get(_clave_base(user.pk))
+
+    if contador is None or base is None or base[0] != user.rol or base[3] != generacion:
+        return refresh(user, totales, generacion)
+    _, total_all, total_rol, _ = base
+    return max(0, contador + (totales['ALL'] - total_all) + (totales[user.rol] - total_rol))
+
+
+def refresh(user, totales=None, generacion=None):
+    """Recalcula el contador del usuario desde la BD (también tras mark_all_read)"""
+    if generacion is None:
+        generacion = cache.get(CLAVE_GENERACION, 0)
+    if totales is None:
+        totales = _totales_difusion({}, ['ALL', user.rol])
+    contador = Notification.objects.unread_for(user).count()
+    cache.set_many({
+        _clave_usuario(user.pk): contador,
+        _clave_base(user.pk): (user.rol, totales['ALL'], totales[user.rol], generacion),
+    }, timeout=_ttl())
+    return contador
+
+
+# ---------- Mantenimiento (desde communication.signals) ----------
+
+def direct_added(user_id):
+    _incr(_clave_usuario(user_id), 1)
+
+
+def direct_read(user_id):
+    _incr(_clave_usuario(user_id), -1)
+
+
+def broadcast_added(audiencia):
+    _incr(_clave_audiencia(audiencia), 1)
+
+
+def broadcast_read(user_id):
+    _incr(_clave_usuario(user_id), -1)
+
+
+def broadcast_removed():
+    """Un borrado no se puede descontar sin saber quién la leyó: invalida todas las bases"""
+    cache.delete_many([_clave_audiencia(a) for a, _ in Notification.AUDIENCE_CHOICES])
+    if not cache.add(CLAVE_GENERACION, 1, timeout=None):
+        _incr(CLAVE_GENERACION, 1)
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import AnnouncementViewSet, NotificationViewSet
+from .stream import event_stream
 
 router = DefaultRouter()
 router.register(r'announcements', AnnouncementViewSet, basename='announcement')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    path('stream/', event_stream, name='event-stream'),
     path('', include(router.urls)),
 ]
@@ -3,17 +3,21 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q
 from .models import Announcement, Notification
 from users.models import Usuario
 from .serializers import (
     AnnouncementSerializer, AnnouncementCreateSerializer, AnnouncementPublishSerializer,
     NotificationSerializer, NotificationCreateSerializer, BulkNotificationSerializer
 )
-from users.permissions import IsAdmin, CanCreateAnnouncements
+from . import realtime, unread
+from smartcondominioia.pagination import CreatedAtCursorPagination
+from smartcondominioia.metrics import InstrumentedViewMixin
+from users.permissions import IsAdmin, CanCreateAnnouncements, CanModifyNotification
 
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de avisos y comunicados
     Endpoints:
@@ -23,7 +27,7 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
     - PUT /announcements/{id}/ - Actualizar aviso
     - DELETE /announcements/{id}/ - Eliminar aviso
     - GET /announcements/published/ - Listar avisos publicados
-    - POST /announcements/{id}/publish/ - Publicar aviso
+    - POST /announcements/{id}/publish/ - Publicar aviso (una notificación de difusión)
     - POST /announcements/{id}/unpublish/ - Despublicar aviso
     """
     queryset = Announcement.objects.all()
@@ -57,24 +61,24 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def publish(self, request, pk=None):
-        """Publicar un aviso"""
+        """Publicar un aviso con su notificación de difusión (una fila, sin importar la audiencia)"""
         announcement = self.get_object()
-        announcement.is_published = True
-        announcement.published_date = timezone.now()
-        announcement.save()
-        
-        # Crear notificaciones para todos los usuarios
-        users = Usuario.objects.filter(is_active=True)
-        notifications = [
-            Notification(
-                user=user,
-                title=f"Nuevo aviso: {announcement.title}",
-                message=announcement.content[:200],
-                notification_type='INFO',
-                related_announcement=announcement
-            ) for user in users
-        ]
-        Notification.objects.bulk_create(notifications)
+        with transaction.atomic():
+            announcement.is_published = True
+            announcement.published_date = timezone.now()
+            announcement.save()
+            # Al republicar se reutiliza la difusión (notification_unique_announcement_broadcast);
+            # contadores y tiempo real se actualizan en el commit (communication.signals)
+            Notification.objects.get_or_create(
+                related_announcement=announcement,
+                user=None,
+                defaults={
+                    'audience': 'ALL',
+                    'title': f"Nuevo aviso: {announcement.title}"[:200],
+                    'message': announcement.content[:200],
+                    'notification_type': 'INFO',
+                },
+            )
         
         return Response(
             {"message": "Aviso publicado y notificaciones enviadas"},
@@ -110,26 +114,31 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         )
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de notificaciones
     Endpoints:
-    - GET /notifications/ - Listar todas las notificaciones
-    - POST /notifications/ - Crear nueva notificación
+    - GET /notifications/ - Listar las notificaciones visibles para el usuario
+    - POST /notifications/ - Crear nueva notificación (difusiones: solo ADMIN)
     - GET /notifications/{id}/ - Obtener detalle de notificación
-    - PUT /notifications/{id}/ - Actualizar notificación
-    - DELETE /notifications/{id}/ - Eliminar notificación
+    - PUT /notifications/{id}/ - Actualizar notificación (difusiones: solo ADMIN)
+    - DELETE /notifications/{id}/ - Eliminar notificación (difusiones: solo ADMIN)
     - GET /notifications/my_notifications/ - Obtener notificaciones del usuario
     - GET /notifications/unread/ - Obtener notificaciones no leídas
+    - GET /notifications/unread_count/ - Cantidad de no leídas (desde caché, sin consultar notificaciones)
     - POST /notifications/{id}/mark_read/ - Marcar como leída
     - POST /notifications/mark_all_read/ - Marcar todas como leídas
     - POST /notifications/send_bulk/ - Enviar notificaciones masivas
     """
     queryset = Notification.objects.all()
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CanModifyNotification]
+    pagination_class = CreatedAtCursorPagination
+    ordering = ['-created_at', '-id']
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'message']
     ordering_fields = ['created_at', 'is_read']
+    # Incluyen la consulta de autenticación; unread_count solo consulta al recalcular el contador
+    query_budgets = {'unread_count': 3, 'stats': 2, 'my_notifications': 2, 'unread': 2}
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -138,28 +147,37 @@ class NotificationViewSet(viewsets.ModelViewSet):
             return BulkNotificationSerializer
         return NotificationSerializer
     
+    def get_queryset(self):
+        """Directas del usuario y difusiones de su audiencia; ADMIN edita o elimina cualquier difusión"""
+        user = self.request.user
+        if self.action in ('update', 'partial_update', 'destroy') and user.rol == 'ADMIN':
+            return Notification.objects.filter(Q(user=user) | Q(user__isnull=True))
+        return Notification.objects.for_user(user).select_related('user')
+    
     @action(detail=False, methods=['get'])
     def my_notifications(self, request):
-        """Obtener notificaciones del usuario actual"""
-        notifications = Notification.objects.filter(user=request.user)
+        """Obtener notificaciones del usuario actual (directas y de difusión)"""
+        notifications = Notification.objects.for_user(request.user).select_related('user')
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def unread(self, request):
         """Obtener notificaciones no leídas del usuario actual"""
-        notifications = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        )
+        notifications = Notification.objects.unread_for(request.user).select_related('user')
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Cantidad de notificaciones no leídas del usuario (badge)"""
+        return Response({'unread': unread.unread_count(request.user)})
+    
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
-        """Marcar una notificación como leída"""
+        """Marcar una notificación como leída (en difusiones, solo para el usuario actual)"""
         notification = self.get_object()
-        notification.mark_as_read()
+        notification.mark_as_read(request.user)
         
         return Response(
             {"message": "Notificación marcada como leída"},
@@ -169,56 +187,56 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Marcar todas las notificaciones del usuario como leídas"""
-        notifications = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        )
-        
-        for notification in notifications:
-            notification.mark_as_read()
+        user = request.user
+        count = Notification.objects.mark_all_read(user)
+        transaction.on_commit(lambda: unread.refresh(user))
         
         return Response(
-            {"message": f"{notifications.count()} notificaciones marcadas como leídas"},
+            {"message": f"{count} notificaciones marcadas como leídas"},
             status=status.HTTP_200_OK
         )
     
     @action(detail=False, methods=['post'])
     def send_bulk(self, request):
-        """Enviar notificaciones masivas"""
+        """
+        Enviar notificaciones masivas.
+        Con user_ids se crea una notificación por usuario; por rol (o a todos)
+        se guarda una sola notificación de difusión para esa audiencia.
+        """
         serializer = BulkNotificationSerializer(data=request.data)
         
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         data = serializer.validated_data
-        title = data['title']
-        message = data['message']
-        notification_type = data['notification_type']
+        contenido = {
+            'title': data['title'],
+            'message': data['message'],
+            'notification_type': data['notification_type'],
+        }
         
-        # Determinar destinatarios
-        if 'user_ids' in data and data['user_ids']:
-            users = Usuario.objects.filter(id__in=data['user_ids'])
-        elif 'target_role' in data and data['target_role'] != 'ALL':
-            users = Usuario.objects.filter(role=data['target_role'])
+        if data.get('user_ids'):
+            user_ids = Usuario.objects.filter(id__in=data['user_ids']).values_list('id', flat=True)
+            notifications = Notification.objects.bulk_create([
+                Notification(user_id=user_id, **contenido) for user_id in user_ids
+            ])
+            count = len(notifications)
+            # bulk_create no emite señales: contadores y stream se actualizan acá
+            for notification in notifications:
+                transaction.on_commit(lambda user_id=notification.user_id: unread.direct_added(user_id))
+            realtime.publish_notifications(notifications)
         else:
+            audience = data.get('target_role', 'ALL')
+            Notification.objects.create(audience=audience, **contenido)
             users = Usuario.objects.filter(is_active=True)
-        
-        # Crear notificaciones
-        notifications = [
-            Notification(
-                user=user,
-                title=title,
-                message=message,
-                notification_type=notification_type
-            ) for user in users
-        ]
-        
-        Notification.objects.bulk_create(notifications)
+            if audience != 'ALL':
+                users = users.filter(rol=audience)
+            count = users.count()
         
         return Response(
             {
-                "message": f"Se enviaron {len(notifications)} notificaciones",
-                "count": len(notifications)
+                "message": f"Se enviaron {count} notificaciones",
+                "count": count
             },
             status=status.HTTP_201_CREATED
         )
@@ -226,13 +244,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Estadísticas de notificaciones del usuario"""
-        user = request.user
-        total = Notification.objects.filter(user=user).count()
-        unread = Notification.objects.filter(user=user, is_read=False).count()
-        read = total - unread
+        totales = Notification.objects.for_user(request.user).aggregate(
+            total=Count('id'),
+            unread=Count('id', filter=Q(leida=False)),
+        )
         
         return Response({
-            'total': total,
-            'read': read,
-            'unread': unread
+            'total': totales['total'],
+            'read': totales['total'] - totales['unread'],
+            'unread': totales['unread']
         })
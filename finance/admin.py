@@ -1,19 +1,19 @@
 from django.contrib import admin
-from .models import Fee, Payment, FeeConfiguration
+from .models import Fee, Payment, FeeConfiguration, FeeRun, LedgerEntry
 
 
 @admin.register(FeeConfiguration)
 class FeeConfigurationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'base_amount', 'is_active', 'created_at']
-    list_filter = ['is_active']
+    list_display = ['name', 'base_amount', 'scale_by_area', 'is_active', 'created_at']
+    list_filter = ['is_active', 'scale_by_area']
     search_fields = ['name', 'description']
 
 
 @admin.register(Fee)
 class FeeAdmin(admin.ModelAdmin):
     list_display = ['title', 'unit', 'amount', 'due_date', 'status', 'created_at']
-    list_filter = ['status', 'due_date']
-    search_fields = ['title', 'unit__unit_number']
+    list_filter = ['status', 'due_date', 'billing_period']
+    search_fields = ['title', 'unit__numero_unidad']
     date_hierarchy = 'due_date'
 
 
@@ -21,5 +21,29 @@ class FeeAdmin(admin.ModelAdmin):
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ['fee', 'amount_paid', 'payment_method', 'is_verified', 'payment_date']
     list_filter = ['is_verified', 'payment_method', 'payment_date']
-    search_fields = ['fee__title', 'fee__unit__unit_number']
+    search_fields = ['fee__title', 'fee__unit__numero_unidad']
     date_hierarchy = 'payment_date'
+
+
+
+@admin.register(FeeRun)
+class FeeRunAdmin(admin.ModelAdmin):
+    list_display = ['period', 'status', 'units_billed', 'fees_created', 'total_amount', 'started_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['started_at', 'finished_at']
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['unit', 'entry_type', 'amount', 'balance', 'description', 'created_at']
+    list_filter = ['entry_type', 'created_at']
+    search_fields = ['unit__numero_unidad', 'description']
+    list_select_related = ['unit']
+    raw_id_fields = ['unit', 'fee', 'payment']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
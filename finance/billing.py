@@ -0,0 +1,166 @@
+# finance/billing.py
+"""
+Generación masiva de cuotas de un período (FeeRun).
+
+Por cada configuración activa y cada unidad activa se crea una cuota, con el
+monto de la configuración (multiplicado por superficie_m2 si scale_by_area).
+Las cuotas y sus cargos en el libro mayor se escriben en lotes de bulk_create
+dentro de una única transacción. La restricción fee_unique_billing_period hace
+la ejecución idempotente: reintentar un período solo crea las cuotas que faltan.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import UnidadResidencial
+from .models import Fee, FeeConfiguration, FeeRun
+from . import ledger
+
+CENTAVO = Decimal('0.01')
+
+
+def parse_period(valor):
+    """'YYYY-MM' o date -> primer día del mes"""
+    if isinstance(valor, date):
+        return valor.replace(day=1)
+    anio, mes = str(valor).split('-')
+    return date(int(anio), int(mes), 1)
+
+
+def due_date_for(periodo, dia=None):
+    dia = dia or getattr(settings, 'FEE_DUE_DAY', 10)
+    return periodo.replace(day=min(dia, calendar.monthrange(periodo.year, periodo.month)[1]))
+
+
+def _monto(configuracion, superficie):
+    if not configuracion.scale_by_area:
+        return configuracion.base_amount
+    if superficie is None:
+        return None
+    return (configuracion.base_amount * superficie).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def _planificar(periodo):
+    """
+    Genera (configuracion, unit_id, monto) por cada cuota faltante del período.
+    Acumula en `resumen` las unidades sin superficie y las cuotas ya existentes.
+    """
+    configuraciones = list(FeeConfiguration.objects.filter(is_active=True).order_by('id'))
+    existentes = set(
+        Fee.objects.filter(billing_period=periodo, configuration__in=configuraciones)
+        .values_list('configuration_id', 'unit_id')
+    )
+    unidades = list(
+        UnidadResidencial.objects.filter(activo=True).order_by('id').values_list('id', 'superficie_m2')
+    )
+    resumen = {
+        'units': len(unidades),
+        'configurations': [],
+        'fees_skipped': len(existentes),
+        'units_without_area': set(),
+    }
+    plan = []
+    for configuracion in configuraciones:
+        cantidad, total = 0, Decimal('0')
+        for unit_id, superficie in unidades:
+            if (configuracion.id, unit_id) in existentes:
+                continue
+            monto = _monto(configuracion, superficie)
+            if monto is None:
+                resumen['units_without_area'].add(unit_id)
+                continue
+            plan.append((configuracion, unit_id, monto))
+            cantidad += 1
+            total += monto
+        resumen['configurations'].append({
+            'id': configuracion.id, 'name': configuracion.name, 'fees': cantidad, 'amount': total,
+        })
+    return plan, resumen
+
+
+def generate_fees(periodo, dry_run=False, due_day=None, usuario=None, batch_size=None):
+    """
+    Genera las cuotas del período para todas las unidades activas.
+    Con dry_run=True solo calcula el resumen sin escribir nada.
+    """
+    periodo = parse_period(periodo)
+    due_date = due_date_for(periodo, due_day)
+    batch_size = batch_size or getattr(settings, 'FEE_RUN_BATCH_SIZE', 1000)
+
+    if dry_run:
+        plan, resumen = _planificar(periodo)
+        return _reporte(periodo, due_date, plan, resumen, dry_run=True)
+
+    # El registro del run se confirma antes de generar: si el proceso cae queda
+    # en RUNNING y la siguiente ejecución del período retoma lo que falte.
+    run, _ = FeeRun.objects.update_or_create(
+        period=periodo,
+        defaults={
+            'status': 'RUNNING', 'due_date': due_date, 'created_by': usuario,
+            'started_at': timezone.now(), 'finished_at': None, 'error': '',
+        },
+    )
+    try:
+        with transaction.atomic():
+            # Serializa ejecuciones concurrentes del mismo período
+            run = FeeRun.objects.select_for_update().get(pk=run.pk)
+            plan, resumen = _planificar(periodo)
+            for inicio in range(0, len(plan), batch_size):
+                _escribir_lote(plan[inicio:inicio + batch_size], periodo, due_date)
+
+            reporte = _reporte(periodo, due_date, plan, resumen, dry_run=False)
+            run.status = 'COMPLETED'
+            run.units_billed = (
+                Fee.objects.filter(billing_period=periodo, configuration__isnull=False)
+                .values('unit_id').distinct().count()
+            )
+            run.fees_created += reporte['fees_created']
+            run.fees_skipped = reporte['fees_skipped']
+            run.total_amount += reporte['total_amount']
+            run.finished_at = timezone.now()
+            run.save()
+    except Exception as exc:
+        FeeRun.objects.filter(pk=run.pk).update(status='FAILED', error=str(exc), finished_at=timezone.now())
+        raise
+
+    reporte['run'] = run.pk
+    return reporte
+
+
+def _escribir_lote(lote, periodo, due_date):
+    fees = Fee.objects.bulk_create([
+        Fee(
+            unit_id=unit_id,
+            configuration=configuracion,
+            billing_period=periodo,
+            title=f'{configuracion.name} {periodo:%m/%Y}'[:100],
+            description=configuracion.description,
+            amount=monto,
+            due_date=due_date,
+        )
+        for configuracion, unit_id, monto in lote
+    ])
+    movimientos = defaultdict(list)
+    for fee in fees:
+        movimientos[fee.unit_id].append(ledger.cargo_cuota(fee))
+    ledger.post_entries(movimientos)
+
+
+def _reporte(periodo, due_date, plan, resumen, dry_run):
+    clave = 'fees_to_create' if dry_run else 'fees_created'
+    return {
+        'period': periodo,
+        'due_date': due_date,
+        'dry_run': dry_run,
+        'units': resumen['units'],
+        clave: len(plan),
+        'fees_skipped': resumen['fees_skipped'],
+        'units_without_area': len(resumen['units_without_area']),
+        'total_amount': sum((monto for _, _, monto in plan), Decimal('0')),
+        'configurations': resumen['configurations'],
+    }
@@ -0,0 +1,183 @@
+# finance/ledger.py
+"""
+Libro mayor por unidad (LedgerEntry).
+
+Cada movimiento se inserta con el saldo acumulado de la unidad. Antes de leer
+el saldo previo se bloquean las filas de UnidadResidencial (SELECT ... FOR
+UPDATE, en orden de id) para que dos movimientos concurrentes sobre la misma
+unidad no partan del mismo saldo.
+"""
+import heapq
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from users.models import UnidadResidencial
+from .models import Fee, LedgerEntry, Payment
+
+CERO = Decimal('0')
+LOTE = 2000
+
+Movimiento = namedtuple(
+    'Movimiento', 'entry_type amount description fee_id payment_id created_at',
+    defaults=(None, None, None)
+)
+
+
+# ---------- Movimientos ----------
+
+def cargo_cuota(fee):
+    return Movimiento('CHARGE', fee.amount, fee.title[:200], fee_id=fee.pk)
+
+
+def ajuste_cuota(fee, monto, descripcion, conservar_fee=True):
+    return Movimiento('ADJUSTMENT', monto, descripcion[:200], fee_id=fee.pk if conservar_fee else None)
+
+
+def pago(payment, fee_id=None):
+    return Movimiento('PAYMENT', -payment.amount_paid, 'Pago verificado', fee_id=fee_id, payment_id=payment.pk)
+
+
+def reversion_pago(monto, fee_id=None, payment_id=None):
+    return Movimiento('ADJUSTMENT', monto, 'Reversión de pago', fee_id=fee_id, payment_id=payment_id)
+
+
+# ---------- Escritura ----------
+
+def _saldos_actuales(unit_ids):
+    """Último saldo de cada unidad (subconsulta LIMIT 1 sobre el índice por unidad)"""
+    ultimo = (
+        LedgerEntry.objects.filter(unit=OuterRef('pk'))
+        .order_by('-created_at', '-id').values('balance')[:1]
+    )
+    return dict(
+        UnidadResidencial.objects.filter(pk__in=unit_ids)
+        .annotate(saldo=Subquery(ultimo)).values_list('pk', 'saldo')
+    )
+
+
+def post_entries(movimientos_por_unidad):
+    """
+    Registra {unit_id: [Movimiento, ...]} calculando el saldo acumulado de cada
+    unidad. Las unidades inexistentes se ignoran. Retorna los LedgerEntry creados.
+    """
+    movimientos_por_unidad = {u: m for u, m in movimientos_por_unidad.items() if u and m}
+    if not movimientos_por_unidad:
+        return []
+
+    with transaction.atomic():
+        unit_ids = list(
+            UnidadResidencial.objects.select_for_update()
+            .filter(pk__in=movimientos_por_unidad).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        saldos = _saldos_actuales(unit_ids)
+        ahora = timezone.now()
+        entradas = []
+        for unit_id in unit_ids:
+            saldo = saldos.get(unit_id) or CERO
+            for mov in movimientos_por_unidad[unit_id]:
+                saldo += mov.amount
+                entradas.append(LedgerEntry(
+                    unit_id=unit_id,
+                    fee_id=mov.fee_id,
+                    payment_id=mov.payment_id,
+                    entry_type=mov.entry_type,
+                    description=mov.description,
+                    amount=mov.amount,
+                    balance=saldo,
+                    created_at=mov.created_at or ahora,
+                ))
+        return LedgerEntry.objects.bulk_create(entradas, batch_size=LOTE)
+
+
+def post(unit_id, *movimientos):
+    return post_entries({unit_id: list(movimientos)})
+
+
+# ---------- Lectura ----------
+
+def current_balance(unit_id):
+    """Saldo actual de la unidad (positivo = deuda)"""
+    saldo = (
+        LedgerEntry.objects.filter(unit_id=unit_id)
+        .order_by('-created_at', '-id').values_list('balance', flat=True).first()
+    )
+    return saldo if saldo is not None else CERO
+
+
+def statement(unit_id, desde=None, hasta=None):
+    """Movimientos de la unidad en [desde, hasta): un rango sobre (unit, created_at, id)"""
+    movimientos = LedgerEntry.objects.filter(unit_id=unit_id)
+    if desde is not None:
+        movimientos = movimientos.filter(created_at__gte=desde)
+    if hasta is not None:
+        movimientos = movimientos.filter(created_at__lt=hasta)
+    return movimientos.order_by('created_at', 'id')
+
+
+# ---------- Reconstrucción ----------
+
+def rebuild_ledger(unit_ids=None):
+    """
+    Regenera el libro desde Fee (cargo en created_at) y los pagos verificados
+    (en payment_date). Retorna la cantidad de movimientos escritos.
+    """
+    with transaction.atomic():
+        unidades = UnidadResidencial.objects.select_for_update().order_by('pk')
+        fees = Fee.objects.all()
+        pagos = Payment.objects.filter(is_verified=True)
+        if unit_ids is not None:
+            unidades = unidades.filter(pk__in=unit_ids)
+            fees = fees.filter(unit_id__in=unit_ids)
+            pagos = pagos.filter(fee__unit_id__in=unit_ids)
+        list(unidades.values_list('pk', flat=True))  # Bloquea las unidades durante la reconstrucción
+
+        borrar = LedgerEntry.objects.all()
+        if unit_ids is not None:
+            borrar = borrar.filter(unit_id__in=unit_ids)
+        borrar.delete()
+
+        return write_history(LedgerEntry, fees, pagos)
+
+
+def write_history(ledger_model, fees, pagos):
+    """
+    Escribe el historial completo de las cuotas y pagos verificados dados,
+    mezclando ambas consultas en streaming por (unidad, fecha).
+    """
+    cargos = (
+        (unit_id, creado, 0, fee_id, monto, titulo, None)
+        for unit_id, creado, fee_id, monto, titulo in fees.order_by('unit_id', 'created_at', 'id')
+        .values_list('unit_id', 'created_at', 'id', 'amount', 'title').iterator(chunk_size=LOTE)
+    )
+    abonos = (
+        (unit_id, fecha, 1, fee_id, -monto, 'Pago verificado', payment_id)
+        for unit_id, fecha, payment_id, fee_id, monto in pagos.order_by('fee__unit_id', 'payment_date', 'id')
+        .values_list('fee__unit_id', 'payment_date', 'id', 'fee_id', 'amount_paid').iterator(chunk_size=LOTE)
+    )
+
+    total, lote, unidad_actual, saldo = 0, [], None, CERO
+    for unit_id, fecha, tipo, fee_id, monto, descripcion, payment_id in heapq.merge(cargos, abonos):
+        if unit_id != unidad_actual:
+            unidad_actual, saldo = unit_id, CERO
+        saldo += monto
+        lote.append(ledger_model(
+            unit_id=unit_id,
+            fee_id=fee_id,
+            payment_id=payment_id,
+            entry_type='PAYMENT' if tipo else 'CHARGE',
+            description=descripcion[:200],
+            amount=monto,
+            balance=saldo,
+            created_at=fecha,
+        ))
+        if len(lote) >= LOTE:
+            total += len(ledger_model.objects.bulk_create(lote))
+            lote = []
+    if lote:
+        total += len(ledger_model.objects.bulk_create(lote))
+    return total
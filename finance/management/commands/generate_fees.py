@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finance.billing import generate_fees
+
+
+class Command(BaseCommand):
+    help = 'Genera las cuotas del período para todas las unidades activas según las configuraciones activas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='Período YYYY-MM (por defecto, el mes actual)')
+        parser.add_argument('--due-day', type=int, help='Día de vencimiento (por defecto FEE_DUE_DAY)')
+        parser.add_argument('--batch-size', type=int, help='Filas por bulk_create (por defecto FEE_RUN_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Calcula los totales sin escribir')
+
+    def handle(self, *args, **options):
+        periodo = options['period'] or timezone.localdate().strftime('%Y-%m')
+        try:
+            reporte = generate_fees(
+                periodo,
+                dry_run=options['dry_run'],
+                due_day=options['due_day'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError:
+            raise CommandError('El período debe tener formato YYYY-MM')
+
+        for configuracion in reporte['configurations']:
+            self.stdout.write(f"  {configuracion['name']}: {configuracion['fees']} cuotas, ${configuracion['amount']}")
+        if reporte['units_without_area']:
+            self.stdout.write(self.style.WARNING(
+                f"{reporte['units_without_area']} unidades sin superficie_m2 omitidas en tarifas por m²"
+            ))
+        if reporte['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"[dry-run] {reporte['fees_to_create']} cuotas por ${reporte['total_amount']} "
+                f"({reporte['fees_skipped']} ya existentes)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{reporte['fees_created']} cuotas creadas por ${reporte['total_amount']} "
+                f"({reporte['fees_skipped']} ya existentes)"
+            ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from finance.models import Fee
+
+
+class Command(BaseCommand):
+    help = 'Marca como OVERDUE las cuotas PENDING vencidas (ejecutar cada noche, p. ej. desde cron)'
+
+    def handle(self, *args, **options):
+        total = Fee.objects.mark_overdue()
+        self.stdout.write(self.style.SUCCESS(f'{total} cuotas marcadas como vencidas'))
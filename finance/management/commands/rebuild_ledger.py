@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from finance.ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = 'Regenera el libro mayor por unidad (LedgerEntry) desde las cuotas y los pagos verificados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unit', type=int, action='append', dest='units',
+                            help='Id de unidad a reconstruir (repetible). Por defecto, todas')
+
+    def handle(self, *args, **options):
+        total = rebuild_ledger(options['units'])
+        self.stdout.write(self.style.SUCCESS(f'{total} movimientos escritos'))
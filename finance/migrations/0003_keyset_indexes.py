@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date', '-id'], name='payment_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_keyset_indexes'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['status', 'due_date'], name='fee_status_due_idx'),
+        ),
+    ]
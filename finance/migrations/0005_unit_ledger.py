@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:35
+
+import heapq
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+LOTE = 2000
+
+
+def poblar_libro(apps, schema_editor):
+    """
+    Historial inicial del libro con los modelos históricos (copia de
+    finance.ledger.write_history al crear la tabla): cuotas y pagos
+    verificados mezclados en streaming por (unidad, fecha).
+    """
+    Fee = apps.get_model('finance', 'Fee')
+    Payment = apps.get_model('finance', 'Payment')
+    LedgerEntry = apps.get_model('finance', 'LedgerEntry')
+
+    cargos = (
+        (unit_id, creado, 0, fee_id, monto, titulo, None)
+        for unit_id, creado, fee_id, monto, titulo in Fee.objects.order_by('unit_id', 'created_at', 'id')
+        .values_list('unit_id', 'created_at', 'id', 'amount', 'title').iterator(chunk_size=LOTE)
+    )
+    abonos = (
+        (unit_id, fecha, 1, fee_id, -monto, 'Pago verificado', payment_id)
+        for unit_id, fecha, payment_id, fee_id, monto in Payment.objects.filter(is_verified=True)
+        .order_by('fee__unit_id', 'payment_date', 'id')
+        .values_list('fee__unit_id', 'payment_date', 'id', 'fee_id', 'amount_paid').iterator(chunk_size=LOTE)
+    )
+
+    lote, unidad_actual, saldo = [], None, Decimal('0')
+    for unit_id, fecha, tipo, fee_id, monto, descripcion, payment_id in heapq.merge(cargos, abonos):
+        if unit_id != unidad_actual:
+            unidad_actual, saldo = unit_id, Decimal('0')
+        saldo += monto
+        lote.append(LedgerEntry(
+            unit_id=unit_id,
+            fee_id=fee_id,
+            payment_id=payment_id,
+            entry_type='PAYMENT' if tipo else 'CHARGE',
+            description=descripcion[:200],
+            amount=monto,
+            balance=saldo,
+            created_at=fecha,
+        ))
+        if len(lote) >= LOTE:
+            LedgerEntry.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        LedgerEntry.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_fee_status_due_index'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('CHARGE', 'Cargo'), ('PAYMENT', 'Pago'), ('ADJUSTMENT', 'Ajuste')], max_length=20)),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='finance.fee')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='finance.payment')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='users.unidadresidencial')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Cuenta',
+                'verbose_name_plural': 'Movimientos de Cuenta',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['unit', 'created_at', 'id'], name='ledger_unit_created_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_libro, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_unit_ledger'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('RUNNING', 'En ejecución'), ('COMPLETED', 'Completado'), ('FAILED', 'Fallido')], default='RUNNING', max_length=20)),
+                ('due_date', models.DateField()),
+                ('units_billed', models.PositiveIntegerField(default=0)),
+                ('fees_created', models.PositiveIntegerField(default=0)),
+                ('fees_skipped', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Generación de Cuotas',
+                'verbose_name_plural': 'Generaciones de Cuotas',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.AddField(
+            model_name='fee',
+            name='billing_period',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fee',
+            name='configuration',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fees', to='finance.feeconfiguration'),
+        ),
+        migrations.AddField(
+            model_name='feeconfiguration',
+            name='scale_by_area',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='fee',
+            constraint=models.UniqueConstraint(condition=models.Q(('billing_period__isnull', False), ('configuration__isnull', False)), fields=('billing_period', 'configuration', 'unit'), name='fee_unique_billing_period'),
+        ),
+        migrations.AddField(
+            model_name='feerun',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
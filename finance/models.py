@@ -1,7 +1,12 @@
 # finance/models.py
 from django.db import models
+from decimal import Decimal
+from django.db.models import (
+    Case, Count, DecimalField, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from users.models import UnidadResidencial
-from datetime import date
 
 
 class FeeConfiguration(models.Model):
@@ -9,6 +14,7 @@ class FeeConfiguration(models.Model):
     name = models.CharField(max_length=100)  # Ej: "Expensa Mensual Básica"
     description = models.TextField(blank=True)
     base_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    scale_by_area = models.BooleanField(default=False)  # Si es True, base_amount es por m² (superficie_m2)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -21,6 +27,65 @@ class FeeConfiguration(models.Model):
         return f"{self.name} - ${self.base_amount}"
 
 
+class FeeQuerySet(models.QuerySet):
+    UNPAID = ('PENDING', 'OVERDUE')
+
+    def _vencida(self, hoy):
+        return Q(status__in=self.UNPAID, due_date__lt=hoy)
+
+    def overdue(self, hoy=None):
+        """Cuotas impagas con fecha de vencimiento anterior a hoy"""
+        return self.filter(self._vencida(hoy or timezone.localdate()))
+
+    def with_overdue(self, hoy=None):
+        """
+        Anota `vencida` y `dias_vencida` (intervalo hoy - due_date) en SQL para
+        que el serializer no recalcule el estado fila por fila.
+        """
+        hoy = hoy or timezone.localdate()
+        return self.annotate(
+            vencida=Case(When(self._vencida(hoy), then=Value(True)), default=Value(False)),
+            dias_vencida=Case(
+                When(self._vencida(hoy), then=ExpressionWrapper(
+                    Value(hoy) - F('due_date'), output_field=DurationField()
+                )),
+                default=None,
+                output_field=DurationField(),
+            ),
+        )
+
+    def with_total_paid(self):
+        """Anota `total_pagado` (pagos verificados) con una subconsulta por cuota"""
+        pagos = (
+            Payment.objects.filter(fee=OuterRef('pk'), is_verified=True)
+            .order_by().values('fee').annotate(total=Sum('amount_paid')).values('total')
+        )
+        return self.annotate(total_pagado=Coalesce(
+            Subquery(pagos), Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2)
+        ))
+
+    def mark_overdue(self, hoy=None):
+        """Pasa a OVERDUE las cuotas PENDING vencidas en un único UPDATE"""
+        return self.filter(status='PENDING', due_date__lt=hoy or timezone.localdate()).update(
+            status='OVERDUE', updated_at=timezone.now()
+        )
+
+    def financial_summary(self, hoy=None):
+        """Totales y conteos de morosidad en una sola consulta agregada"""
+        vencida = self._vencida(hoy or timezone.localdate())
+        pendiente = Q(status__in=self.UNPAID)
+        pagada = Q(status='PAID')
+        return self.aggregate(
+            total_fees=Sum('amount'),
+            total_paid=Sum('amount', filter=pagada),
+            total_pending=Sum('amount', filter=pendiente),
+            total_overdue=Sum('amount', filter=vencida),
+            pending_count=Count('id', filter=pendiente),
+            paid_count=Count('id', filter=pagada),
+            overdue_count=Count('id', filter=vencida),
+        )
+
+
 class Fee(models.Model):
     """Expensas y Cuotas"""
     STATUS_CHOICES = (
@@ -34,25 +99,45 @@ class Fee(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     due_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    # Cuotas generadas por un FeeRun: configuración y mes facturado (primer día del mes)
+    configuration = models.ForeignKey(FeeConfiguration, on_delete=models.SET_NULL, null=True, blank=True, related_name='fees')
+    billing_period = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = FeeQuerySet.as_manager()
     
     class Meta:
         ordering = ['-due_date']
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='fee_status_due_idx'),
+        ]
+        constraints = [
+            # Una sola cuota por unidad, configuración y período facturado
+            models.UniqueConstraint(
+                fields=['billing_period', 'configuration', 'unit'],
+                condition=Q(billing_period__isnull=False, configuration__isnull=False),
+                name='fee_unique_billing_period',
+            ),
+        ]
         verbose_name = "Cuota/Expensa"
         verbose_name_plural = "Cuotas/Expensas"
     
     def __str__(self):
-        return f"{self.title} - Unidad {self.unit.unit_number}"
+        return f"{self.title} - Unidad {self.unit.numero_unidad}"
     
     def is_overdue(self):
-        """Verificar si la cuota está vencida"""
-        return self.status == 'PENDING' and self.due_date < date.today()
+        """Verificar si la cuota está vencida (usa la anotación de with_overdue si existe)"""
+        if hasattr(self, 'vencida'):
+            return self.vencida
+        return self.status in FeeQuerySet.UNPAID and self.due_date < timezone.localdate()
     
     def days_overdue(self):
         """Calcular días de mora"""
+        if hasattr(self, 'dias_vencida'):
+            return self.dias_vencida.days if self.dias_vencida is not None else 0
         if self.is_overdue():
-            return (date.today() - self.due_date).days
+            return (timezone.localdate() - self.due_date).days
         return 0
 
 
@@ -77,8 +162,73 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['-payment_date', '-id'], name='payment_date_id_idx'),
+            models.Index(fields=['is_verified', '-payment_date', '-id'], name='payment_verified_date_idx'),
+        ]
         verbose_name = "Pago"
         verbose_name_plural = "Pagos"
     
     def __str__(self):
         return f"Pago de ${self.amount_paid} - {self.fee.title}"
+
+
+class FeeRun(models.Model):
+    """Generación masiva de cuotas de un período (ver finance.billing)"""
+    STATUS_CHOICES = (
+        ('RUNNING', 'En ejecución'),
+        ('COMPLETED', 'Completado'),
+        ('FAILED', 'Fallido'),
+    )
+
+    period = models.DateField(unique=True)  # Primer día del mes facturado
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RUNNING')
+    due_date = models.DateField()
+    units_billed = models.PositiveIntegerField(default=0)
+    fees_created = models.PositiveIntegerField(default=0)
+    fees_skipped = models.PositiveIntegerField(default=0)  # Ya existían (reintentos)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey('users.Usuario', on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-period']
+        verbose_name = "Generación de Cuotas"
+        verbose_name_plural = "Generaciones de Cuotas"
+
+    def __str__(self):
+        return f"Cuotas {self.period:%m/%Y} - {self.get_status_display()}"
+
+
+class LedgerEntry(models.Model):
+    """
+    Libro mayor por unidad: cada movimiento guarda el saldo acumulado resultante.
+    Saldo positivo = deuda de la unidad. Se escribe solo desde finance.ledger.
+    """
+    ENTRY_TYPE_CHOICES = (
+        ('CHARGE', 'Cargo'),
+        ('PAYMENT', 'Pago'),
+        ('ADJUSTMENT', 'Ajuste'),
+    )
+
+    unit = models.ForeignKey(UnidadResidencial, on_delete=models.CASCADE, related_name='ledger_entries')
+    fee = models.ForeignKey(Fee, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    description = models.CharField(max_length=200, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)  # Cargos positivos, pagos negativos
+    balance = models.DecimalField(max_digits=12, decimal_places=2)  # Saldo después del movimiento
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['unit', 'created_at', 'id'], name='ledger_unit_created_idx'),
+        ]
+        verbose_name = "Movimiento de Cuenta"
+        verbose_name_plural = "Movimientos de Cuenta"
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} ${self.amount} - Unidad {self.unit_id} (saldo ${self.balance})"
@@ -1,18 +1,20 @@
 from rest_framework import serializers
-from .models import Fee, Payment, FeeConfiguration
+from django.db.models import Sum
+from .models import Fee, Payment, FeeConfiguration, FeeRun, LedgerEntry
+from mediastore.fields import ImageVariantsField
 
 
 class FeeConfigurationSerializer(serializers.ModelSerializer):
     """Serializer para configuración de tarifas"""
     class Meta:
         model = FeeConfiguration
-        fields = ['id', 'name', 'description', 'base_amount', 'is_active', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'base_amount', 'scale_by_area', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
 class FeeSerializer(serializers.ModelSerializer):
     """Serializer completo para Fee"""
-    unit_number = serializers.CharField(source='unit.unit_number', read_only=True)
+    unit_number = serializers.CharField(source='unit.numero_unidad', read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
     days_overdue = serializers.IntegerField(read_only=True)
     total_paid = serializers.SerializerMethodField()
@@ -22,13 +24,16 @@ class FeeSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'unit', 'unit_number', 'title', 'description',
             'amount', 'due_date', 'status', 'is_overdue',
-            'days_overdue', 'total_paid', 'created_at', 'updated_at'
+            'days_overdue', 'total_paid', 'configuration', 'billing_period',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'configuration', 'billing_period', 'created_at', 'updated_at']
     
     def get_total_paid(self, obj):
-        """Calcular total pagado para esta cuota"""
-        return sum(payment.amount_paid for payment in obj.payments.filter(is_verified=True))
+        """Total pagado (anotado por FeeQuerySet.with_total_paid o calculado en BD)"""
+        if hasattr(obj, 'total_pagado'):
+            return obj.total_pagado
+        return obj.payments.filter(is_verified=True).aggregate(total=Sum('amount_paid'))['total'] or 0
 
 
 class FeeCreateSerializer(serializers.ModelSerializer):
@@ -41,14 +46,15 @@ class FeeCreateSerializer(serializers.ModelSerializer):
 class PaymentSerializer(serializers.ModelSerializer):
     """Serializer completo para Payment"""
     fee_title = serializers.CharField(source='fee.title', read_only=True)
-    unit_number = serializers.CharField(source='fee.unit.unit_number', read_only=True)
+    unit_number = serializers.CharField(source='fee.unit.numero_unidad', read_only=True)
     verified_by_name = serializers.CharField(source='verified_by.get_full_name', read_only=True)
+    receipt_image_variants = ImageVariantsField(source='receipt_image')
     
     class Meta:
         model = Payment
         fields = [
             'id', 'fee', 'fee_title', 'unit_number', 'payment_date',
-            'amount_paid', 'payment_method', 'receipt_image',
+            'amount_paid', 'payment_method', 'receipt_image', 'receipt_image_variants',
             'is_verified', 'verified_by', 'verified_by_name',
             'notes', 'created_at'
         ]
@@ -71,4 +77,42 @@ class FinancialReportSerializer(serializers.Serializer):
     morosidad_rate = serializers.FloatField()
     pending_count = serializers.IntegerField()
     paid_count = serializers.IntegerField()
-    overdue_count = serializers.IntegerField()
\ No newline at end of file
+    overdue_count = serializers.IntegerField()
+
+
+class LedgerEntrySerializer(serializers.ModelSerializer):
+    """Movimiento del estado de cuenta de una unidad"""
+    class Meta:
+        model = LedgerEntry
+        fields = ['id', 'entry_type', 'description', 'amount', 'balance', 'fee', 'payment', 'created_at']
+        read_only_fields = fields
+
+
+class UnitBalanceSerializer(serializers.Serializer):
+    """Saldo actual de una unidad"""
+    unit = serializers.IntegerField()
+    unit_number = serializers.CharField()
+    balance = serializers.DecimalField(max_digits=12, decimal_places=2)
+    last_movement_at = serializers.DateTimeField(allow_null=True)
+
+
+
+class FeeRunSerializer(serializers.ModelSerializer):
+    """Serializer para generaciones masivas de cuotas"""
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True, default=None)
+
+    class Meta:
+        model = FeeRun
+        fields = [
+            'id', 'period', 'status', 'due_date', 'units_billed', 'fees_created',
+            'fees_skipped', 'total_amount', 'error', 'created_by', 'created_by_name',
+            'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class FeeRunRequestSerializer(serializers.Serializer):
+    """Parámetros para generar las cuotas de un período"""
+    period = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', help_text='YYYY-MM')
+    dry_run = serializers.BooleanField(default=False)
+    due_day = serializers.IntegerField(min_value=1, max_value=31, required=False)
@@ -0,0 +1,106 @@
+# finance/signals.py
+from collections import defaultdict
+
+from django.db import models
+from django.db.models import Sum
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Fee, Payment
+from . import ledger
+
+
+def _borrado_directo(origin):
+    """
+    True si el borrado se originó en una cuota o un pago. Cuando se borra la
+    unidad (o su propietario) el libro de la unidad desaparece por CASCADE y no
+    hay nada que revertir.
+    """
+    modelo = origin._meta.model if isinstance(origin, models.Model) else getattr(origin, 'model', None)
+    return modelo in (Fee, Payment)
+
+
+# ---------- Cuotas ----------
+
+@receiver(pre_save, sender=Fee)
+def capturar_cuota_previa(sender, instance, raw=False, **kwargs):
+    instance._ledger_previo = None
+    if instance.pk and not raw:
+        instance._ledger_previo = Fee.objects.filter(pk=instance.pk).values_list('unit_id', 'amount').first()
+
+
+@receiver(post_save, sender=Fee)
+def registrar_cuota(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, '_ledger_previo', None)
+    if created or previo is None:
+        ledger.post(instance.unit_id, ledger.cargo_cuota(instance))
+        return
+
+    unit_previa, monto_previo = previo
+    if unit_previa != instance.unit_id:
+        # La cuota (y sus pagos verificados) pasan a otra unidad
+        pagado = instance.payments.filter(is_verified=True).aggregate(total=Sum('amount_paid'))['total'] or 0
+        ledger.post_entries({
+            unit_previa: [ledger.ajuste_cuota(instance, pagado - monto_previo, f'Cuota trasladada: {instance.title}')],
+            instance.unit_id: [ledger.ajuste_cuota(instance, instance.amount - pagado, f'Cuota recibida: {instance.title}')],
+        })
+    elif monto_previo != instance.amount:
+        ledger.post(instance.unit_id, ledger.ajuste_cuota(
+            instance, instance.amount - monto_previo, f'Cambio de monto: {instance.title}'
+        ))
+
+
+@receiver(post_delete, sender=Fee)
+def revertir_cuota(sender, instance, origin=None, **kwargs):
+    if _borrado_directo(origin):
+        ledger.post(instance.unit_id, ledger.ajuste_cuota(
+            instance, -instance.amount, f'Cuota eliminada: {instance.title}', conservar_fee=False
+        ))
+
+
+# ---------- Pagos ----------
+
+def _estado_pago(payment):
+    """(unit_id, fee_id, monto) si el pago está verificado, None si no cuenta en el libro"""
+    if not payment.is_verified:
+        return None
+    return (payment.fee.unit_id, payment.fee_id, payment.amount_paid)
+
+
+@receiver(pre_save, sender=Payment)
+def capturar_pago_previo(sender, instance, raw=False, **kwargs):
+    instance._ledger_previo = None
+    if instance.pk and not raw:
+        instance._ledger_previo = (
+            Payment.objects.filter(pk=instance.pk, is_verified=True)
+            .values_list('fee__unit_id', 'fee_id', 'amount_paid').first()
+        )
+
+
+@receiver(post_save, sender=Payment)
+def registrar_pago(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previo = getattr(instance, '_ledger_previo', None)
+    actual = _estado_pago(instance)
+    if previo == actual:
+        return
+
+    movimientos = defaultdict(list)
+    if previo is not None:
+        unit_id, fee_id, monto = previo
+        movimientos[unit_id].append(ledger.reversion_pago(monto, fee_id=fee_id, payment_id=instance.pk))
+    if actual is not None:
+        movimientos[actual[0]].append(ledger.pago(instance, fee_id=instance.fee_id))
+    ledger.post_entries(movimientos)
+
+
+@receiver(post_delete, sender=Payment)
+def revertir_pago(sender, instance, origin=None, **kwargs):
+    if not instance.is_verified or not _borrado_directo(origin):
+        return
+    # Si se borra la cuota completa, la referencia a la cuota tampoco sobrevive
+    fee_id = instance.fee_id if isinstance(origin, Payment) or getattr(origin, 'model', None) is Payment else None
+    ledger.post(instance.fee.unit_id, ledger.reversion_pago(instance.amount_paid, fee_id=fee_id))
@@ -1,3 +1,38 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.authentication import tokens_for
+from users.models import UnidadResidencial, Usuario
+from .models import Fee, Payment
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = Usuario.objects.create_user(username='adm', email='adm@x.com', password='p', rol='ADMIN')
+        self.unidad = UnidadResidencial.objects.create(numero_unidad='U1', propietario=self.admin)
+        vencimiento = timezone.now().date() - timedelta(days=10)
+        for numero in range(3):
+            fee = Fee.objects.create(unit=self.unidad, title=f'Expensa {numero}', amount=Decimal('100'), due_date=vencimiento)
+            Payment.objects.create(fee=fee, amount_paid=Decimal('40'))
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for(self.admin).access_token}')
+
+    def test_cuotas_dentro_del_presupuesto(self):
+        fee = Fee.objects.first()
+        for url in ('/api/finance/fees/', f'/api/finance/fees/{fee.pk}/', '/api/finance/fees/overdue/',
+                    f'/api/finance/fees/by_unit/?unit_id={self.unidad.pk}'):
+            with self.subTest(url=url):
+                self.assertEqual(self.cliente.get(url).status_code, 200)
+
+    def test_cuenta_corriente_dentro_del_presupuesto(self):
+        for url in (f'/api/finance/accounts/{self.unidad.pk}/', f'/api/finance/accounts/{self.unidad.pk}/statement/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.cliente.get(url).status_code, 200)
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FeeConfigurationViewSet, FeeViewSet, PaymentViewSet
+from .views import FeeConfigurationViewSet, FeeRunViewSet, FeeViewSet, PaymentViewSet, UnitAccountViewSet
 
 router = DefaultRouter()
 router.register(r'configurations', FeeConfigurationViewSet, basename='fee-configuration')
+router.register(r'fee-runs', FeeRunViewSet, basename='fee-run')
 router.register(r'fees', FeeViewSet, basename='fee')
 router.register(r'payments', PaymentViewSet, basename='payment')
+router.register(r'accounts', UnitAccountViewSet, basename='unit-account')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,19 +1,32 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Q, Count
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
 from decimal import Decimal
-from .models import Fee, Payment, FeeConfiguration
+from .models import Fee, Payment, FeeConfiguration, FeeRun
 from .serializers import (
     FeeSerializer, FeeCreateSerializer,
     PaymentSerializer, PaymentCreateSerializer,
-    FeeConfigurationSerializer, FinancialReportSerializer
+    FeeConfigurationSerializer, FinancialReportSerializer,
+    LedgerEntrySerializer, UnitBalanceSerializer,
+    FeeRunSerializer, FeeRunRequestSerializer
 )
+from . import billing, ledger
+from users.models import UnidadResidencial
+from smartcondominioia.pagination import PaymentDateCursorPagination, LedgerCursorPagination
+from smartcondominioia.metrics import InstrumentedViewMixin
+from smartcondominioia.export import Column, ExportMixin
+from smartcondominioia.filters import TypedQueryFilter
 from users.permissions import IsAdmin, CanManageFinances
+from users.scoping import UnitScopedQuerysetMixin
 
 
-class FeeConfigurationViewSet(viewsets.ModelViewSet):
+class FeeConfigurationViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de configuraciones de tarifas
     Solo accesible por administradores
@@ -26,11 +39,43 @@ class FeeConfigurationViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'base_amount', 'created_at']
 
 
-class FeeViewSet(viewsets.ModelViewSet):
+class FeeRunViewSet(InstrumentedViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para la generación masiva de cuotas por período
+    Solo accesible por administradores
+    Endpoints:
+    - GET /fee-runs/ - Historial de generaciones
+    - GET /fee-runs/{id}/ - Detalle de una generación
+    - POST /fee-runs/generate/ - Generar cuotas del período
+      Body: {"period": "2025-11", "dry_run": false, "due_day": 10}
+    """
+    queryset = FeeRun.objects.select_related('created_by')
+    permission_classes = [IsAdmin]
+    serializer_class = FeeRunSerializer
+    
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """Generar (o simular con dry_run) las cuotas de todas las unidades activas"""
+        parametros = FeeRunRequestSerializer(data=request.data)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+        reporte = billing.generate_fees(
+            datos['period'],
+            dry_run=datos['dry_run'],
+            due_day=datos.get('due_day'),
+            usuario=request.user,
+        )
+        return Response(
+            reporte,
+            status=status.HTTP_200_OK if datos['dry_run'] else status.HTTP_201_CREATED
+        )
+
+
+class FeeViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de cuotas/expensas
     Endpoints:
-    - GET /fees/ - Listar todas las cuotas
+    - GET /fees/ - Listar cuotas (RESIDENTE: solo las de sus unidades)
     - POST /fees/ - Crear nueva cuota
     - GET /fees/{id}/ - Obtener detalle de cuota
     - PUT /fees/{id}/ - Actualizar cuota
@@ -42,8 +87,13 @@ class FeeViewSet(viewsets.ModelViewSet):
     queryset = Fee.objects.all()
     permission_classes = [CanManageFinances]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'unit__unit_number']
+    search_fields = ['title', 'unit__numero_unidad']
     ordering_fields = ['due_date', 'amount', 'created_at']
+    unit_scope_resource = 'finanzas'
+    query_budgets = {'list': 4, 'retrieve': 3, 'overdue': 3, 'by_unit': 3}
+    
+    def get_queryset(self):
+        return self.scope_to_units(Fee.objects.select_related('unit').with_overdue().with_total_paid())
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -53,19 +103,15 @@ class FeeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_fees(self, request):
         """Obtener cuotas de las unidades del usuario actual"""
-        user = request.user
-        fees = Fee.objects.filter(
-            Q(unit__owner=user) | Q(unit__residents=user)
-        ).distinct()
+        fees = self.own_units(self.get_queryset()).order_by('due_date', 'id')
         serializer = FeeSerializer(fees, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def overdue(self, request):
-        """Obtener todas las cuotas vencidas"""
-        fees = Fee.objects.filter(status='PENDING')
-        overdue_fees = [fee for fee in fees if fee.is_overdue()]
-        serializer = FeeSerializer(overdue_fees, many=True)
+        """Obtener todas las cuotas vencidas (PENDING u OVERDUE con due_date < hoy)"""
+        fees = self.get_queryset().overdue().order_by('due_date', 'id')
+        serializer = FeeSerializer(fees, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -84,7 +130,7 @@ class FeeViewSet(viewsets.ModelViewSet):
         """Filtrar cuotas por unidad"""
         unit_id = request.query_params.get('unit_id')
         if unit_id:
-            fees = Fee.objects.filter(unit_id=unit_id)
+            fees = self.get_queryset().filter(unit_id=unit_id)
             serializer = FeeSerializer(fees, many=True)
             return Response(serializer.data)
         return Response(
@@ -93,23 +139,50 @@ class FeeViewSet(viewsets.ModelViewSet):
         )
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, ExportMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de pagos
     Endpoints:
-    - GET /payments/ - Listar todos los pagos
+    - GET /payments/ - Listar pagos, RESIDENTE solo los de sus unidades (filtros: payment_method, is_verified, unit, fee)
     - POST /payments/ - Registrar nuevo pago
     - GET /payments/{id}/ - Obtener detalle de pago
     - PUT /payments/{id}/ - Actualizar pago
     - DELETE /payments/{id}/ - Eliminar pago
     - POST /payments/{id}/verify/ - Verificar pago
     - GET /payments/my_payments/ - Obtener pagos del usuario
+    - GET /payments/export/?output=csv|ndjson|parquet&from=YYYY-MM-DD&to=YYYY-MM-DD - Exportación en streaming
+      (solo administradores; mismos filtros)
     """
-    queryset = Payment.objects.all()
+    # fee: unidad del pago para los permisos por objeto y el serializer
+    queryset = Payment.objects.select_related('fee', 'fee__unit', 'verified_by')
     permission_classes = [CanManageFinances]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['fee__title', 'fee__unit__unit_number']
+    pagination_class = PaymentDateCursorPagination
+    ordering = ['-payment_date', '-id']
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['fee__title', 'fee__unit__numero_unidad']
     ordering_fields = ['payment_date', 'amount_paid']
+    unit_scope_resource = 'finanzas'
+    unit_scope_field = 'fee__unit_id'
+    export_permission_classes = [IsAdmin]
+    export_date_field = 'payment_date'
+    export_columns = [
+        Column('id', 'id', 'int'),
+        Column('payment_date', 'payment_date', 'datetime'),
+        Column('unit', 'fee__unit__numero_unidad', 'str'),
+        Column('fee_id', 'fee_id', 'int'),
+        Column('fee', 'fee__title', 'str'),
+        Column('amount_paid', 'amount_paid', 'decimal'),
+        Column('payment_method', 'payment_method', 'str'),
+        Column('is_verified', 'is_verified', 'bool'),
+        Column('verified_by', 'verified_by__username', 'str'),
+        Column('notes', 'notes', 'str'),
+    ]
+    query_filters = {
+        'payment_method': ('payment_method', serializers.ChoiceField(choices=Payment.PAYMENT_METHOD_CHOICES)),
+        'is_verified': ('is_verified', serializers.BooleanField()),
+        'unit': ('fee__unit_id', serializers.IntegerField()),
+        'fee': ('fee_id', serializers.IntegerField()),
+    }
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -120,16 +193,18 @@ class PaymentViewSet(viewsets.ModelViewSet):
     def verify(self, request, pk=None):
         """Verificar un pago (solo administradores)"""
         payment = self.get_object()
-        payment.is_verified = True
-        payment.verified_by = request.user
-        payment.save()
-        
-        # Actualizar estado de la cuota si está completamente pagada
-        fee = payment.fee
-        total_paid = sum(p.amount_paid for p in fee.payments.filter(is_verified=True))
-        if total_paid >= fee.amount:
-            fee.status = 'PAID'
-            fee.save()
+        with transaction.atomic():
+            # El libro mayor de la unidad se actualiza en la misma transacción (signals)
+            payment.is_verified = True
+            payment.verified_by = request.user
+            payment.save()
+            
+            # Actualizar estado de la cuota si está completamente pagada
+            fee = payment.fee
+            total_paid = fee.payments.filter(is_verified=True).aggregate(total=Sum('amount_paid'))['total'] or 0
+            if total_paid >= fee.amount:
+                fee.status = 'PAID'
+                fee.save()
         
         return Response(
             {"message": "Pago verificado correctamente"},
@@ -139,40 +214,74 @@ class PaymentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_payments(self, request):
         """Obtener pagos del usuario actual"""
-        user = request.user
-        payments = Payment.objects.filter(
-            Q(fee__unit__owner=user) | Q(fee__unit__residents=user)
-        ).distinct()
+        payments = self.own_units(self.get_queryset())
         serializer = PaymentSerializer(payments, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def financial_report(self, request):
-        """Generar reporte financiero general"""
-        fees = Fee.objects.all()
-        
-        total_fees = fees.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        paid_fees = fees.filter(status='PAID')
-        pending_fees = fees.filter(status='PENDING')
-        
-        total_paid = paid_fees.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        total_pending = pending_fees.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        overdue_fees = [fee for fee in pending_fees if fee.is_overdue()]
-        total_overdue = sum(fee.amount for fee in overdue_fees)
+        """Generar reporte financiero general (una sola consulta agregada)"""
+        report_data = Fee.objects.financial_summary()
+        for campo in ('total_fees', 'total_paid', 'total_pending', 'total_overdue'):
+            report_data[campo] = report_data[campo] or Decimal('0')
         
+        total_fees = report_data['total_fees']
+        total_overdue = report_data['total_overdue']
         morosidad_rate = (float(total_overdue) / float(total_fees) * 100) if total_fees > 0 else 0
-        
-        report_data = {
-            'total_fees': total_fees,
-            'total_paid': total_paid,
-            'total_pending': total_pending,
-            'total_overdue': total_overdue,
-            'morosidad_rate': round(morosidad_rate, 2),
-            'pending_count': pending_fees.count(),
-            'paid_count': paid_fees.count(),
-            'overdue_count': len(overdue_fees),
-        }
+        report_data['morosidad_rate'] = round(morosidad_rate, 2)
         
         serializer = FinancialReportSerializer(report_data)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+class UnitAccountViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, viewsets.GenericViewSet):
+    """
+    Estado de cuenta por unidad, servido desde el libro mayor (LedgerEntry)
+    Endpoints:
+    - GET /accounts/{unit_id}/ - Saldo actual de la unidad
+    - GET /accounts/{unit_id}/statement/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD - Movimientos (paginado por cursor)
+    """
+    queryset = UnidadResidencial.objects.all()
+    permission_classes = [CanManageFinances]
+    pagination_class = LedgerCursorPagination
+    serializer_class = LedgerEntrySerializer
+    filter_backends = []
+    unit_scope_resource = 'finanzas'
+    unit_scope_field = 'id'
+    query_budgets = {'retrieve': 4, 'statement': 4}
+    
+    def retrieve(self, request, pk=None):
+        """Saldo actual de la unidad (positivo = deuda)"""
+        unit = self.get_object()
+        ultimo = ledger.statement(unit.pk).only('balance', 'created_at').last()
+        serializer = UnitBalanceSerializer({
+            'unit': unit.pk,
+            'unit_number': unit.numero_unidad,
+            'balance': ultimo.balance if ultimo else Decimal('0'),
+            'last_movement_at': ultimo.created_at if ultimo else None,
+        })
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """Movimientos de la unidad con saldo acumulado, en orden cronológico"""
+        unit = self.get_object()
+        limites = {}
+        for param in ('desde', 'hasta'):
+            valor = request.query_params.get(param)
+            if not valor:
+                continue
+            fecha = parse_date(valor)
+            if fecha is None:
+                return Response(
+                    {"error": f"El parámetro '{param}' debe tener formato YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if param == 'hasta':
+                fecha += timedelta(days=1)  # 'hasta' es inclusivo
+            limites[param] = timezone.make_aware(datetime.combine(fecha, time.min))
+        
+        movimientos = ledger.statement(unit.pk, **limites)
+        page = self.paginate_queryset(movimientos)
+        serializer = LedgerEntrySerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import ImageAsset, Blob
+
+
+@admin.register(ImageAsset)
+class ImageAssetAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'width', 'height', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['status']
+    search_fields = ['name', 'sha256']
+    readonly_fields = ['sha256', 'width', 'height', 'derivatives', 'attempts', 'error', 'locked_by', 'heartbeat_at', 'processed_at']
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'refcount', 'created_at', 'updated_at']
+    search_fields = ['name', 'sha256']
+    readonly_fields = ['sha256', 'name', 'size', 'refcount']
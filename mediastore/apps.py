@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class MediastoreConfig(AppConfig):
+    name = 'mediastore'
+
+    def ready(self):
+        from . import signals  # noqa: F401
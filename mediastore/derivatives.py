@@ -0,0 +1,277 @@
+# mediastore/derivatives.py
+"""
+Derivados (miniatura y tamaño medio) de las imágenes subidas, en segundo plano.
+
+Al guardar un modelo de IMAGE_FIELDS con imagen nueva se encola su ruta en
+ImageAsset; un worker la procesa después del commit:
+
+- calcula el sha256 del original; si otra imagen con el mismo contenido ya
+  está lista, reutiliza sus derivados sin decodificar nada;
+- decodifica una sola vez (en JPEG con `draft`, ya reducido al tamaño mayor
+  pedido), aplica la orientación EXIF y genera cada tamaño de
+  IMAGE_DERIVATIVE_SIZES en cada formato de IMAGE_DERIVATIVE_FORMATS;
+- los derivados se guardan sin EXIF (ubicación GPS, cámara, etc.). El
+  original no se modifica: es la evidencia subida.
+
+El original se lee y los derivados se escriben en el storage del campo
+(ImageAsset.storage guarda su alias de STORAGES).
+
+La cola es la tabla ImageAsset (sin broker externo) y los trabajos los
+ejecuta un pool de hilos local (IMAGE_RUN_IN_PROCESS) o el comando
+`manage.py process_images`.
+"""
+import hashlib
+import io
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ImageAsset
+
+logger = logging.getLogger(__name__)
+
+# Campos de imagen con derivados: 'app.Modelo' -> campos
+IMAGE_FIELDS = {
+    'users.Usuario': ('foto',),
+    'security.AccessLog': ('visitor_photo',),
+    'security.SecurityIncident': ('evidence_image',),
+    'finance.Payment': ('receipt_image',),
+    'areas.CommonArea': ('image',),
+    'communication.Announcement': ('image',),
+}
+
+FORMATOS = {
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'optimize': True, 'progressive': True}),
+}
+
+ORIENTACION = 0x0112  # Tag EXIF Orientation
+
+# Errores que no se resuelven reintentando
+ERRORES_PERMANENTES = (FileNotFoundError, UnidentifiedImageError, Image.DecompressionBombError)
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def sizes():
+    return _config('IMAGE_DERIVATIVE_SIZES', {'thumb': 200, 'medium': 800})
+
+
+def formats():
+    return _config('IMAGE_DERIVATIVE_FORMATS', ('webp', 'jpeg'))
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def storage_alias(storage):
+    """Alias de STORAGES de un storage ('default' si el campo usa el storage por defecto)"""
+    for alias in settings.STORAGES:
+        if storages[alias] is storage:
+            return alias
+    return 'default'
+
+
+def tracked_fields():
+    """(modelo, campo) de cada campo de imagen con derivados"""
+    for etiqueta, campos in IMAGE_FIELDS.items():
+        modelo = apps.get_model(etiqueta)
+        for campo in campos:
+            yield modelo, campo
+
+
+# ---------- Encolado ----------
+
+def enqueue(names, storage='default'):
+    """Encola las rutas (del storage con ese alias) que aún no tienen ImageAsset. Retorna cuántas se enviaron."""
+    names = {name for name in names if name}
+    if not names:
+        return 0
+    ImageAsset.objects.bulk_create(
+        [ImageAsset(name=name, storage=storage) for name in names], ignore_conflicts=True
+    )
+    transaction.on_commit(kick)
+    return len(names)
+
+
+# ---------- Generación ----------
+
+def _leer(storage, name):
+    """Contenido del original y su sha256"""
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    with storage.open(name, 'rb') as archivo:
+        for bloque in archivo.chunks():
+            digest.update(bloque)
+            buffer.write(bloque)
+    buffer.seek(0)
+    return buffer, digest.hexdigest()
+
+
+def _preparar(imagen, formato):
+    """Modo compatible con el formato; JPEG no tiene transparencia (fondo blanco)"""
+    transparente = imagen.mode in ('RGBA', 'LA', 'PA') or (imagen.mode == 'P' and 'transparency' in imagen.info)
+    if formato == 'webp':
+        return imagen.convert('RGBA' if transparente else 'RGB')
+    if transparente:
+        rgba = imagen.convert('RGBA')
+        fondo = Image.new('RGB', rgba.size, (255, 255, 255))
+        fondo.paste(rgba, mask=rgba.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def derivative_path(sha256, size, formato):
+    return f'derivatives/{sha256[:2]}/{sha256}/{size}.{FORMATOS[formato][1]}'
+
+
+def generate(buffer, sha256, storage):
+    """Genera y guarda los derivados en el storage. Retorna (derivatives, ancho, alto) del original."""
+    tamanios = sorted(sizes().items(), key=lambda item: item[1], reverse=True)
+    imagen = Image.open(buffer)
+    ancho, alto = imagen.size
+    if imagen.getexif().get(ORIENTACION) in (5, 6, 7, 8):  # Rotada 90°: se intercambian los lados
+        ancho, alto = alto, ancho
+    imagen.draft('RGB', (tamanios[0][1], tamanios[0][1]))  # Solo JPEG: decodifica ya reducido
+    imagen = ImageOps.exif_transpose(imagen)
+    icc = imagen.info.get('icc_profile')
+    calidad = _config('IMAGE_DERIVATIVE_QUALITY', 80)
+
+    derivados = {}
+    actual = imagen
+    for nombre, lado in tamanios:  # Del mayor al menor, cada uno desde el anterior
+        actual = actual.copy()
+        actual.thumbnail((lado, lado), Image.LANCZOS)
+        actual.info = {}  # Sin EXIF ni metadatos del original
+        derivados[nombre] = {}
+        for formato in formats():
+            ruta = derivative_path(sha256, nombre, formato)
+            if not storage.exists(ruta):
+                salida = io.BytesIO()
+                pil_formato, _, opciones = FORMATOS[formato]
+                extra = {'icc_profile': icc} if icc else {}
+                _preparar(actual, formato).save(salida, pil_formato, quality=calidad, **opciones, **extra)
+                ruta = storage.save(ruta, ContentFile(salida.getvalue()))
+            derivados[nombre][formato] = ruta
+    return derivados, ancho, alto
+
+
+# ---------- Cola ----------
+
+def claim_asset(worker=None):
+    """Toma la siguiente imagen pendiente o abandonada por un worker caído"""
+    ahora = timezone.now()
+    abandonado = ahora - timedelta(seconds=_config('IMAGE_STALE_AFTER', 300))
+    with transaction.atomic():
+        asset = (
+            ImageAsset.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING') | Q(status='RUNNING', heartbeat_at__lt=abandonado))
+            .order_by('created_at', 'id').first()
+        )
+        if asset is None:
+            return None
+        asset.status = 'RUNNING'
+        asset.locked_by = worker or worker_id()
+        asset.heartbeat_at = ahora
+        asset.attempts += 1
+        asset.save(update_fields=['status', 'locked_by', 'heartbeat_at', 'attempts'])
+    return asset
+
+
+def process_asset(asset):
+    """Genera (o reutiliza por sha256) los derivados de una imagen tomada"""
+    storage = storages[asset.storage]
+    buffer, sha256 = _leer(storage, asset.name)
+    listo = (
+        ImageAsset.objects.filter(sha256=sha256, storage=asset.storage, status='READY')
+        .exclude(pk=asset.pk).values('derivatives', 'width', 'height').first()
+    )
+    if listo and all(len(listo['derivatives'].get(nombre, {})) == len(formats()) for nombre in sizes()):
+        derivados, ancho, alto = listo['derivatives'], listo['width'], listo['height']
+    else:
+        derivados, ancho, alto = generate(buffer, sha256, storage)
+
+    ImageAsset.objects.filter(pk=asset.pk, locked_by=asset.locked_by).update(
+        sha256=sha256,
+        derivatives=derivados,
+        width=ancho,
+        height=alto,
+        status='READY',
+        error='',
+        processed_at=timezone.now(),
+    )
+
+
+def run_asset(asset):
+    """Procesa una imagen tomada; ante un error la reencola hasta IMAGE_MAX_ATTEMPTS"""
+    try:
+        process_asset(asset)
+        return True
+    except Exception as exc:
+        permanente = isinstance(exc, ERRORES_PERMANENTES)
+        if not permanente:
+            logger.exception('Fallo al generar los derivados de %s', asset.name)
+        agotado = permanente or asset.attempts >= _config('IMAGE_MAX_ATTEMPTS', 3)
+        ImageAsset.objects.filter(pk=asset.pk, locked_by=asset.locked_by).update(
+            status='FAILED' if agotado else 'PENDING',
+            error=f'{type(exc).__name__}: {exc}'[:2000],
+            processed_at=timezone.now() if agotado else None,
+        )
+        return False
+
+
+def run_pending(max_assets=None, worker=None):
+    """Procesa imágenes de la cola hasta vaciarla. Retorna la cantidad procesada."""
+    procesadas = 0
+    while max_assets is None or procesadas < max_assets:
+        asset = claim_asset(worker)
+        if asset is None:
+            break
+        run_asset(asset)
+        procesadas += 1
+    return procesadas
+
+
+# ---------- Pool local ----------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _trabajar():
+    close_old_connections()
+    try:
+        run_pending()
+    except Exception:
+        logger.exception('Error en el worker local de imágenes')
+    finally:
+        connections.close_all()
+
+
+def kick():
+    """Despierta el pool local de workers (si IMAGE_RUN_IN_PROCESS está habilitado)"""
+    global _pool
+    if not _config('IMAGE_RUN_IN_PROCESS', True):
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=_config('IMAGE_WORKERS', 2),
+                thread_name_prefix='images'
+            )
+    return _pool.submit(_trabajar)
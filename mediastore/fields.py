@@ -0,0 +1,78 @@
+# mediastore/fields.py
+"""
+Campo de serializer con las URLs de los derivados de una imagen:
+
+    evidence_image_variants = ImageVariantsField(source='evidence_image')
+
+    -> {'thumb': {'webp': url, 'jpeg': url}, 'medium': {...}}
+
+Es None mientras los derivados no están listos (el cliente usa el original).
+En listados, la primera fila carga los derivados de todas las filas del
+serializer raíz en una sola consulta.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework import serializers
+from rest_framework.fields import get_attribute
+
+from .models import ImageAsset
+
+
+class ImageVariantsField(serializers.Field):
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def _atributos_desde_raiz(self):
+        """source_attrs desde cada fila del listado raíz hasta este campo (None si no aplica)"""
+        raiz = self.root
+        if not isinstance(raiz, serializers.ListSerializer) or raiz.instance is None:
+            return None
+        atributos = list(self.source_attrs)
+        nodo = self.parent
+        while nodo.parent is not raiz:
+            if isinstance(nodo.parent, serializers.ListSerializer):
+                return None  # Anidado en otro listado (many=True)
+            atributos = list(nodo.source_attrs) + atributos
+            nodo = nodo.parent
+        return atributos
+
+    def _nombres_del_listado(self):
+        """Rutas del mismo campo en todas las filas del serializer raíz"""
+        atributos = self._atributos_desde_raiz()
+        if atributos is None:
+            return set()
+        nombres = set()
+        for objeto in self.root.instance:
+            try:
+                nombres.add(get_attribute(objeto, atributos).name)
+            except (AttributeError, KeyError, ObjectDoesNotExist):
+                continue  # Relación vacía en esta fila
+        return nombres
+
+    def _derivados(self, nombre):
+        cache = self.root.__dict__.setdefault('_image_variants', {})
+        if nombre not in cache:
+            nombres = (self._nombres_del_listado() | {nombre}) - set(cache)
+            nombres.discard('')
+            cache.update(dict.fromkeys(nombres))
+            cache.update(
+                ImageAsset.objects.filter(name__in=nombres, status='READY').values_list('name', 'derivatives')
+            )
+        return cache[nombre]
+
+    def _url(self, storage, ruta):
+        url = storage.url(ruta)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        derivados = self._derivados(value.name)
+        if not derivados:
+            return None
+        return {
+            tamanio: {formato: self._url(value.storage, ruta) for formato, ruta in rutas.items()}
+            for tamanio, rutas in derivados.items()
+        }
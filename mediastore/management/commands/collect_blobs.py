@@ -0,0 +1,40 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from mediastore.models import Blob
+from mediastore.storage import content_addressed_fields, evidence_storage
+
+
+class Command(BaseCommand):
+    help = 'Elimina los blobs sin referencias del almacenamiento por contenido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=None,
+                            help='Segundos sin referencias antes de borrar (por defecto COLLECT_BLOBS_GRACE_SECONDS)')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recalcula las referencias desde la BD antes de borrar (ejecutar sin subidas en curso)')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            corregidos = self._recontar()
+            self.stdout.write(f'{corregidos} blobs con referencias corregidas')
+        borrados = evidence_storage().collect_garbage(options['grace'])
+        self.stdout.write(self.style.SUCCESS(f'{borrados} blobs eliminados'))
+
+    def _recontar(self):
+        referencias = Counter()
+        for modelo, campo in content_addressed_fields():
+            filas = (
+                modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                .values_list(campo).annotate(n=Count('pk')).order_by()
+            )
+            referencias.update(dict(filas))
+
+        corregidos = 0
+        for pk, nombre, refcount in Blob.objects.values_list('pk', 'name', 'refcount').iterator(chunk_size=2000):
+            if referencias[nombre] != refcount:
+                Blob.objects.filter(pk=pk).update(refcount=referencias[nombre])
+                corregidos += 1
+        return corregidos
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from mediastore.derivatives import enqueue, storage_alias
+from mediastore.models import Blob
+from mediastore.storage import PREFIJO, content_addressed_fields
+
+
+class Command(BaseCommand):
+    help = 'Mueve los archivos existentes de los campos de evidencia al almacenamiento por contenido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help='No borra los archivos originales')
+
+    def handle(self, *args, **options):
+        for modelo, campo in content_addressed_fields():
+            storage = modelo._meta.get_field(campo).storage
+            nombres = (
+                modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                .exclude(**{f'{campo}__startswith': f'{PREFIJO}/'})
+                .values_list(campo, flat=True).distinct().order_by()
+            )
+            movidos = faltantes = filas = 0
+            for nombre in list(nombres):
+                try:
+                    with storage.open(nombre, 'rb') as original:
+                        blob = storage.save(nombre, original)  # Una referencia
+                except FileNotFoundError:
+                    faltantes += 1
+                    continue
+                with transaction.atomic():
+                    actualizadas = modelo.objects.filter(**{campo: nombre}).update(**{campo: blob})
+                    # Una referencia por fila que apunta al archivo
+                    Blob.objects.filter(name=blob).update(refcount=F('refcount') + actualizadas - 1)
+                enqueue([blob], storage_alias(storage))
+                if not options['keep_originals']:
+                    storage.delete(nombre)
+                movidos += 1
+                filas += actualizadas
+            self.stdout.write(
+                f'{modelo._meta.label}.{campo}: {movidos} archivos ({filas} filas), {faltantes} no encontrados'
+            )
+        self.stdout.write(self.style.SUCCESS('Migración al almacenamiento por contenido completa'))
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from mediastore.derivatives import enqueue, run_pending, storage_alias, tracked_fields
+
+
+class Command(BaseCommand):
+    help = 'Genera los derivados (miniaturas WebP/JPEG) de las imágenes subidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='Encola las imágenes existentes sin derivados')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rutas por inserción al encolar')
+        parser.add_argument('--once', action='store_true', help='Vacía la cola y termina')
+        parser.add_argument('--interval', type=float, default=5, help='Segundos entre sondeos de la cola')
+        parser.add_argument('--threads', type=int, default=1, help='Hilos de trabajo')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self._backfill(options['batch_size'])
+
+        if options['once']:
+            total = run_pending()
+            self.stdout.write(self.style.SUCCESS(f'{total} imágenes procesadas'))
+            return
+
+        hilos = [
+            threading.Thread(target=self._bucle, args=(options['interval'],), daemon=True)
+            for _ in range(max(options['threads'], 1))
+        ]
+        for hilo in hilos:
+            hilo.start()
+        self.stdout.write(f'Worker de imágenes iniciado ({len(hilos)} hilos)')
+        try:
+            for hilo in hilos:
+                hilo.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido')
+
+    def _backfill(self, tamanio):
+        for modelo, campo in tracked_fields():
+            alias = storage_alias(modelo._meta.get_field(campo).storage)
+            rutas = (
+                modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                .values_list(campo, flat=True).order_by().iterator(chunk_size=tamanio)
+            )
+            lote, total = [], 0
+            for ruta in rutas:
+                lote.append(ruta)
+                if len(lote) >= tamanio:
+                    total += enqueue(lote, alias)
+                    lote = []
+            total += enqueue(lote, alias)
+            self.stdout.write(f'{modelo._meta.label}.{campo}: {total} imágenes encoladas')
+
+    def _bucle(self, intervalo):
+        while True:
+            try:
+                total = run_pending()
+            finally:
+                connections.close_all()
+            if total:
+                self.stdout.write(f'{total} imágenes procesadas')
+            else:
+                time.sleep(intervalo)
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+def marcar_evidencia(apps, schema_editor):
+    """Las imágenes ya subidas al almacenamiento por contenido (blobs/) son del storage 'evidence'"""
+    ImageAsset = apps.get_model('mediastore', 'ImageAsset')
+    ImageAsset.objects.filter(name__startswith='blobs/').update(storage='evidence')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediastore', '0002_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageasset',
+            name='storage',
+            field=models.CharField(default='default', max_length=50),
+        ),
+        migrations.RunPython(marcar_evidencia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+from django.db import models
+
+
+class ImageAsset(models.Model):
+    """
+    Imagen subida (por su ruta en el storage) y sus derivados (miniaturas).
+    La tabla es también la cola de procesamiento: los workers toman filas
+    PENDING con SELECT ... FOR UPDATE SKIP LOCKED (ver mediastore.derivatives).
+
+    derivatives: {'thumb': {'webp': ruta, 'jpeg': ruta}, 'medium': {...}}.
+    Las rutas dependen solo del sha256 del contenido, así que dos subidas
+    iguales comparten los mismos archivos derivados.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pendiente'),
+        ('RUNNING', 'En proceso'),
+        ('READY', 'Listo'),
+        ('FAILED', 'Fallido'),
+    )
+
+    name = models.CharField(max_length=255, unique=True)  # Ruta del original en el storage
+    storage = models.CharField(max_length=50, default='default')  # Alias de STORAGES del original y sus derivados
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    derivatives = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='imageasset_status_created_idx'),
+        ]
+        verbose_name = "Imagen"
+        verbose_name_plural = "Imágenes"
+
+    def __str__(self):
+        return f"{self.name} - {self.get_status_display()}"
+
+
+class Blob(models.Model):
+    """
+    Archivo único por contenido en ContentAddressedStorage.
+    refcount: referencias guardadas (cada subida suma una, cada delete() del
+    storage resta una). Con refcount 0 el archivo queda huérfano y lo borra
+    `manage.py collect_blobs` pasado un margen de gracia. Puede quedar
+    sobrecontado (ver mediastore.storage): `collect_blobs --recount` lo corrige.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=100, unique=True)  # Ruta en el storage: blobs/ab/cd/<sha256>.<ext>
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at'], name='blob_refcount_updated_idx'),
+        ]
+        verbose_name = "Blob"
+        verbose_name_plural = "Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} referencias)"
@@ -0,0 +1,96 @@
+# mediastore/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from . import derivatives
+from .storage import content_addressed_fields
+
+
+# ---------- Rutas previas (derivados y blobs) ----------
+
+def capturar_rutas_previas(campos):
+    def receptor(sender, instance, raw=False, update_fields=None, **kwargs):
+        """Rutas guardadas en la BD de los campos que se van a escribir"""
+        instance._rutas_previas = {}
+        if raw or instance._state.adding:
+            return
+        guardados = [c for c in campos if update_fields is None or c in update_fields]
+        if guardados:
+            instance._rutas_previas = sender.objects.filter(pk=instance.pk).values(*guardados).first() or {}
+    return receptor
+
+
+# ---------- Referencias a blobs (ContentAddressedStorage) ----------
+
+def _liberar(storage, nombres):
+    """Resta una referencia por nombre, después del commit"""
+    def liberar():
+        for nombre in nombres:
+            try:
+                storage.delete(nombre)
+            except OSError:
+                pass
+    if nombres:
+        transaction.on_commit(liberar)
+
+
+def liberar_rutas_reemplazadas(campos):
+    def receptor(sender, instance, **kwargs):
+        """Al reemplazar el archivo de un campo, libera la referencia al anterior"""
+        previas = getattr(instance, '_rutas_previas', {})
+        for campo in campos:
+            archivo = getattr(instance, campo)
+            previo = previas.get(campo)
+            if previo and previo != archivo.name:
+                _liberar(archivo.storage, [previo])
+    return receptor
+
+
+def liberar_rutas_borradas(campos):
+    def receptor(sender, instance, **kwargs):
+        for campo in campos:
+            archivo = getattr(instance, campo)
+            if archivo:
+                _liberar(archivo.storage, [archivo.name])
+    return receptor
+
+
+# ---------- Derivados de imágenes ----------
+
+def encolar_imagenes(campos):
+    def receptor(sender, instance, created=False, raw=False, **kwargs):
+        """Encola los derivados de las imágenes nuevas o reemplazadas (no en cada save)"""
+        if raw:
+            return
+        previas = getattr(instance, '_rutas_previas', {})
+        for campo in campos:
+            archivo = getattr(instance, campo)
+            if created or (campo in previas and previas[campo] != archivo.name):
+                derivatives.enqueue([archivo.name], derivatives.storage_alias(archivo.storage))
+    return receptor
+
+
+campos_imagen, campos_cas = {}, {}
+for modelo, campo in derivatives.tracked_fields():
+    campos_imagen.setdefault(modelo, []).append(campo)
+for modelo, campo in content_addressed_fields():
+    campos_cas.setdefault(modelo, []).append(campo)
+
+# Una sola captura por modelo: la usan los derivados y las referencias a blobs
+for modelo in {**campos_imagen, **campos_cas}:
+    campos = list(dict.fromkeys(campos_imagen.get(modelo, []) + campos_cas.get(modelo, [])))
+    pre_save.connect(
+        capturar_rutas_previas(campos), sender=modelo, weak=False,
+        dispatch_uid=f'mediastore.rutas_previas.{modelo._meta.label}',
+    )
+
+for modelo, campos in campos_imagen.items():
+    post_save.connect(
+        encolar_imagenes(campos), sender=modelo, weak=False,
+        dispatch_uid=f'mediastore.encolar_imagenes.{modelo._meta.label}',
+    )
+
+for modelo, campos in campos_cas.items():
+    uid = f'mediastore.blobs.{modelo._meta.label}'
+    post_save.connect(liberar_rutas_reemplazadas(campos), sender=modelo, weak=False, dispatch_uid=uid)
+    post_delete.connect(liberar_rutas_borradas(campos), sender=modelo, weak=False, dispatch_uid=uid)
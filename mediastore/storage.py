@@ -0,0 +1,181 @@
+# mediastore/storage.py
+"""
+Almacenamiento direccionado por contenido para la evidencia de cámaras
+(AccessLog.visitor_photo, SecurityIncident.evidence_image).
+
+Cada archivo se guarda una sola vez como blobs/ab/cd/<sha256>.<ext> y el
+campo del modelo guarda esa ruta: los fotogramas idénticos que suben las
+cámaras comparten un único archivo. La tabla Blob lleva la cuenta de
+referencias:
+
+- save() suma una referencia (o crea el blob);
+- delete() resta una; el archivo no se borra aunque llegue a 0, así un
+  borrado no puede ganarle la carrera a una subida concurrente del mismo
+  contenido. `manage.py collect_blobs` elimina los blobs sin referencias
+  pasado COLLECT_BLOBS_GRACE_SECONDS, bloqueando la fila mientras borra,
+  junto con su ImageAsset y los derivados que ya no usa ninguna imagen.
+
+La referencia se suma al guardar el archivo, antes del INSERT/UPDATE del
+modelo: dentro de una transacción se revierte con ella, pero en autocommit
+queda confirmada aunque el guardado del modelo falle después. Esas
+referencias de más impiden borrar el blob hasta que `manage.py collect_blobs
+--recount` (ejecutar periódicamente, sin subidas en curso) las corrige.
+
+Los derivados (mediastore.derivatives, bajo derivatives/) ya tienen rutas
+por sha256 y se guardan tal cual, sin Blob.
+
+Las rutas anteriores (sin blob) se siguen leyendo; delete() las borra
+directamente. `manage.py migrate_to_cas` mueve los archivos existentes.
+El directorio base es MEDIA_ROOT, igual que el storage por defecto.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import F, FileField
+from django.utils import timezone
+
+from .models import Blob, ImageAsset
+
+PREFIJO = 'blobs'
+DERIVADOS = 'derivatives'
+
+
+def evidence_storage():
+    """Storage de los campos de evidencia (alias 'evidence' de STORAGES)"""
+    return storages['evidence']
+
+
+def content_addressed_fields():
+    """(modelo, campo) de cada FileField guardado en un ContentAddressedStorage"""
+    for modelo in apps.get_models():
+        for campo in modelo._meta.get_fields():
+            if isinstance(campo, FileField) and isinstance(campo.storage, ContentAddressedStorage):
+                yield modelo, campo.name
+
+
+def blob_name(sha256, nombre_original):
+    extension = os.path.splitext(nombre_original)[1].lower()[:10]
+    return f'{PREFIJO}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final lo decide el contenido (ver _save)
+        return name
+
+    def _volcar(self, content):
+        """Copia el contenido a un temporal calculando el sha256 en la misma pasada"""
+        directorio = self.path(os.path.join(PREFIJO, 'tmp'))
+        os.makedirs(directorio, exist_ok=True)
+        digest = hashlib.sha256()
+        tamanio = 0
+        descriptor, temporal = tempfile.mkstemp(dir=directorio)
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for bloque in content.chunks():
+                    digest.update(bloque)
+                    destino.write(bloque)
+                    tamanio += len(bloque)
+        except BaseException:
+            os.remove(temporal)
+            raise
+        return temporal, digest.hexdigest(), tamanio
+
+    def _referenciar(self, sha256, nombre, tamanio):
+        """Suma una referencia al blob (lo crea si no existe) y retorna su nombre"""
+        while True:
+            with transaction.atomic():
+                blob, creado = Blob.objects.get_or_create(
+                    sha256=sha256,
+                    defaults={'name': nombre, 'size': tamanio, 'refcount': 1},
+                )
+                if creado or Blob.objects.filter(pk=blob.pk).update(
+                    refcount=F('refcount') + 1, updated_at=timezone.now()
+                ):
+                    return blob.name
+            # collect_blobs eliminó el blob mientras tanto: se vuelve a crear
+
+    def _guardar_derivado(self, name, content):
+        """Escritura atómica en la ruta pedida; dos workers con el mismo derivado escriben lo mismo"""
+        temporal, _, _ = self._volcar(content)
+        destino = self.path(name)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temporal, self.file_permissions_mode)
+        os.replace(temporal, destino)
+        return name
+
+    def _save(self, name, content):
+        if name.startswith(f'{DERIVADOS}/'):
+            return self._guardar_derivado(name, content)
+        temporal, sha256, tamanio = self._volcar(content)
+        try:
+            nombre = self._referenciar(sha256, blob_name(sha256, name), tamanio)
+            destino = self.path(nombre)
+            if not os.path.exists(destino):
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporal, self.file_permissions_mode)
+                os.replace(temporal, destino)  # Atómico: nunca hay un blob a medio escribir
+                temporal = None
+            return nombre
+        finally:
+            if temporal is not None:
+                os.remove(temporal)
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        restadas = Blob.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1, updated_at=timezone.now()
+        )
+        if not restadas and not Blob.objects.filter(name=name).exists():
+            super().delete(name)  # Archivo anterior a la migración
+
+    def collect_garbage(self, grace_seconds=None):
+        """Borra los blobs sin referencias más antiguos que el margen. Retorna la cantidad."""
+        if grace_seconds is None:
+            grace_seconds = getattr(settings, 'COLLECT_BLOBS_GRACE_SECONDS', 3600)
+        corte = timezone.now() - timedelta(seconds=grace_seconds)
+        borrados = 0
+        while True:
+            with transaction.atomic():
+                lote = list(
+                    Blob.objects.select_for_update(skip_locked=True)
+                    .filter(refcount=0, updated_at__lt=corte).order_by('updated_at')[:500]
+                )
+                for blob in lote:
+                    # El archivo se borra con la fila bloqueada: una subida
+                    # concurrente espera y luego vuelve a escribirlo
+                    super().delete(blob.name)
+                self._borrar_derivados([blob.name for blob in lote])
+                Blob.objects.filter(pk__in=[blob.pk for blob in lote]).delete()
+            borrados += len(lote)
+            if len(lote) < 500:
+                return borrados
+
+    def _borrar_derivados(self, nombres):
+        """Borra los ImageAsset de los originales eliminados y los derivados que ninguna otra imagen usa"""
+        assets = list(ImageAsset.objects.filter(name__in=nombres).values_list('pk', 'sha256', 'derivatives'))
+        if not assets:
+            return
+        ImageAsset.objects.filter(pk__in=[pk for pk, _, _ in assets]).delete()
+        en_uso = set(
+            ImageAsset.objects.filter(sha256__in={sha256 for _, sha256, _ in assets if sha256})
+            .values_list('sha256', flat=True)
+        )
+        for _, sha256, derivados in assets:
+            if sha256 in en_uso:
+                continue
+            for rutas in derivados.values():
+                for ruta in rutas.values():
+                    super().delete(ruta)
@@ -0,0 +1,88 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from PIL import Image
+
+from security.models import SecurityIncident
+from users.models import Usuario
+from .derivatives import run_pending
+from .models import ImageAsset
+from .storage import evidence_storage
+
+
+def _imagen(color=(200, 10, 10)):
+    salida = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(salida, 'JPEG')
+    return ContentFile(salida.getvalue(), name='camara.jpg')
+
+
+class EvidenceDerivativesTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = self.settings(MEDIA_ROOT=directorio, IMAGE_RUN_IN_PROCESS=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.storage = evidence_storage()
+
+    def _incidente(self):
+        return SecurityIncident.objects.create(description='d', evidence_image=_imagen())
+
+    def test_derivados_en_el_storage_del_campo(self):
+        incidente = self._incidente()
+        asset = ImageAsset.objects.get(name=incidente.evidence_image.name)
+        self.assertEqual(asset.storage, 'evidence')
+
+        run_pending()
+        asset.refresh_from_db()
+        self.assertEqual(asset.status, 'READY')
+        for rutas in asset.derivatives.values():
+            for ruta in rutas.values():
+                self.assertTrue(ruta.startswith('derivatives/'))
+                self.assertTrue(self.storage.exists(ruta))
+
+    def test_recolectar_borra_asset_y_derivados(self):
+        incidente = self._incidente()
+        run_pending()
+        asset = ImageAsset.objects.get(name=incidente.evidence_image.name)
+        derivados = [ruta for rutas in asset.derivatives.values() for ruta in rutas.values()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            incidente.delete()
+        self.assertEqual(self.storage.collect_garbage(grace_seconds=-1), 1)
+
+        self.assertFalse(ImageAsset.objects.filter(pk=asset.pk).exists())
+        self.assertFalse(self.storage.exists(asset.name))
+        self.assertFalse(any(self.storage.exists(ruta) for ruta in derivados))
+
+
+class EnqueueOnChangeTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = self.settings(MEDIA_ROOT=directorio, IMAGE_RUN_IN_PROCESS=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _sin_cambios_no_encola(self, instancia, campo):
+        ImageAsset.objects.all().delete()
+        instancia.save()
+        self.assertFalse(ImageAsset.objects.exists())
+
+        setattr(instancia, campo, _imagen((10, 10, 200)))  # Otro contenido: otra ruta también en CAS
+        instancia.save()
+        self.assertTrue(ImageAsset.objects.filter(name=getattr(instancia, campo).name).exists())
+
+    def test_campo_de_storage_por_defecto(self):
+        usuario = Usuario.objects.create_user(username='u', email='u@x.com', password='p', foto=_imagen())
+        self.assertTrue(ImageAsset.objects.filter(name=usuario.foto.name, storage='default').exists())
+        self._sin_cambios_no_encola(usuario, 'foto')
+
+    def test_campo_de_evidencia(self):
+        incidente = SecurityIncident.objects.create(description='d', evidence_image=_imagen())
+        self._sin_cambios_no_encola(incidente, 'evidence_image')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Camera, Vehicle, AccessLog, SecurityIncident
+from .models import Camera, Vehicle, AccessLog, AccessLogArchive, SecurityIncident, SecurityStatCounter
 
 
 @admin.register(Camera)
@@ -24,9 +24,24 @@ class AccessLogAdmin(admin.ModelAdmin):
     date_hierarchy = 'timestamp'
 
 
+@admin.register(AccessLogArchive)
+class AccessLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ['timestamp', 'month', 'access_type', 'detection_method', 'is_resident', 'plate_detected', 'visitor_name']
+    list_filter = ['month', 'access_type', 'detection_method']
+    search_fields = ['plate_detected', 'visitor_name']
+
+
 @admin.register(SecurityIncident)
 class SecurityIncidentAdmin(admin.ModelAdmin):
     list_display = ['timestamp', 'incident_type', 'severity', 'resolved', 'resolved_by']
     list_filter = ['incident_type', 'severity', 'resolved']
     search_fields = ['description']
     date_hierarchy = 'timestamp'
+
+
+
+@admin.register(SecurityStatCounter)
+class SecurityStatCounterAdmin(admin.ModelAdmin):
+    list_display = ['key', 'value']
+    search_fields = ['key']
+    readonly_fields = ['key', 'value']
@@ -0,0 +1,153 @@
+# security/archive.py
+"""
+Archivado por mes de AccessLog hacia almacenamiento frío.
+
+La tabla caliente (AccessLog) conserva solo la ventana de retención, de modo
+que las consultas de las últimas 24h recorren un índice pequeño. Las filas
+antiguas se copian a AccessLogArchive (particionada lógicamente por `month`)
+y las fotos de visitantes se empaquetan en un .tar.gz por mes y lote.
+Las fotos viven en el storage de evidencia (deduplicado): al borrar la fila
+caliente se libera su referencia al blob (mediastore.signals), que se elimina
+solo cuando ya nadie lo usa.
+"""
+import shutil
+import tarfile
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AccessLog, AccessLogArchive
+from . import stats
+
+
+def cold_storage_dir():
+    return Path(getattr(settings, 'ACCESS_LOG_COLD_STORAGE_DIR', settings.BASE_DIR / 'cold_storage'))
+
+
+def _primer_dia_mes(ts):
+    return timezone.localtime(ts).date().replace(day=1)
+
+
+def _empaquetar_fotos(mes, logs, sello):
+    """Escribe las fotos de un mes en un .tar.gz; retorna (ruta_relativa, {log_id: miembro})"""
+    relativa = Path('visitors') / mes.strftime('%Y-%m') / f'lote-{sello}-{logs[0].id}.tar.gz'
+    destino = cold_storage_dir() / relativa
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    miembros = {}
+    agregados = set()
+    with tarfile.open(destino, 'w:gz') as tar:
+        for log in logs:
+            nombre = log.visitor_photo.name
+            if nombre not in agregados:  # Fotos deduplicadas: una vez por paquete
+                storage = log.visitor_photo.storage
+                try:
+                    with storage.open(nombre, 'rb') as origen:
+                        info = tarfile.TarInfo(name=nombre)
+                        info.size = storage.size(nombre)
+                        info.mtime = int(log.timestamp.timestamp())
+                        tar.addfile(info, origen)
+                except OSError:
+                    continue
+                agregados.add(nombre)
+            miembros[log.id] = nombre
+    return relativa.as_posix(), miembros
+
+
+def archive_batch(corte, batch_size=1000):
+    """
+    Mueve un lote de registros anteriores a `corte`. Retorna la cantidad movida.
+    Orden de operaciones: fotos al .tar.gz -> filas al archivo y borrado de la
+    tabla caliente (una transacción) -> liberación de las fotos originales
+    (on_commit, señal post_delete).
+    Si el proceso se interrumpe, volver a ejecutarlo es seguro.
+    """
+    logs = list(
+        AccessLog.objects.filter(timestamp__lt=corte).order_by('timestamp', 'id')[:batch_size]
+    )
+    if not logs:
+        return 0
+
+    sello = timezone.now().strftime('%Y%m%d%H%M%S')
+    por_mes = defaultdict(list)
+    for log in logs:
+        if log.visitor_photo:
+            por_mes[_primer_dia_mes(log.timestamp)].append(log)
+
+    paquetes = {}
+    for mes, con_foto in por_mes.items():
+        relativa, miembros = _empaquetar_fotos(mes, con_foto, sello)
+        for log_id, miembro in miembros.items():
+            paquetes[log_id] = (relativa, miembro)
+
+    archivados = [
+        AccessLogArchive(
+            id=log.id,
+            month=_primer_dia_mes(log.timestamp),
+            timestamp=log.timestamp,
+            camera_id=log.camera_id,
+            plate_detected=log.plate_detected,
+            access_type=log.access_type,
+            detection_method=log.detection_method,
+            is_resident=log.is_resident,
+            user_id=log.user_id,
+            vehicle_id=log.vehicle_id,
+            visitor_name=log.visitor_name,
+            notes=log.notes,
+            photo_archive=paquetes.get(log.id, (None, None))[0],
+            photo_member=paquetes.get(log.id, (None, None))[1],
+        )
+        for log in logs
+    ]
+
+    ids = [log.id for log in logs]
+    with transaction.atomic(), stats.paused():
+        # ignore_conflicts: un lote ya copiado en una ejecución interrumpida no falla
+        AccessLogArchive.objects.bulk_create(archivados, ignore_conflicts=True)
+        AccessLog.objects.filter(id__in=ids).delete()
+    return len(logs)
+
+
+def archive_access_logs(dias=None, batch_size=1000):
+    """Archiva todos los registros fuera de la ventana de retención"""
+    if dias is None:
+        dias = getattr(settings, 'ACCESS_LOG_RETENTION_DAYS', 90)
+    corte = timezone.now() - timedelta(days=dias)
+    total = 0
+    while True:
+        movidos = archive_batch(corte, batch_size=batch_size)
+        total += movidos
+        if movidos < batch_size:
+            return total
+
+
+def purge_archive(dias=None):
+    """
+    Elimina meses completos del archivo frío anteriores a la retención del archivo
+    (ACCESS_LOG_ARCHIVE_RETENTION_DAYS; None = conservar siempre).
+    Cada mes se descuenta de los contadores en la misma transacción que lo
+    borra, así coinciden con lo que reconstruiría rebuild_counters.
+    Retorna la cantidad de filas eliminadas.
+    """
+    if dias is None:
+        dias = getattr(settings, 'ACCESS_LOG_ARCHIVE_RETENTION_DAYS', None)
+    if dias is None:
+        return 0
+    mes_corte = (timezone.localdate() - timedelta(days=dias)).replace(day=1)
+    meses = list(
+        AccessLogArchive.objects.filter(month__lt=mes_corte)
+        .values_list('month', flat=True).distinct().order_by('month')
+    )
+    borrados = 0
+    for mes in meses:
+        filas = AccessLogArchive.objects.filter(month=mes)
+        with transaction.atomic():
+            totales = stats.access_log_totals(filas)
+            borrados += filas.delete()[0]
+            stats.bump({clave: -valor for clave, valor in totales.items()})
+        shutil.rmtree(cold_storage_dir() / 'visitors' / mes.strftime('%Y-%m'), ignore_errors=True)
+    return borrados
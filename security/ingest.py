@@ -0,0 +1,86 @@
+# security/ingest.py
+"""
+Ingesta masiva de eventos de acceso enviados por las cámaras.
+
+Valida todos los eventos en memoria, resuelve las llaves foráneas
+(camera, user, vehicle) con una consulta por tabla y escribe con bulk_create.
+"""
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from users.models import Usuario
+from .models import AccessLog, Camera, Vehicle
+from .serializers import AccessLogIngestSerializer
+from .realtime import publish_access_logs
+from .stats import record_access_logs
+
+
+def _ids_existentes(model, ids):
+    if not ids:
+        return set()
+    return set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+
+
+def ingest_access_logs(eventos):
+    """
+    Registra una lista de eventos. Los eventos inválidos se rechazan
+    individualmente (con su índice y errores) sin afectar al resto.
+    Retorna {'created': n, 'rejected': n, 'errors': [...]}.
+    """
+    validador = AccessLogIngestSerializer()
+    errores = []
+    validos = []
+    for indice, evento in enumerate(eventos):
+        try:
+            validos.append((indice, validador.run_validation(evento)))
+        except serializers.ValidationError as exc:
+            errores.append({'index': indice, 'errors': exc.detail})
+
+    # Resolución de llaves foráneas basada en conjuntos
+    referencias = {'camera': set(), 'user': set(), 'vehicle': set()}
+    for _, datos in validos:
+        for campo, ids in referencias.items():
+            if datos.get(campo) is not None:
+                ids.add(datos[campo])
+    existentes = {
+        'camera': _ids_existentes(Camera, referencias['camera']),
+        'user': _ids_existentes(Usuario, referencias['user']),
+        'vehicle': _ids_existentes(Vehicle, referencias['vehicle']),
+    }
+
+    registros = []
+    for indice, datos in validos:
+        faltantes = {
+            campo: [f'No existe el objeto con id={datos[campo]}.']
+            for campo in existentes
+            if datos.get(campo) is not None and datos[campo] not in existentes[campo]
+        }
+        if faltantes:
+            errores.append({'index': indice, 'errors': faltantes})
+            continue
+        registros.append(AccessLog(
+            camera_id=datos.get('camera'),
+            user_id=datos.get('user'),
+            vehicle_id=datos.get('vehicle'),
+            plate_detected=datos.get('plate_detected'),
+            access_type=datos['access_type'],
+            detection_method=datos.get('detection_method', 'MANUAL'),
+            is_resident=datos.get('is_resident', False),
+            visitor_name=datos.get('visitor_name'),
+            notes=datos.get('notes'),
+        ))
+
+    batch_size = getattr(settings, 'ACCESS_LOG_INGEST_BATCH_SIZE', 1000)
+    with transaction.atomic():
+        creados = AccessLog.objects.bulk_create(registros, batch_size=batch_size)
+        # bulk_create no dispara señales: contadores y stream se actualizan en un solo lote
+        record_access_logs(creados)
+        publish_access_logs(creados)
+
+    errores.sort(key=lambda e: e['index'])
+    return {
+        'created': len(creados),
+        'rejected': len(errores),
+        'errors': errores,
+    }
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from security.archive import archive_access_logs, purge_archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los registros de acceso fuera de la ventana de retención a AccessLogArchive '
+        '(fotos de visitantes a .tar.gz mensuales). Programar diariamente (cron / Programador de tareas).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help=f'Días que se conservan en la tabla caliente (por defecto ACCESS_LOG_RETENTION_DAYS={getattr(settings, "ACCESS_LOG_RETENTION_DAYS", 90)})'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Registros por lote/transacción')
+        parser.add_argument(
+            '--purge', action='store_true',
+            help='Eliminar además los meses archivados más antiguos que ACCESS_LOG_ARCHIVE_RETENTION_DAYS'
+        )
+
+    def handle(self, *args, **options):
+        movidos = archive_access_logs(dias=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{movidos} registros archivados'))
+        if options['purge']:
+            borrados = purge_archive()
+            self.stdout.write(self.style.SUCCESS(f'{borrados} registros archivados eliminados por retención'))
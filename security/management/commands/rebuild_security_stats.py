@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from security.stats import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de estadísticas de seguridad desde AccessLog y SecurityIncident'
+
+    def handle(self, *args, **options):
+        total = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'{total} contadores reconstruidos'))
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:25
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def _claves_acceso(access_type, camera_id, dia):
+    camara = camera_id if camera_id is not None else 'none'
+    return [
+        'access:total',
+        f'access:type:{access_type}',
+        f'access:day:{dia.isoformat()}:{access_type}',
+        f'access:day:{dia.isoformat()}:camera:{camara}',
+        f'access:camera:{camara}:{access_type}',
+    ]
+
+
+def _claves_incidente(incident_type, severity, resolved, camera_id, dia):
+    camara = camera_id if camera_id is not None else 'none'
+    claves = [
+        'incident:total',
+        f'incident:type:{incident_type}',
+        f'incident:severity:{severity}',
+        f'incident:day:{dia.isoformat()}',
+        f'incident:camera:{camara}',
+    ]
+    if resolved:
+        claves.append('incident:resolved')
+    else:
+        claves += [
+            f'incident:open:type:{incident_type}',
+            f'incident:open:severity:{severity}',
+        ]
+    return claves
+
+
+def poblar_contadores(apps, schema_editor):
+    """Contadores iniciales con GROUP BY (copia de security.stats al crear la tabla)"""
+    AccessLog = apps.get_model('security', 'AccessLog')
+    SecurityIncident = apps.get_model('security', 'SecurityIncident')
+    SecurityStatCounter = apps.get_model('security', 'SecurityStatCounter')
+
+    totales = Counter()
+    grupos = (
+        AccessLog.objects.annotate(dia=TruncDate('timestamp'))
+        .values('access_type', 'camera_id', 'dia').annotate(n=Count('id')).order_by()
+    )
+    for g in grupos:
+        for clave in _claves_acceso(g['access_type'], g['camera_id'], g['dia']):
+            totales[clave] += g['n']
+    grupos = (
+        SecurityIncident.objects.annotate(dia=TruncDate('timestamp'))
+        .values('incident_type', 'severity', 'resolved', 'camera_id', 'dia').annotate(n=Count('id')).order_by()
+    )
+    for g in grupos:
+        for clave in _claves_incidente(g['incident_type'], g['severity'], g['resolved'], g['camera_id'], g['dia']):
+            totales[clave] += g['n']
+
+    SecurityStatCounter.objects.bulk_create(
+        [SecurityStatCounter(key=clave, value=valor) for clave, valor in totales.items() if valor],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecurityStatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=120, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de Seguridad',
+                'verbose_name_plural': 'Contadores de Seguridad',
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
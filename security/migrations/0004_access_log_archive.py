@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security', '0003_security_stat_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesslog',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='AccessLogArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('month', models.DateField(db_index=True)),
+                ('timestamp', models.DateTimeField()),
+                ('plate_detected', models.CharField(blank=True, max_length=20, null=True)),
+                ('access_type', models.CharField(choices=[('ENTRY', 'Entrada'), ('EXIT', 'Salida')], max_length=10)),
+                ('detection_method', models.CharField(choices=[('FACIAL', 'Reconocimiento Facial'), ('MANUAL', 'Manual'), ('CARD', 'Tarjeta'), ('PLATE', 'Reconocimiento de Placa')], default='MANUAL', max_length=20)),
+                ('is_resident', models.BooleanField(default=False)),
+                ('visitor_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('photo_archive', models.CharField(blank=True, max_length=255, null=True)),
+                ('photo_member', models.CharField(blank=True, max_length=255, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('camera', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='security.camera')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='security.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Registro de Acceso Archivado',
+                'verbose_name_plural': 'Registros de Acceso Archivados',
+                'ordering': ['-timestamp'],
+            },
+        ),
+    ]
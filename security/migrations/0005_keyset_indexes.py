@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security', '0004_access_log_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesslog',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['-timestamp', '-id'], name='accesslog_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityincident',
+            index=models.Index(fields=['-timestamp', '-id'], name='incident_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security', '0005_keyset_indexes'),
+        ('users', '0002_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['access_type', '-timestamp', '-id'], name='accesslog_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['detection_method', '-timestamp', '-id'], name='accesslog_method_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityincident',
+            index=models.Index(fields=['severity', '-timestamp', '-id'], name='incident_severity_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityincident',
+            index=models.Index(fields=['resolved', '-timestamp', '-id'], name='incident_resolved_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='securityincident',
+            index=models.Index(fields=['incident_type', '-timestamp', '-id'], name='incident_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['is_authorized', 'plate_number'], name='vehicle_authorized_plate_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:00
+
+import mediastore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('security', '0006_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesslog',
+            name='visitor_photo',
+            field=models.ImageField(blank=True, null=True, storage=mediastore.storage.evidence_storage, upload_to='visitors/'),
+        ),
+        migrations.AlterField(
+            model_name='securityincident',
+            name='evidence_image',
+            field=models.ImageField(storage=mediastore.storage.evidence_storage, upload_to='incidents/'),
+        ),
+    ]
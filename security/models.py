@@ -1,6 +1,7 @@
 # security/models.py
-from django.db import models
+from django.db import models, transaction
 from users.models import Usuario, UnidadResidencial
+from mediastore.storage import evidence_storage
 
 
 class Camera(models.Model):
@@ -45,6 +46,9 @@ class Vehicle(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
+        indexes = [
+            models.Index(fields=['is_authorized', 'plate_number'], name='vehicle_authorized_plate_idx'),
+        ]
         verbose_name = "Vehículo"
         verbose_name_plural = "Vehículos"
     
@@ -52,7 +56,22 @@ class Vehicle(models.Model):
         return f"{self.plate_number} - {self.owner.get_full_name()}"
 
 
-class AccessLog(models.Model):
+class StatCountedModel(models.Model):
+    """
+    Modelo cuyos contadores (SecurityStatCounter) se actualizan en post_save.
+    save() corre en una transacción para que la fila y sus contadores se
+    confirmen o fallen juntos; delete() ya es atómico (Collector).
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class AccessLog(StatCountedModel):
     """Registro automático de ingresos/salidas"""
     ACCESS_TYPES = (('ENTRY', 'Entrada'), ('EXIT', 'Salida'))
     DETECTION_METHOD_CHOICES = (
@@ -65,7 +84,7 @@ class AccessLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     camera = models.ForeignKey(Camera, on_delete=models.SET_NULL, null=True, blank=True)
     plate_detected = models.CharField(max_length=20, blank=True, null=True)
-    visitor_photo = models.ImageField(upload_to='visitors/', blank=True, null=True)  # Foto visitante
+    visitor_photo = models.ImageField(upload_to='visitors/', storage=evidence_storage, blank=True, null=True)  # Foto visitante
     access_type = models.CharField(max_length=10, choices=ACCESS_TYPES)
     detection_method = models.CharField(max_length=20, choices=DETECTION_METHOD_CHOICES, default='MANUAL')
     is_resident = models.BooleanField(default=False)
@@ -76,6 +95,11 @@ class AccessLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='accesslog_ts_id_idx'),
+            models.Index(fields=['access_type', '-timestamp', '-id'], name='accesslog_type_ts_idx'),
+            models.Index(fields=['detection_method', '-timestamp', '-id'], name='accesslog_method_ts_idx'),
+        ]
         verbose_name = "Registro de Acceso"
         verbose_name_plural = "Registros de Acceso"
     
@@ -83,7 +107,39 @@ class AccessLog(models.Model):
         return f"{self.get_access_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
-class SecurityIncident(models.Model):
+class AccessLogArchive(models.Model):
+    """
+    Almacenamiento frío de AccessLog particionado por mes.
+    Los registros más antiguos que ACCESS_LOG_RETENTION_DAYS se mueven aquí
+    con `manage.py archive_access_logs`; la foto del visitante queda dentro de
+    un .tar.gz mensual en ACCESS_LOG_COLD_STORAGE_DIR.
+    """
+    id = models.BigIntegerField(primary_key=True)  # Mismo id que tenía en AccessLog
+    month = models.DateField(db_index=True)  # Primer día del mes (clave de partición)
+    timestamp = models.DateTimeField()
+    camera = models.ForeignKey(Camera, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    plate_detected = models.CharField(max_length=20, blank=True, null=True)
+    access_type = models.CharField(max_length=10, choices=AccessLog.ACCESS_TYPES)
+    detection_method = models.CharField(max_length=20, choices=AccessLog.DETECTION_METHOD_CHOICES, default='MANUAL')
+    is_resident = models.BooleanField(default=False)
+    user = models.ForeignKey(Usuario, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    visitor_name = models.CharField(max_length=100, blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    photo_archive = models.CharField(max_length=255, blank=True, null=True)  # .tar.gz relativo al almacenamiento frío
+    photo_member = models.CharField(max_length=255, blank=True, null=True)  # Nombre del archivo dentro del .tar.gz
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-timestamp']
+        verbose_name = "Registro de Acceso Archivado"
+        verbose_name_plural = "Registros de Acceso Archivados"
+    
+    def __str__(self):
+        return f"{self.get_access_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')} (archivado)"
+
+
+class SecurityIncident(StatCountedModel):
     """Incidentes detectados por IA (Anomalías)"""
     SEVERITY_CHOICES = (
         ('LOW', 'Baja'),
@@ -106,7 +162,7 @@ class SecurityIncident(models.Model):
     camera = models.ForeignKey(Camera, on_delete=models.SET_NULL, null=True, blank=True)
     incident_type = models.CharField(max_length=30, choices=INCIDENT_TYPE_CHOICES, default='OTHER')
     description = models.TextField()  # Ej: "Persona desconocida en área restringida"
-    evidence_image = models.ImageField(upload_to='incidents/')
+    evidence_image = models.ImageField(upload_to='incidents/', storage=evidence_storage)
     severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, default='MEDIUM')
     resolved = models.BooleanField(default=False)
     resolved_by = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_incidents')
@@ -115,8 +171,28 @@ class SecurityIncident(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='incident_ts_id_idx'),
+            models.Index(fields=['severity', '-timestamp', '-id'], name='incident_severity_ts_idx'),
+            models.Index(fields=['resolved', '-timestamp', '-id'], name='incident_resolved_ts_idx'),
+            models.Index(fields=['incident_type', '-timestamp', '-id'], name='incident_type_ts_idx'),
+        ]
         verbose_name = "Incidente de Seguridad"
         verbose_name_plural = "Incidentes de Seguridad"
     
     def __str__(self):
         return f"{self.get_incident_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+
+class SecurityStatCounter(models.Model):
+    """Contadores pre-agregados de accesos e incidentes (ver security/stats.py)"""
+    key = models.CharField(max_length=120, unique=True)
+    value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Contador de Seguridad"
+        verbose_name_plural = "Contadores de Seguridad"
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
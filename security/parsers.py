@@ -0,0 +1,49 @@
+# security/parsers.py
+import json
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'El cuerpo de la solicitud es demasiado grande.'
+    default_code = 'payload_too_large'
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser para JSON delimitado por saltos de línea (un evento por línea).
+    Retorna una lista de objetos, igual que un arreglo JSON.
+    Lee línea por línea y corta (413) al superar ACCESS_LOG_INGEST_MAX_EVENTS
+    eventos o ACCESS_LOG_INGEST_MAX_BYTES bytes, sin leer el resto del cuerpo.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        max_eventos = getattr(settings, 'ACCESS_LOG_INGEST_MAX_EVENTS', 10000)
+        max_bytes = getattr(settings, 'ACCESS_LOG_INGEST_MAX_BYTES', 10 * 1024 * 1024)
+        eventos = []
+        restantes = max_bytes
+        numero = 0
+        while True:
+            linea = stream.readline(restantes + 1)  # Una línea gigante tampoco pasa del límite
+            if not linea:
+                return eventos
+            restantes -= len(linea)
+            if restantes < 0:
+                raise PayloadTooLarge(f'Se permiten como máximo {max_bytes} bytes por solicitud')
+            numero += 1
+            linea = linea.decode(encoding).strip()
+            if not linea:
+                continue
+            if len(eventos) >= max_eventos:
+                raise PayloadTooLarge(f'Se permiten como máximo {max_eventos} eventos por solicitud')
+            try:
+                eventos.append(json.loads(linea))
+            except ValueError as exc:
+                raise ParseError(f'NDJSON inválido en la línea {numero}: {exc}')
@@ -0,0 +1,217 @@
+# security/plate_cache.py
+"""
+Caché en memoria (por proceso) de autorización de placas para la barrera vehicular.
+
+Carga todos los vehículos con una sola consulta y responde en memoria
+"¿esta placa está autorizada y de quién es?". Tolera las confusiones
+típicas del OCR (O/0, I/1, B/8) mediante una clave "plegada".
+
+Coherencia entre procesos: cada cambio confirmado de un vehículo incrementa
+`plate_cache:gen` en la caché compartida (announce_change). Cada consulta
+compara esa generación con la de su última carga y, si cambió, recarga antes
+de responder; así otro proceso nunca autoriza con una copia vieja.
+"""
+import logging
+import re
+import secrets
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Caracteres que el OCR confunde con frecuencia: se pliegan a su dígito equivalente
+OCR_CONFUSIONES = str.maketrans({'O': '0', 'I': '1', 'B': '8'})
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9A-Z]')
+
+CLAVE_GENERACION = 'plate_cache:gen'
+
+PlateEntry = namedtuple('PlateEntry', [
+    'vehicle_id', 'plate_number', 'owner_id', 'owner_name', 'unit_id', 'is_authorized'
+])
+
+
+def normalize_plate(placa):
+    """Mayúsculas y solo caracteres alfanuméricos ('abc-123 ' -> 'ABC123')"""
+    return _NO_ALFANUMERICO.sub('', (placa or '').upper())
+
+
+def fold_plate(placa):
+    """Clave tolerante a confusiones de OCR ('B0I' y '801' comparten clave)"""
+    return normalize_plate(placa).translate(OCR_CONFUSIONES)
+
+
+def _generacion_actual():
+    return cache.get(CLAVE_GENERACION)
+
+
+def announce_change():
+    """Avisa a todos los procesos que cambió un vehículo (llamar después del commit)"""
+    # Base aleatoria: si la clave se pierde, la nueva nunca coincide con una ya vista
+    if not cache.add(CLAVE_GENERACION, secrets.randbits(40), timeout=None):
+        try:
+            cache.incr(CLAVE_GENERACION)
+        except ValueError:
+            cache.add(CLAVE_GENERACION, secrets.randbits(40), timeout=None)
+
+
+class PlateAuthorizationCache:
+    """Índices exacto y plegado de placas con contadores de aciertos/fallos"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._exactas = {}
+        self._plegadas = {}
+        self._por_vehiculo = {}
+        self._cargado_en = None
+        self._generacion = None
+        self.stats = {
+            'hits_exact': 0,
+            'hits_fuzzy': 0,
+            'ambiguous': 0,
+            'misses': 0,
+            'reloads': 0,
+            'reload_errors': 0,
+            'invalidations': 0,
+        }
+
+    # ---------- Carga ----------
+
+    def _ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'PLATE_CACHE_TTL', 300)
+
+    def _vigente(self):
+        return (
+            self._cargado_en is not None
+            and time.monotonic() - self._cargado_en < self._ttl()
+            and _generacion_actual() == self._generacion
+        )
+
+    def _consultar(self, **filtros):
+        from .models import Vehicle
+
+        filas = Vehicle.objects.filter(**filtros).values_list(
+            'id', 'plate_number', 'owner_id', 'owner__first_name',
+            'owner__last_name', 'owner__username', 'unit_id', 'is_authorized'
+        )
+        for vid, placa, owner_id, nombre, apellido, username, unit_id, autorizado in filas:
+            nombre_completo = f'{nombre} {apellido}'.strip() or username
+            yield PlateEntry(vid, placa, owner_id, nombre_completo, unit_id, autorizado)
+
+    def recargar(self):
+        """Reconstruye la caché completa; si la BD falla se conserva la copia anterior"""
+        generacion = _generacion_actual()  # Antes de consultar: un cambio posterior vuelve a recargar
+        try:
+            entradas = list(self._consultar())
+        except DatabaseError:
+            logger.exception('No se pudo recargar la caché de placas; se usa la copia anterior')
+            with self._lock:
+                self.stats['reload_errors'] += 1
+                if self._cargado_en is not None:
+                    # Reintentar recién en el próximo ciclo de TTL
+                    self._cargado_en = time.monotonic()
+            return False
+
+        exactas, plegadas, por_vehiculo = {}, {}, {}
+        for entrada in entradas:
+            clave = normalize_plate(entrada.plate_number)
+            exactas[clave] = entrada
+            plegadas.setdefault(fold_plate(clave), []).append(entrada)
+            por_vehiculo[entrada.vehicle_id] = clave
+
+        with self._lock:
+            self._exactas, self._plegadas, self._por_vehiculo = exactas, plegadas, por_vehiculo
+            self._cargado_en = time.monotonic()
+            self._generacion = generacion
+            self.stats['reloads'] += 1
+        return True
+
+    # ---------- Invalidación ----------
+
+    def _quitar_sin_lock(self, vehicle_id):
+        clave = self._por_vehiculo.pop(vehicle_id, None)
+        if clave is None:
+            return
+        self._exactas.pop(clave, None)
+        plegada = fold_plate(clave)
+        restantes = [e for e in self._plegadas.get(plegada, []) if e.vehicle_id != vehicle_id]
+        if restantes:
+            self._plegadas[plegada] = restantes
+        else:
+            self._plegadas.pop(plegada, None)
+
+    def invalidar(self, vehicle_id):
+        """Refresca (o elimina) la entrada de un vehículo en este proceso (los demás recargan por announce_change)"""
+        if self._cargado_en is None:
+            return
+        try:
+            entradas = list(self._consultar(id=vehicle_id))
+        except DatabaseError:
+            logger.exception('No se pudo refrescar la placa del vehículo %s', vehicle_id)
+            entradas = []
+            self._cargado_en = None  # Forzar recarga completa en la próxima consulta
+
+        with self._lock:
+            self.stats['invalidations'] += 1
+            self._quitar_sin_lock(vehicle_id)
+            for entrada in entradas:
+                clave = normalize_plate(entrada.plate_number)
+                self._exactas[clave] = entrada
+                self._plegadas.setdefault(fold_plate(clave), []).append(entrada)
+                self._por_vehiculo[entrada.vehicle_id] = clave
+
+    def limpiar(self):
+        with self._lock:
+            self._exactas, self._plegadas, self._por_vehiculo = {}, {}, {}
+            self._cargado_en = None
+
+    # ---------- Consulta ----------
+
+    def buscar(self, placa):
+        """
+        Retorna (entrada, tipo_coincidencia) donde tipo es 'exact', 'fuzzy',
+        'ambiguous' (varias placas comparten la clave plegada) o None.
+        """
+        if not self._vigente():
+            self.recargar()
+
+        clave = normalize_plate(placa)
+        with self._lock:
+            entrada = self._exactas.get(clave)
+            if entrada is not None:
+                self.stats['hits_exact'] += 1
+                return entrada, 'exact'
+
+            candidatos = self._plegadas.get(fold_plate(clave), [])
+            if len(candidatos) == 1:
+                self.stats['hits_fuzzy'] += 1
+                return candidatos[0], 'fuzzy'
+            if len(candidatos) > 1:
+                self.stats['ambiguous'] += 1
+                return None, 'ambiguous'
+
+            self.stats['misses'] += 1
+            return None, None
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self.stats)
+        consultas = stats['hits_exact'] + stats['hits_fuzzy'] + stats['ambiguous'] + stats['misses']
+        aciertos = stats['hits_exact'] + stats['hits_fuzzy']
+        return {
+            **stats,
+            'size': len(self._exactas),
+            'hit_rate': round(aciertos / consultas, 4) if consultas else 0.0,
+            'age_seconds': round(time.monotonic() - self._cargado_en, 1) if self._cargado_en is not None else None,
+        }
+
+
+plate_cache = PlateAuthorizationCache()
@@ -0,0 +1,48 @@
+# security/realtime.py
+"""Publicación de incidentes y accesos nuevos en el canal `security` (ADMIN / SEGURIDAD)"""
+from django.db import transaction
+
+from smartcondominioia import pubsub
+
+
+def access_log_event(log):
+    return {
+        'id': log.pk,
+        'timestamp': log.timestamp,
+        'access_type': log.access_type,
+        'detection_method': log.detection_method,
+        'camera': log.camera_id,
+        'user': log.user_id,
+        'vehicle': log.vehicle_id,
+        'plate_detected': log.plate_detected,
+        'is_resident': log.is_resident,
+        'visitor_name': log.visitor_name,
+    }
+
+
+def incident_event(incident):
+    return {
+        'id': incident.pk,
+        'timestamp': incident.timestamp,
+        'incident_type': incident.incident_type,
+        'severity': incident.severity,
+        'description': incident.description,
+        'camera': incident.camera_id,
+        'resolved': incident.resolved,
+    }
+
+
+def _publicar_al_confirmar(tipo, eventos):
+    def publicar():
+        for datos in eventos:
+            pubsub.publish(pubsub.SECURITY_CHANNEL, tipo, datos)
+
+    transaction.on_commit(publicar)
+
+
+def publish_access_logs(logs):
+    _publicar_al_confirmar('access_log', [access_log_event(log) for log in logs])
+
+
+def publish_incident(incident):
+    _publicar_al_confirmar('incident', [incident_event(incident)])
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import Vehicle, AccessLog, SecurityIncident, Camera
+from .models import Vehicle, AccessLog, AccessLogArchive, SecurityIncident, Camera
 from users.serializers import UsuarioSerializer
+from mediastore.fields import ImageVariantsField
 
 
 class CameraSerializer(serializers.ModelSerializer):
@@ -25,7 +26,7 @@ class CameraSerializer(serializers.ModelSerializer):
 class VehicleSerializer(serializers.ModelSerializer):
     """Serializer completo para Vehicle"""
     owner_name = serializers.CharField(source='owner.get_full_name', read_only=True)
-    unit_number = serializers.CharField(source='unit.unit_number', read_only=True)
+    unit_number = serializers.CharField(source='unit.numero_unidad', read_only=True)
     
     class Meta:
         model = Vehicle
@@ -49,12 +50,13 @@ class AccessLogSerializer(serializers.ModelSerializer):
     camera_name = serializers.CharField(source='camera.name', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     vehicle_plate = serializers.CharField(source='vehicle.plate_number', read_only=True)
+    visitor_photo_variants = ImageVariantsField(source='visitor_photo')
     
     class Meta:
         model = AccessLog
         fields = [
             'id', 'timestamp', 'camera', 'camera_name',
-            'plate_detected', 'visitor_photo', 'access_type',
+            'plate_detected', 'visitor_photo', 'visitor_photo_variants', 'access_type',
             'detection_method', 'is_resident', 'user', 'user_name',
             'vehicle', 'vehicle_plate', 'visitor_name', 'notes'
         ]
@@ -72,16 +74,50 @@ class AccessLogCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class AccessLogArchiveSerializer(serializers.ModelSerializer):
+    """Serializer de solo lectura para registros archivados"""
+    camera_name = serializers.CharField(source='camera.name', read_only=True, default=None)
+    user_name = serializers.CharField(source='user.get_full_name', read_only=True, default=None)
+    vehicle_plate = serializers.CharField(source='vehicle.plate_number', read_only=True, default=None)
+    
+    class Meta:
+        model = AccessLogArchive
+        fields = [
+            'id', 'month', 'timestamp', 'camera', 'camera_name',
+            'plate_detected', 'access_type', 'detection_method',
+            'is_resident', 'user', 'user_name', 'vehicle', 'vehicle_plate',
+            'visitor_name', 'notes', 'photo_archive', 'photo_member', 'archived_at'
+        ]
+        read_only_fields = fields
+
+
+class AccessLogIngestSerializer(serializers.Serializer):
+    """
+    Serializer liviano para la ingesta masiva de eventos de cámaras.
+    Las llaves foráneas se reciben como ids y se resuelven por lotes en security.ingest.
+    """
+    camera = serializers.IntegerField(required=False, allow_null=True)
+    user = serializers.IntegerField(required=False, allow_null=True)
+    vehicle = serializers.IntegerField(required=False, allow_null=True)
+    plate_detected = serializers.CharField(max_length=20, required=False, allow_null=True, allow_blank=True)
+    access_type = serializers.ChoiceField(choices=AccessLog.ACCESS_TYPES)
+    detection_method = serializers.ChoiceField(choices=AccessLog.DETECTION_METHOD_CHOICES, required=False)
+    is_resident = serializers.BooleanField(required=False, default=False)
+    visitor_name = serializers.CharField(max_length=100, required=False, allow_null=True, allow_blank=True)
+    notes = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+
 class SecurityIncidentSerializer(serializers.ModelSerializer):
     """Serializer completo para SecurityIncident"""
     camera_name = serializers.CharField(source='camera.name', read_only=True)
     resolved_by_name = serializers.CharField(source='resolved_by.get_full_name', read_only=True)
+    evidence_image_variants = ImageVariantsField(source='evidence_image')
     
     class Meta:
         model = SecurityIncident
         fields = [
             'id', 'timestamp', 'camera', 'camera_name',
-            'incident_type', 'description', 'evidence_image',
+            'incident_type', 'description', 'evidence_image', 'evidence_image_variants',
             'severity', 'resolved', 'resolved_by', 'resolved_by_name',
             'resolved_at', 'resolution_notes'
         ]
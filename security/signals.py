@@ -0,0 +1,78 @@
+# security/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Vehicle, AccessLog, SecurityIncident
+from .plate_cache import announce_change, plate_cache
+from . import realtime, stats
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def invalidar_placa(sender, instance, **kwargs):
+    """Mantiene la caché de placas coherente con los cambios de vehículos"""
+    vehicle_id = instance.pk
+
+    def invalidar():
+        announce_change()
+        plate_cache.invalidar(vehicle_id)
+    transaction.on_commit(invalidar)
+
+
+# ---------- Contadores de estadísticas ----------
+
+def _claves_guardadas(sender, pk):
+    """Claves de contador del registro tal como está en la BD (antes de actualizarlo)"""
+    previo = sender.objects.filter(pk=pk).first()
+    if previo is None:
+        return []
+    if sender is AccessLog:
+        return stats.keys_for_access_log(previo)
+    return stats.keys_for_incident(previo)
+
+
+@receiver(pre_save, sender=AccessLog)
+@receiver(pre_save, sender=SecurityIncident)
+def capturar_claves_previas(sender, instance, **kwargs):
+    instance._claves_stats_previas = _claves_guardadas(sender, instance.pk) if instance.pk else []
+
+
+@receiver(post_save, sender=AccessLog)
+def publicar_acceso(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.publish_access_logs([instance])
+
+
+@receiver(post_save, sender=SecurityIncident)
+def publicar_incidente(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.publish_incident(instance)
+
+
+@receiver(post_save, sender=AccessLog)
+def contar_acceso(sender, instance, **kwargs):
+    stats.record_change(
+        getattr(instance, '_claves_stats_previas', []),
+        stats.keys_for_access_log(instance)
+    )
+
+
+@receiver(post_save, sender=SecurityIncident)
+def contar_incidente(sender, instance, **kwargs):
+    stats.record_change(
+        getattr(instance, '_claves_stats_previas', []),
+        stats.keys_for_incident(instance)
+    )
+
+
+@receiver(post_delete, sender=AccessLog)
+def descontar_acceso(sender, instance, **kwargs):
+    if stats.is_paused():
+        return
+    stats.record_change(stats.keys_for_access_log(instance), [])
+
+
+@receiver(post_delete, sender=SecurityIncident)
+def descontar_incidente(sender, instance, **kwargs):
+    stats.record_change(stats.keys_for_incident(instance), [])
@@ -0,0 +1,218 @@
+# security/stats.py
+"""
+Estadísticas de seguridad pre-agregadas.
+
+Cada AccessLog y SecurityIncident aporta +1 a un conjunto de claves de contador
+(por día, cámara, tipo de acceso, tipo/severidad de incidente). Los contadores
+se mantienen con un UPSERT al escribir, y el endpoint de estadísticas los lee
+en una sola consulta. `manage.py rebuild_security_stats` los reconstruye desde
+las tablas originales (incluido el archivo frío de accesos).
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AccessLog, AccessLogArchive, SecurityIncident, SecurityStatCounter
+
+_estado = threading.local()
+
+
+@contextmanager
+def paused():
+    """
+    Suspende la actualización de contadores en el hilo actual.
+    Se usa al archivar: mover un registro al almacenamiento frío no cambia las estadísticas.
+    """
+    anterior = getattr(_estado, 'pausado', False)
+    _estado.pausado = True
+    try:
+        yield
+    finally:
+        _estado.pausado = anterior
+
+
+def is_paused():
+    return getattr(_estado, 'pausado', False)
+
+
+def _dia(valor):
+    if valor is None:
+        return timezone.localdate()
+    if hasattr(valor, 'tzinfo'):
+        return timezone.localdate(valor)
+    return valor
+
+
+# ---------- Claves ----------
+
+def access_log_keys(access_type, camera_id, dia):
+    camara = camera_id if camera_id is not None else 'none'
+    return [
+        'access:total',
+        f'access:type:{access_type}',
+        f'access:day:{dia.isoformat()}:{access_type}',
+        f'access:day:{dia.isoformat()}:camera:{camara}',
+        f'access:camera:{camara}:{access_type}',
+    ]
+
+
+def incident_keys(incident_type, severity, resolved, camera_id, dia):
+    camara = camera_id if camera_id is not None else 'none'
+    claves = [
+        'incident:total',
+        f'incident:type:{incident_type}',
+        f'incident:severity:{severity}',
+        f'incident:day:{dia.isoformat()}',
+        f'incident:camera:{camara}',
+    ]
+    if resolved:
+        claves.append('incident:resolved')
+    else:
+        claves += [
+            f'incident:open:type:{incident_type}',
+            f'incident:open:severity:{severity}',
+        ]
+    return claves
+
+
+def keys_for_access_log(log):
+    return access_log_keys(log.access_type, log.camera_id, _dia(log.timestamp))
+
+
+def keys_for_incident(incident):
+    return incident_keys(
+        incident.incident_type, incident.severity, incident.resolved,
+        incident.camera_id, _dia(incident.timestamp)
+    )
+
+
+# ---------- Escritura ----------
+
+def bump(deltas):
+    """Aplica incrementos {clave: delta} con un UPSERT atómico por clave"""
+    filas = [(clave, delta) for clave, delta in deltas.items() if delta]
+    if not filas:
+        return
+    tabla = connection.ops.quote_name(SecurityStatCounter._meta.db_table)
+    sql = (
+        f'INSERT INTO {tabla} ("key", "value") VALUES (%s, %s) '
+        f'ON CONFLICT ("key") DO UPDATE SET "value" = {tabla}."value" + EXCLUDED."value"'
+    )
+    # Orden fijo de claves para evitar interbloqueos entre transacciones concurrentes
+    filas.sort()
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, filas)
+
+
+def record_access_logs(logs, signo=1):
+    """Registra (o descuenta con signo=-1) una lista de accesos en los contadores"""
+    deltas = Counter()
+    for log in logs:
+        for clave in keys_for_access_log(log):
+            deltas[clave] += signo
+    bump(deltas)
+
+
+def record_change(claves_previas, claves_nuevas):
+    """Aplica la diferencia entre las claves anteriores y nuevas de un registro"""
+    deltas = Counter(claves_nuevas)
+    deltas.subtract(Counter(claves_previas))
+    bump(deltas)
+
+
+# ---------- Lectura ----------
+
+def read_counters(claves):
+    """Lee varias claves en una sola consulta (las ausentes valen 0)"""
+    valores = dict(
+        SecurityStatCounter.objects.filter(key__in=claves).values_list('key', 'value')
+    )
+    return {clave: valores.get(clave, 0) for clave in claves}
+
+
+def security_stats():
+    """Valores para SecurityStatsSerializer servidos desde los contadores"""
+    hoy = timezone.localdate().isoformat()
+    valores = read_counters([
+        'incident:total',
+        'incident:resolved',
+        'incident:open:severity:CRITICAL',
+        'incident:open:type:UNAUTHORIZED_ACCESS',
+        'access:total',
+        f'access:day:{hoy}:ENTRY',
+        f'access:day:{hoy}:EXIT',
+    ])
+    return {
+        'total_incidents': valores['incident:total'],
+        'resolved_incidents': valores['incident:resolved'],
+        'pending_incidents': valores['incident:total'] - valores['incident:resolved'],
+        'critical_incidents': valores['incident:open:severity:CRITICAL'],
+        'total_access_logs': valores['access:total'],
+        'entries_today': valores[f'access:day:{hoy}:ENTRY'],
+        'exits_today': valores[f'access:day:{hoy}:EXIT'],
+        'unauthorized_accesses': valores['incident:open:type:UNAUTHORIZED_ACCESS'],
+    }
+
+
+# ---------- Reconciliación ----------
+
+def access_log_totals(queryset):
+    """Contadores de accesos de un queryset de AccessLog o AccessLogArchive, con GROUP BY"""
+    totales = Counter()
+    grupos = (
+        queryset
+        .annotate(dia=TruncDate('timestamp'))
+        .values('access_type', 'camera_id', 'dia')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for g in grupos:
+        for clave in access_log_keys(g['access_type'], g['camera_id'], g['dia']):
+            totales[clave] += g['n']
+    return totales
+
+
+def compute_counters(access_log_model=AccessLog, incident_model=SecurityIncident, archive_model=None):
+    """Calcula todos los contadores desde las tablas originales con GROUP BY"""
+    totales = Counter()
+    modelos = [access_log_model] + ([archive_model] if archive_model is not None else [])
+    for modelo in modelos:
+        totales.update(access_log_totals(modelo.objects.all()))
+
+    grupos = (
+        incident_model.objects
+        .annotate(dia=TruncDate('timestamp'))
+        .values('incident_type', 'severity', 'resolved', 'camera_id', 'dia')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for g in grupos:
+        claves = incident_keys(g['incident_type'], g['severity'], g['resolved'], g['camera_id'], g['dia'])
+        for clave in claves:
+            totales[clave] += g['n']
+    return totales
+
+
+def rebuild_counters():
+    """
+    Reemplaza todos los contadores por los valores calculados desde las tablas.
+    En PostgreSQL se bloquea la tabla de contadores antes de agregar: las
+    escrituras concurrentes esperan y aplican su incremento después.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            tabla = connection.ops.quote_name(SecurityStatCounter._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {tabla} IN EXCLUSIVE MODE')
+        totales = compute_counters(archive_model=AccessLogArchive)
+        SecurityStatCounter.objects.all().delete()
+        SecurityStatCounter.objects.bulk_create(
+            [SecurityStatCounter(key=clave, value=valor) for clave, valor in totales.items() if valor],
+            batch_size=1000
+        )
+    return len(totales)
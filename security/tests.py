@@ -1,3 +1,95 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from users.models import Usuario
+from . import stats
+from .archive import archive_access_logs, purge_archive
+from .models import AccessLog, AccessLogArchive, SecurityStatCounter, Vehicle
+from .parsers import NDJSONParser, PayloadTooLarge
+from .plate_cache import PlateAuthorizationCache
+
+
+class PlateAuthorizationCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        propietario = Usuario.objects.create_user(username='v', email='v@x.com', password='p')
+        self.vehiculo = Vehicle.objects.create(plate_number='ABC123', owner=propietario)
+
+    def test_otro_proceso_ve_la_desautorizacion(self):
+        otro = PlateAuthorizationCache()
+        entrada, _ = otro.buscar('ABC123')
+        self.assertTrue(entrada.is_authorized)
+
+        self.vehiculo.is_authorized = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehiculo.save()
+
+        entrada, _ = otro.buscar('ABC123')
+        self.assertFalse(entrada.is_authorized)
+
+    def test_sin_cambios_no_consulta_la_bd(self):
+        otro = PlateAuthorizationCache()
+        otro.buscar('ABC123')
+        with self.assertNumQueries(0):
+            self.assertEqual(otro.buscar('abc-123')[1], 'exact')
+
+
+class ArchivePurgeTests(TestCase):
+
+    def test_purga_descuenta_los_contadores(self):
+        for tipo in ('ENTRY', 'EXIT', 'ENTRY'):
+            AccessLog.objects.create(access_type=tipo)
+        AccessLog.objects.update(timestamp=timezone.now() - timedelta(days=400))
+        reciente = AccessLog.objects.create(access_type='ENTRY')
+        stats.rebuild_counters()
+
+        self.assertEqual(archive_access_logs(dias=90), 3)
+        self.assertEqual(purge_archive(dias=180), 3)
+
+        self.assertEqual(stats.read_counters(['access:total'])['access:total'], 1)
+        esperados = stats.compute_counters(archive_model=AccessLogArchive)
+        guardados = {clave: valor for clave, valor in SecurityStatCounter.objects.values_list('key', 'value') if valor}
+        self.assertEqual(guardados, {clave: valor for clave, valor in esperados.items() if valor})
+        self.assertTrue(AccessLog.objects.filter(pk=reciente.pk).exists())
+
+
+class ContadoresAtomicosTests(TransactionTestCase):
+
+    def test_falla_del_contador_revierte_el_registro(self):
+        with mock.patch.object(stats, 'bump', side_effect=RuntimeError('contador')):
+            with self.assertRaises(RuntimeError):
+                AccessLog.objects.create(access_type='ENTRY')
+        self.assertFalse(AccessLog.objects.exists())
+
+    def test_registro_y_contadores_se_confirman_juntos(self):
+        AccessLog.objects.create(access_type='ENTRY')
+        self.assertEqual(stats.read_counters(['access:total'])['access:total'], 1)
+
+
+class NDJSONParserTests(SimpleTestCase):
+
+    def _parsear(self, cuerpo):
+        return NDJSONParser().parse(io.BytesIO(cuerpo))
+
+    def test_eventos(self):
+        self.assertEqual(self._parsear(b'{"a": 1}\n\n{"a": 2}\n'), [{'a': 1}, {'a': 2}])
+
+    @override_settings(ACCESS_LOG_INGEST_MAX_EVENTS=2)
+    def test_corta_al_superar_los_eventos(self):
+        stream = io.BytesIO(b'{"a": 1}\n' * 1000)
+        with self.assertRaises(PayloadTooLarge):
+            NDJSONParser().parse(stream)
+        self.assertLess(stream.tell(), 100)  # No leyó el resto del cuerpo
+
+    @override_settings(ACCESS_LOG_INGEST_MAX_BYTES=64)
+    def test_corta_al_superar_los_bytes(self):
+        stream = io.BytesIO(b'{"a": "' + b'x' * 10000 + b'"}\n')
+        with self.assertRaises(PayloadTooLarge):
+            NDJSONParser().parse(stream)
+        self.assertEqual(stream.tell(), 65)
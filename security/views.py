@@ -1,22 +1,33 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q, Count
 from datetime import datetime, timedelta
-from .models import Vehicle, AccessLog, SecurityIncident, Camera
+from .models import Vehicle, AccessLog, AccessLogArchive, SecurityIncident, Camera
 from .serializers import (
     CameraSerializer,
     VehicleSerializer, VehicleCreateSerializer,
-    AccessLogSerializer, AccessLogCreateSerializer,
+    AccessLogSerializer, AccessLogCreateSerializer, AccessLogArchiveSerializer,
     SecurityIncidentSerializer, SecurityIncidentCreateSerializer,
     SecurityStatsSerializer
 )
+from .parsers import NDJSONParser
+from .ingest import ingest_access_logs
+from .plate_cache import plate_cache
+from .stats import security_stats
+from smartcondominioia.pagination import TimestampCursorPagination, BoundedListMixin
+from smartcondominioia.filters import TypedQueryFilter
+from smartcondominioia.metrics import InstrumentedViewMixin
+from smartcondominioia.export import Column, ExportMixin
 from users.permissions import IsAdminOrSecurity, IsAdminOrSecurityOrReadOnly, IsOwnerOrAdmin
+from users.scoping import UnitScopedQuerysetMixin
 
 
-class CameraViewSet(viewsets.ModelViewSet):
+class CameraViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de cámaras de vigilancia
     Endpoints:
@@ -41,40 +52,54 @@ class CameraViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, BoundedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de vehículos
     Endpoints:
-    - GET /vehicles/ - Listar todos los vehículos
+    - GET /vehicles/ - Listar vehículos, RESIDENTE solo los suyos o de sus unidades (filtros: is_authorized, owner, unit)
     - POST /vehicles/ - Registrar nuevo vehículo
     - GET /vehicles/{id}/ - Obtener detalle de vehículo
     - PUT /vehicles/{id}/ - Actualizar vehículo
     - DELETE /vehicles/{id}/ - Eliminar vehículo
-    - GET /vehicles/authorized/ - Listar vehículos autorizados
+    - GET /vehicles/authorized/ - Listar vehículos autorizados (paginado; ?stream=true para NDJSON completo)
     - POST /vehicles/{id}/authorize/ - Autorizar vehículo
     - POST /vehicles/{id}/unauthorize/ - Desautorizar vehículo
+    - GET /vehicles/check_plate/?plate=ABC123 - Decisión de barrera desde la caché de placas
+    - GET /vehicles/plate_cache_stats/ - Contadores de la caché de placas
     """
     queryset = Vehicle.objects.all()
     permission_classes = [IsAdminOrSecurityOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['plate_number', 'owner__username', 'brand', 'model']
     ordering_fields = ['plate_number', 'created_at']
+    ordering = ['plate_number']
+    query_filters = {
+        'is_authorized': ('is_authorized', serializers.BooleanField()),
+        'owner': ('owner_id', serializers.IntegerField()),
+        'unit': ('unit_id', serializers.IntegerField()),
+    }
+    unit_scope_resource = 'vehiculos'
+    unit_scope_user_field = 'owner_id'
     
     def get_serializer_class(self):
         if self.action == 'create':
             return VehicleCreateSerializer
         return VehicleSerializer
     
+    def get_permissions(self):
+        if self.action in ['check_plate', 'plate_cache_stats']:
+            return [IsAdminOrSecurity()]
+        return super().get_permissions()
+    
     @action(detail=False, methods=['get'])
     def authorized(self, request):
         """Obtener solo vehículos autorizados"""
-        vehicles = Vehicle.objects.filter(is_authorized=True)
-        serializer = VehicleSerializer(vehicles, many=True)
-        return Response(serializer.data)
+        vehicles = self.get_queryset().filter(is_authorized=True).select_related('owner', 'unit')
+        return self.bounded_list(vehicles, VehicleSerializer)
     
     @action(detail=True, methods=['post'])
     def authorize(self, request, pk=None):
-        """Autorizar un vehículo"""
+        """Autorizar un vehículo (la caché de placas se invalida al guardar)"""
         vehicle = self.get_object()
         vehicle.is_authorized = True
         vehicle.save()
@@ -85,7 +110,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def unauthorize(self, request, pk=None):
-        """Desautorizar un vehículo"""
+        """Desautorizar un vehículo (la caché de placas se invalida al guardar)"""
         vehicle = self.get_object()
         vehicle.is_authorized = False
         vehicle.save()
@@ -94,6 +119,43 @@ class VehicleViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
     
+    @action(detail=False, methods=['get'])
+    def check_plate(self, request):
+        """Verificar si una placa detectada por OCR está autorizada (sin consultar la BD)"""
+        plate = request.query_params.get('plate')
+        if not plate:
+            return Response(
+                {"error": "El parámetro 'plate' es requerido"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        entry, match = plate_cache.buscar(plate)
+        if entry is None:
+            return Response({
+                "plate": plate,
+                "authorized": False,
+                "match": match,
+                "vehicle": None
+            })
+        
+        return Response({
+            "plate": plate,
+            "authorized": entry.is_authorized,
+            "match": match,
+            "vehicle": {
+                "id": entry.vehicle_id,
+                "plate_number": entry.plate_number,
+                "owner": entry.owner_id,
+                "owner_name": entry.owner_name,
+                "unit": entry.unit_id
+            }
+        })
+    
+    @action(detail=False, methods=['get'])
+    def plate_cache_stats(self, request):
+        """Contadores de aciertos/fallos de la caché de placas"""
+        return Response(plate_cache.estadisticas())
+    
     @action(detail=False, methods=['get'])
     def my_vehicles(self, request):
         """Obtener vehículos del usuario actual"""
@@ -102,88 +164,194 @@ class VehicleViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class AccessLogViewSet(viewsets.ModelViewSet):
+class AccessLogViewSet(InstrumentedViewMixin, ExportMixin, BoundedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para registros de acceso
     Endpoints:
-    - GET /access-logs/ - Listar todos los registros
+    - GET /access-logs/ - Listar todos los registros (filtros: access_type, detection_method, camera, user)
     - POST /access-logs/ - Crear nuevo registro
     - GET /access-logs/{id}/ - Obtener detalle de registro
-    - GET /access-logs/today/ - Obtener accesos del día
-    - GET /access-logs/recent/ - Obtener accesos recientes
+    - GET /access-logs/today/ - Obtener accesos del día (paginado por cursor)
+    - GET /access-logs/recent/ - Obtener accesos recientes (paginado por cursor)
+    - GET /access-logs/by_type/?type=ENTRY - Filtrar por tipo (paginado; ?stream=true para NDJSON completo)
+    - POST /access-logs/ingest/ - Ingesta masiva de eventos (JSON o NDJSON)
+    - GET /access-logs/archived/?month=YYYY-MM - Registros movidos al archivo frío
+    - GET /access-logs/export/?output=csv|ndjson|parquet&from=YYYY-MM-DD&to=YYYY-MM-DD - Exportación en streaming
+      (mismos filtros; include_archived=true suma el archivo frío)
     """
     queryset = AccessLog.objects.all()
     permission_classes = [IsAdminOrSecurity]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = TimestampCursorPagination
+    ordering = ['-timestamp', '-id']
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['plate_detected', 'visitor_name', 'user__username']
     ordering_fields = ['timestamp']
+    query_filters = {
+        'access_type': ('access_type', serializers.ChoiceField(choices=AccessLog.ACCESS_TYPES)),
+        'detection_method': ('detection_method', serializers.ChoiceField(choices=AccessLog.DETECTION_METHOD_CHOICES)),
+        'camera': ('camera_id', serializers.IntegerField()),
+        'user': ('user_id', serializers.IntegerField()),
+    }
+    export_date_field = 'timestamp'
+    export_columns = [
+        Column('id', 'id', 'int'),
+        Column('timestamp', 'timestamp', 'datetime'),
+        Column('access_type', 'access_type', 'str'),
+        Column('detection_method', 'detection_method', 'str'),
+        Column('camera', 'camera__name', 'str'),
+        Column('user', 'user__username', 'str'),
+        Column('is_resident', 'is_resident', 'bool'),
+        Column('plate_detected', 'plate_detected', 'str'),
+        Column('vehicle', 'vehicle__plate_number', 'str'),
+        Column('visitor_name', 'visitor_name', 'str'),
+        Column('notes', 'notes', 'str'),
+    ]
     
     def get_serializer_class(self):
         if self.action == 'create':
             return AccessLogCreateSerializer
         return AccessLogSerializer
     
+    def _con_relaciones(self):
+        return self.get_queryset().select_related('camera', 'user', 'vehicle')
+    
+    def get_export_querysets(self, params):
+        """El archivo frío contiene los registros más antiguos: va primero para mantener el orden"""
+        querysets = [self.get_queryset()]
+        if self.request.query_params.get('include_archived') in ('1', 'true', 'True'):
+            querysets.insert(0, AccessLogArchive.objects.all())
+        return querysets
+    
     @action(detail=False, methods=['get'])
     def today(self, request):
         """Obtener accesos del día actual"""
-        today = timezone.now().date()
-        logs = AccessLog.objects.filter(timestamp__date=today)
-        serializer = AccessLogSerializer(logs, many=True)
-        return Response(serializer.data)
+        # Rango sobre el índice de timestamp (timestamp__date no aprovecha el índice)
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        logs = self._con_relaciones().filter(timestamp__gte=start, timestamp__lt=start + timedelta(days=1))
+        return self.bounded_list(logs, AccessLogSerializer)
     
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """Obtener accesos recientes (últimas 24 horas)"""
         last_24h = timezone.now() - timedelta(hours=24)
-        logs = AccessLog.objects.filter(timestamp__gte=last_24h)
-        serializer = AccessLogSerializer(logs, many=True)
-        return Response(serializer.data)
+        logs = self._con_relaciones().filter(timestamp__gte=last_24h)
+        return self.bounded_list(logs, AccessLogSerializer)
     
     @action(detail=False, methods=['get'])
     def by_type(self, request):
         """Filtrar por tipo de acceso (ENTRY/EXIT)"""
         access_type = request.query_params.get('type')
         if access_type:
-            logs = AccessLog.objects.filter(access_type=access_type)
-            serializer = AccessLogSerializer(logs, many=True)
-            return Response(serializer.data)
+            access_type = serializers.ChoiceField(choices=AccessLog.ACCESS_TYPES).run_validation(access_type)
+            logs = self._con_relaciones().filter(access_type=access_type)
+            return self.bounded_list(logs, AccessLogSerializer)
         return Response(
             {"error": "El parámetro 'type' es requerido (ENTRY o EXIT)"},
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        """Consultar registros archivados de un mes (almacenamiento frío)"""
+        month = request.query_params.get('month')
+        try:
+            month_start = datetime.strptime(month or '', '%Y-%m').date()
+        except ValueError:
+            return Response(
+                {"error": "El parámetro 'month' es requerido (formato: YYYY-MM)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        logs = AccessLogArchive.objects.filter(month=month_start).select_related('camera', 'user', 'vehicle')
+        page = self.paginate_queryset(logs)
+        serializer = AccessLogArchiveSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def ingest(self, request):
+        """
+        Ingesta masiva de eventos de cámaras
+        Body: arreglo JSON de eventos o NDJSON (Content-Type: application/x-ndjson)
+        Cada evento: {"camera": 1, "access_type": "ENTRY", "detection_method": "PLATE", ...}
+        """
+        eventos = request.data
+        if isinstance(eventos, dict):
+            eventos = eventos.get('events')
+        if not isinstance(eventos, list) or not eventos:
+            return Response(
+                {"error": "Se requiere un arreglo de eventos no vacío"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        max_eventos = getattr(settings, 'ACCESS_LOG_INGEST_MAX_EVENTS', 10000)
+        if len(eventos) > max_eventos:
+            return Response(
+                {"error": f"Se permiten como máximo {max_eventos} eventos por solicitud"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        resultado = ingest_access_logs(eventos)
+        codigo = status.HTTP_201_CREATED if resultado['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(resultado, status=codigo)
 
 
-class SecurityIncidentViewSet(viewsets.ModelViewSet):
+class SecurityIncidentViewSet(InstrumentedViewMixin, ExportMixin, BoundedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para incidentes de seguridad
     Endpoints:
-    - GET /incidents/ - Listar todos los incidentes
+    - GET /incidents/ - Listar todos los incidentes (filtros: severity, incident_type, resolved, camera)
     - POST /incidents/ - Crear nuevo incidente
     - GET /incidents/{id}/ - Obtener detalle de incidente
     - PUT /incidents/{id}/ - Actualizar incidente
     - DELETE /incidents/{id}/ - Eliminar incidente
-    - GET /incidents/unresolved/ - Obtener incidentes sin resolver
+    - GET /incidents/unresolved/ - Obtener incidentes sin resolver (paginado por cursor)
     - POST /incidents/{id}/resolve/ - Marcar incidente como resuelto
-    - GET /incidents/critical/ - Obtener incidentes críticos
+    - GET /incidents/critical/ - Obtener incidentes críticos (paginado por cursor)
     - GET /incidents/stats/ - Obtener estadísticas de seguridad
+    - GET /incidents/by_severity/?severity=HIGH - Filtrar por severidad (paginado; ?stream=true para NDJSON completo)
+    - GET /incidents/export/?output=csv|ndjson|parquet&from=YYYY-MM-DD&to=YYYY-MM-DD - Exportación en streaming
+      (mismos filtros)
     """
     queryset = SecurityIncident.objects.all()
     permission_classes = [IsAdminOrSecurity]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = TimestampCursorPagination
+    ordering = ['-timestamp', '-id']
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['description', 'incident_type']
     ordering_fields = ['timestamp', 'severity']
+    query_filters = {
+        'severity': ('severity', serializers.ChoiceField(choices=SecurityIncident.SEVERITY_CHOICES)),
+        'incident_type': ('incident_type', serializers.ChoiceField(choices=SecurityIncident.INCIDENT_TYPE_CHOICES)),
+        'resolved': ('resolved', serializers.BooleanField()),
+        'camera': ('camera_id', serializers.IntegerField()),
+    }
+    export_date_field = 'timestamp'
+    export_columns = [
+        Column('id', 'id', 'int'),
+        Column('timestamp', 'timestamp', 'datetime'),
+        Column('incident_type', 'incident_type', 'str'),
+        Column('severity', 'severity', 'str'),
+        Column('description', 'description', 'str'),
+        Column('camera', 'camera__name', 'str'),
+        Column('resolved', 'resolved', 'bool'),
+        Column('resolved_by', 'resolved_by__username', 'str'),
+        Column('resolved_at', 'resolved_at', 'datetime'),
+        Column('resolution_notes', 'resolution_notes', 'str'),
+    ]
     
     def get_serializer_class(self):
         if self.action == 'create':
             return SecurityIncidentCreateSerializer
         return SecurityIncidentSerializer
     
+    def _con_relaciones(self):
+        return self.get_queryset().select_related('camera', 'resolved_by')
+    
     @action(detail=False, methods=['get'])
     def unresolved(self, request):
         """Obtener incidentes sin resolver"""
-        incidents = SecurityIncident.objects.filter(resolved=False)
-        serializer = SecurityIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        incidents = self._con_relaciones().filter(resolved=False)
+        return self.bounded_list(incidents, SecurityIncidentSerializer)
     
     @action(detail=True, methods=['post'])
     def resolve(self, request, pk=None):
@@ -206,51 +374,16 @@ class SecurityIncidentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def critical(self, request):
         """Obtener incidentes críticos sin resolver"""
-        incidents = SecurityIncident.objects.filter(
+        incidents = self._con_relaciones().filter(
             severity='CRITICAL',
             resolved=False
         )
-        serializer = SecurityIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return self.bounded_list(incidents, SecurityIncidentSerializer)
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Estadísticas de seguridad"""
-        total_incidents = SecurityIncident.objects.count()
-        resolved_incidents = SecurityIncident.objects.filter(resolved=True).count()
-        pending_incidents = total_incidents - resolved_incidents
-        critical_incidents = SecurityIncident.objects.filter(
-            severity='CRITICAL',
-            resolved=False
-        ).count()
-        
-        total_access_logs = AccessLog.objects.count()
-        today = timezone.now().date()
-        entries_today = AccessLog.objects.filter(
-            timestamp__date=today,
-            access_type='ENTRY'
-        ).count()
-        exits_today = AccessLog.objects.filter(
-            timestamp__date=today,
-            access_type='EXIT'
-        ).count()
-        
-        # Incidentes de acceso no autorizado
-        unauthorized_accesses = SecurityIncident.objects.filter(
-            incident_type='UNAUTHORIZED_ACCESS',
-            resolved=False
-        ).count()
-        
-        stats = {
-            'total_incidents': total_incidents,
-            'resolved_incidents': resolved_incidents,
-            'pending_incidents': pending_incidents,
-            'critical_incidents': critical_incidents,
-            'total_access_logs': total_access_logs,
-            'entries_today': entries_today,
-            'exits_today': exits_today,
-            'unauthorized_accesses': unauthorized_accesses
-        }
+        """Estadísticas de seguridad (servidas desde contadores pre-agregados)"""
+        stats = security_stats()
         
         serializer = SecurityStatsSerializer(stats)
         return Response(serializer.data)
@@ -258,11 +391,9 @@ class SecurityIncidentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_severity(self, request):
         """Filtrar incidentes por severidad"""
-        severity = request.query_params.get('severity')
-        if severity:
-            incidents = SecurityIncident.objects.filter(severity=severity)
-            serializer = SecurityIncidentSerializer(incidents, many=True)
-            return Response(serializer.data)
+        if request.query_params.get('severity'):
+            # El filtro por severidad lo aplica query_filters
+            return self.bounded_list(self._con_relaciones(), SecurityIncidentSerializer)
         return Response(
             {"error": "El parámetro 'severity' es requerido"},
             status=status.HTTP_400_BAD_REQUEST
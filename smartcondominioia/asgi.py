@@ -3,6 +3,9 @@ ASGI config for smartcondominioia project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Necesario para el stream de eventos en tiempo real (/api/communication/stream/):
+    uvicorn smartcondominioia.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -0,0 +1,274 @@
+# smartcondominioia/export.py
+"""
+Exportación de reportes en streaming (CSV, NDJSON o Parquet).
+
+Las filas se leen con `values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)`
+(cursor del lado del servidor en PostgreSQL) y se escriben en la respuesta a
+medida que llegan, así que la memoria queda acotada a un lote sin importar el
+rango pedido. Parquet necesita pyarrow (opcional); cada lote es un row group.
+
+Uso: agregar ExportMixin al ViewSet y declarar `export_columns` y
+`export_date_field`. Parámetros de GET .../export/:
+- output: csv (por defecto), ndjson o parquet
+- from / to: fechas YYYY-MM-DD inclusivas sobre export_date_field
+- los filtros tipados del ViewSet (query_filters, ver smartcondominioia.filters)
+
+`stream_serialized` es la variante NDJSON con el serializer de la vista que
+usan los listados acotados (?stream=true).
+
+Bajo ASGI, Django consume un iterador sync entero (sync_to_async(list)) antes
+de enviar el primer byte; por eso ahí el contenido es un generador async que
+pide cada lote al generador sync con sync_to_async, en el mismo hilo que el
+resto del request (el cursor del servidor sigue en su conexión). Bajo WSGI se
+entrega el generador sync tal cual.
+"""
+import csv
+import json
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.utils.encoders import JSONEncoder
+
+from .filters import apply_query_filters
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet deshabilitado
+    pa = pq = None
+
+# Columna exportada: encabezado, ruta ORM (admite joins, ej. 'camera__name') y tipo
+Column = namedtuple('Column', ['name', 'field', 'type'])
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportParamsSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=list(FORMATOS), default='csv')
+    # 'from' es palabra reservada: se declaran con el nombre del parámetro en __init__
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['from'] = serializers.DateField(required=False)
+        self.fields['to'] = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('from') and attrs.get('to') and attrs['from'] > attrs['to']:
+            raise serializers.ValidationError("'from' debe ser anterior o igual a 'to'")
+        if attrs['output'] == 'parquet' and pa is None:
+            raise serializers.ValidationError({'output': 'Parquet no disponible: instale pyarrow'})
+        return attrs
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def _lotes(filas, tamanio):
+    filas = iter(filas)
+    while True:
+        lote = list(islice(filas, tamanio))
+        if not lote:
+            return
+        yield lote
+
+
+# ---------- Escritores ----------
+
+class _Eco:
+    """Destino de csv.writer que devuelve la línea en vez de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_texto(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat() if timezone.is_aware(valor) else valor.isoformat()
+    return '' if valor is None else valor
+
+
+def _csv(filas, columnas):
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow([c.name for c in columnas])  # BOM para Excel
+    for lote in _lotes(filas, _chunk_size()):
+        yield ''.join(escritor.writerow([_valor_texto(v) for v in fila]) for fila in lote)
+
+
+def _ndjson(filas, columnas):
+    nombres = [c.name for c in columnas]
+    for lote in _lotes(filas, _chunk_size()):
+        yield ''.join(
+            json.dumps(dict(zip(nombres, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+            for fila in lote
+        )
+
+
+class _Sumidero:
+    """Archivo de solo escritura para ParquetWriter: acumula bytes hasta vaciar()"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _tipo_arrow(tipo):
+    return {
+        'int': pa.int64(),
+        'str': pa.string(),
+        'bool': pa.bool_(),
+        'datetime': pa.timestamp('us', tz='UTC'),
+        'date': pa.date32(),
+        'decimal': pa.decimal128(12, 2),
+    }[tipo]
+
+
+def _parquet(filas, columnas):
+    esquema = pa.schema([(c.name, _tipo_arrow(c.type)) for c in columnas])
+    sumidero = _Sumidero()
+    escritor = pq.ParquetWriter(sumidero, esquema, compression='zstd')
+    try:
+        for lote in _lotes(filas, _chunk_size()):
+            valores = list(zip(*lote))
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(valores[i], type=campo.type) for i, campo in enumerate(esquema)],
+                schema=esquema,
+            ))
+            yield sumidero.vaciar()
+    finally:
+        escritor.close()
+    yield sumidero.vaciar()
+
+
+ESCRITORES = {'csv': _csv, 'ndjson': _ndjson, 'parquet': _parquet}
+
+
+async def _asincrono(partes):
+    fin = object()
+    siguiente = sync_to_async(next)
+    try:
+        while True:
+            parte = await siguiente(partes, fin)
+            if parte is fin:
+                return
+            yield parte
+    finally:
+        # Si el cliente corta, cierra el generador (y su cursor) en el mismo hilo
+        await sync_to_async(partes.close)()
+
+
+def _contenido(request, partes):
+    """Contenido de la respuesta: generador async bajo ASGI, el generador sync bajo WSGI"""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _asincrono(partes)
+    return partes
+
+
+def stream_serialized(queryset, serializer_class, context=None):
+    """NDJSON en streaming de los objetos serializados, por lotes del cursor del servidor"""
+    def lineas():
+        objetos = queryset.iterator(chunk_size=_chunk_size())
+        for lote in _lotes(objetos, _chunk_size()):
+            datos = serializer_class(lote, many=True, context=context).data
+            yield ''.join(json.dumps(fila, cls=JSONEncoder, ensure_ascii=False) + '\n' for fila in datos)
+
+    request = (context or {}).get('request')
+    response = StreamingHttpResponse(_contenido(request, lineas()), content_type='application/x-ndjson')
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def stream_rows(querysets, columnas, formato, nombre, request=None):
+    """StreamingHttpResponse con las filas de los querysets (en orden) en el formato pedido"""
+    campos = [c.field for c in columnas]
+
+    def filas():
+        for queryset in querysets:
+            yield from queryset.values_list(*campos).iterator(chunk_size=_chunk_size())
+
+    content_type, extension = FORMATOS[formato]
+    partes = ESCRITORES[formato](filas(), columnas)
+    response = StreamingHttpResponse(_contenido(request, partes), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{extension}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class ExportMixin:
+    """
+    Agrega GET .../export/ a un ViewSet. Atributos:
+    - export_columns: lista de Column
+    - export_date_field: campo fecha/hora para from/to (se ordena por él)
+    - export_permission_classes: permisos del export (por defecto, los del ViewSet)
+    """
+    export_columns = []
+    export_date_field = None
+    export_permission_classes = None
+
+    def get_permissions(self):
+        if self.action == 'export' and self.export_permission_classes is not None:
+            return [permiso() for permiso in self.export_permission_classes]
+        return super().get_permissions()
+
+    def get_export_querysets(self, params):
+        """Querysets a exportar, en orden; por defecto, el queryset del ViewSet"""
+        return [self.get_queryset()]
+
+    def _filtrar_export(self, queryset, params):
+        campo = self.export_date_field
+        if params.get('from'):
+            inicio = timezone.make_aware(datetime.combine(params['from'], time.min))
+            queryset = queryset.filter(**{f'{campo}__gte': inicio})
+        if params.get('to'):
+            fin = timezone.make_aware(datetime.combine(params['to'] + timedelta(days=1), time.min))
+            queryset = queryset.filter(**{f'{campo}__lt': fin})
+        queryset = apply_query_filters(self.request, queryset, getattr(self, 'query_filters', {}))
+        return queryset.order_by(campo, 'id')
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exportación en streaming (CSV / NDJSON / Parquet) con rango de fechas y filtros"""
+        serializer = ExportParamsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        querysets = [self._filtrar_export(qs, params) for qs in self.get_export_querysets(params)]
+
+        nombre = '-'.join(filter(None, [
+            self.basename,
+            params.get('from') and params['from'].isoformat(),
+            params.get('to') and params['to'].isoformat(),
+        ]))
+        return stream_rows(querysets, self.export_columns, params['output'], nombre, request)
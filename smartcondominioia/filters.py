@@ -0,0 +1,40 @@
+# smartcondominioia/filters.py
+"""
+Filtros por parámetros de query tipados.
+
+Cada ViewSet declara los filtros que admite con un campo de DRF que valida y
+convierte el valor:
+
+    query_filters = {
+        'rol': ('rol', serializers.ChoiceField(choices=Usuario.ROLES)),
+        'is_active': ('is_active', serializers.BooleanField()),
+    }
+
+Un valor inválido responde 400 con el error por parámetro en vez de llegar
+al ORM. Los filtros de las acciones acotadas tienen índice (ver Meta.indexes).
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def apply_query_filters(request, queryset, query_filters):
+    """Aplica al queryset los filtros declarados presentes en request.query_params"""
+    condiciones, errores = {}, {}
+    for parametro, (lookup, campo) in query_filters.items():
+        valor = request.query_params.get(parametro)
+        if valor in (None, ''):
+            continue
+        try:
+            condiciones[lookup] = campo.run_validation(valor)
+        except ValidationError as exc:
+            errores[parametro] = exc.detail
+    if errores:
+        raise ValidationError(errores)
+    return queryset.filter(**condiciones)
+
+
+class TypedQueryFilter(BaseFilterBackend):
+    """Backend que aplica `view.query_filters`"""
+
+    def filter_queryset(self, request, queryset, view):
+        return apply_query_filters(request, queryset, getattr(view, 'query_filters', {}))
@@ -0,0 +1,280 @@
+# smartcondominioia/metrics.py
+"""
+Instrumentación de consultas SQL y latencia por endpoint (vista/acción DRF).
+
+- QueryMetricsMiddleware: cuenta consultas y tiempo de BD de cada request
+  (connection.execute_wrapper) y registra histogramas por endpoint,
+  p. ej. "FeeViewSet.overdue" o "UsuarioViewSet.todos".
+- InstrumentedViewMixin: marca el inicio/fin del handler DRF para separar el
+  tiempo de serialización; permite declarar `query_budgets` por acción.
+- MetricsView: expone los histogramas en JSON o formato de texto Prometheus.
+
+Con QUERY_BUDGET_STRICT = True (p. ej. en tests) exceder un presupuesto lanza
+QueryBudgetExceeded y el request falla.
+
+Las respuestas en streaming se miden al cerrarse (response.close()), con las
+consultas hechas al generar el contenido; no llevan X-Query-Count ni
+Server-Timing y exceder el presupuesto solo se registra (ya no pueden fallar).
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BUCKETS_QUERIES = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un endpoint ejecutó más consultas que su presupuesto declarado"""
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos (compatible con Prometheus)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, valor):
+        self.count += 1
+        self.sum += valor
+        self.max = max(self.max, valor)
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.counts[i] += 1
+                break
+
+    def to_dict(self):
+        acumulado, buckets = 0, {}
+        for limite, n in zip(self.buckets, self.counts):
+            acumulado += n
+            buckets[str(limite)] = acumulado
+        buckets['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'avg': round(self.sum / self.count, 3) if self.count else 0,
+            'max': round(self.max, 3),
+            'buckets': buckets,
+        }
+
+
+class MetricsRegistry:
+    METRICAS = {
+        'latency_ms': BUCKETS_MS,
+        'db_ms': BUCKETS_MS,
+        'serialization_ms': BUCKETS_MS,
+        'queries': BUCKETS_QUERIES,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.budget_violations = {}
+
+    def observe(self, endpoint, valores):
+        with self._lock:
+            histogramas = self._endpoints.get(endpoint)
+            if histogramas is None:
+                histogramas = {nombre: Histogram(b) for nombre, b in self.METRICAS.items()}
+                self._endpoints[endpoint] = histogramas
+            for nombre, valor in valores.items():
+                if valor is not None:
+                    histogramas[nombre].observe(valor)
+
+    def record_violation(self, endpoint):
+        with self._lock:
+            self.budget_violations[endpoint] = self.budget_violations.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'endpoints': {
+                    endpoint: {nombre: h.to_dict() for nombre, h in histogramas.items()}
+                    for endpoint, histogramas in sorted(self._endpoints.items())
+                },
+                'budget_violations': dict(self.budget_violations),
+            }
+
+    def prometheus(self):
+        """Formato de exposición de texto de Prometheus"""
+        lineas = []
+        datos = self.snapshot()
+        for nombre in self.METRICAS:
+            metrica = f'smartcondominio_{nombre}'
+            lineas.append(f'# TYPE {metrica} histogram')
+            for endpoint, histogramas in datos['endpoints'].items():
+                h = histogramas[nombre]
+                for limite, n in h['buckets'].items():
+                    lineas.append(f'{metrica}_bucket{{endpoint="{endpoint}",le="{limite}"}} {n}')
+                lineas.append(f'{metrica}_sum{{endpoint="{endpoint}"}} {h["sum"]}')
+                lineas.append(f'{metrica}_count{{endpoint="{endpoint}"}} {h["count"]}')
+        lineas.append('# TYPE smartcondominio_query_budget_violations_total counter')
+        for endpoint, n in datos['budget_violations'].items():
+            lineas.append(f'smartcondominio_query_budget_violations_total{{endpoint="{endpoint}"}} {n}')
+        return '\n'.join(lineas) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.budget_violations.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Mediciones del request en curso"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.handler_inicio = None
+        self.handler_db_inicio = 0.0
+        self.handler_fin = None
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - inicio
+            self.queries += 1
+
+
+_actual = ContextVar('request_metrics', default=None)
+
+
+def current_metrics():
+    """Mediciones del request en curso (None fuera del middleware)"""
+    return _actual.get()
+
+
+def resolve_endpoint(request):
+    """Nombre 'Vista.accion' del endpoint resuelto para el request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    cls = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if cls is None:
+        return match.view_name or match.url_name, None
+    acciones = getattr(match.func, 'actions', None)
+    metodo = request.method.lower()
+    accion = acciones.get(metodo, metodo) if acciones else metodo
+    return f'{cls.__name__}.{accion}', getattr(cls, 'query_budgets', {}).get(accion)
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metricas = RequestMetrics()
+        token = _actual.set(metricas)
+        stack = ExitStack()
+        try:
+            for conexion in connections.all():
+                stack.enter_context(conexion.execute_wrapper(metricas))
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        finally:
+            _actual.reset(token)
+
+        if response.streaming:
+            # El contenido (y sus consultas) se genera al iterar: se mide hasta
+            # response.close(), que el servidor llama al terminar de enviarlo
+            response._resource_closers.append(lambda: self._finalizar(request, response, metricas, stack))
+            return response
+        self._finalizar(request, response, metricas, stack)
+        return response
+
+    def _finalizar(self, request, response, metricas, stack):
+        stack.close()
+        fin = time.perf_counter()
+        endpoint, presupuesto = resolve_endpoint(request)
+        if endpoint is None:
+            return
+
+        latencia_ms = (fin - metricas.inicio) * 1000
+        db_ms = metricas.db_time * 1000
+        serializacion_ms = None
+        if metricas.handler_inicio is not None and metricas.handler_fin is not None:
+            # Tiempo Python del handler y del renderizado (o del streaming), sin BD
+            python = fin - metricas.handler_inicio
+            bd = metricas.db_time - metricas.handler_db_inicio
+            serializacion_ms = max(python - bd, 0) * 1000
+
+        registry.observe(endpoint, {
+            'latency_ms': latencia_ms,
+            'db_ms': db_ms,
+            'serialization_ms': serializacion_ms,
+            'queries': metricas.queries,
+        })
+        if not response.streaming:
+            # En streaming los headers ya se enviaron
+            response['Server-Timing'] = f'db;dur={db_ms:.1f}, total;dur={latencia_ms:.1f}'
+            response['X-Query-Count'] = str(metricas.queries)
+
+        if presupuesto is not None and metricas.queries > presupuesto:
+            registry.record_violation(endpoint)
+            mensaje = f'{endpoint} ejecutó {metricas.queries} consultas (presupuesto: {presupuesto})'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False) and not response.streaming:
+                raise QueryBudgetExceeded(mensaje)
+            logger.warning(mensaje)
+
+
+class InstrumentedViewMixin:
+    """
+    Mixin para ViewSets/APIViews: separa el tiempo del handler para la métrica
+    de serialización. `query_budgets = {'accion': max_consultas}` declara el
+    máximo de consultas permitido por acción.
+    """
+    query_budgets = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metricas = current_metrics()
+        if metricas is not None:
+            metricas.handler_inicio = time.perf_counter()
+            metricas.handler_db_inicio = metricas.db_time
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metricas = current_metrics()
+        if metricas is not None:
+            metricas.handler_fin = time.perf_counter()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class MetricsView(APIView):
+    """
+    GET /api/metrics/ - Histogramas por endpoint (solo ADMIN)
+    GET /api/metrics/?output=prometheus - Formato de texto Prometheus
+    """
+
+    def get_permissions(self):
+        from users.permissions import IsAdmin
+        return [IsAdmin()]
+
+    def get(self, request):
+        if request.query_params.get('output') == 'prometheus':
+            return HttpResponse(registry.prometheus(), content_type='text/plain; version=0.0.4')
+        return Response(registry.snapshot())
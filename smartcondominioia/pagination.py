@@ -0,0 +1,63 @@
+# smartcondominioia/pagination.py
+"""
+Paginación por cursor (keyset) para los listados de alto volumen.
+
+A diferencia de PageNumberPagination no ejecuta COUNT(*) ni OFFSET: cada página
+es un rango sobre el índice compuesto (fecha, id), con costo constante sin
+importar la profundidad.
+
+Toda paginación tiene un máximo de page_size; quien necesite el conjunto
+completo usa la variante en streaming (?stream=true, ver BoundedListMixin).
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .export import stream_serialized
+
+
+class BoundedPageNumberPagination(PageNumberPagination):
+    """Paginación por defecto (DEFAULT_PAGINATION_CLASS) con page_size acotado"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class TimestampCursorPagination(KeysetPagination):
+    """AccessLog, SecurityIncident: índice (timestamp, id)"""
+    ordering = ('-timestamp', '-id')
+
+
+class CreatedAtCursorPagination(KeysetPagination):
+    """Notification: índice (created_at, id)"""
+    ordering = ('-created_at', '-id')
+
+
+class PaymentDateCursorPagination(KeysetPagination):
+    """Payment: índice (payment_date, id)"""
+    ordering = ('-payment_date', '-id')
+
+
+class LedgerCursorPagination(KeysetPagination):
+    """LedgerEntry (estado de cuenta): índice (unit, created_at, id), orden cronológico"""
+    ordering = ('created_at', 'id')
+
+
+class BoundedListMixin:
+    """
+    Para acciones de listado de un ViewSet: aplica filter_queryset (búsqueda,
+    orden y query_filters) y pagina con la paginación de la vista. Con
+    ?stream=true responde el conjunto completo como NDJSON en streaming.
+    """
+    def bounded_list(self, queryset, serializer_class=None):
+        queryset = self.filter_queryset(queryset)
+        serializer_class = serializer_class or self.get_serializer_class()
+        if self.request.query_params.get('stream') in ('1', 'true', 'True'):
+            return stream_serialized(queryset, serializer_class, self.get_serializer_context())
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
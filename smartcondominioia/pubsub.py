@@ -0,0 +1,185 @@
+# smartcondominioia/pubsub.py
+"""
+Pub/sub de eventos en tiempo real para el stream SSE (communication.stream).
+
+Los publicadores (señales, ingesta) llaman a `publish(canal, tipo, datos)`
+desde código síncrono; cada conexión SSE abierta es una suscripción con su
+propia cola asyncio, alimentada con call_soon_threadsafe desde el hilo que
+publica.
+
+Canales:
+- `user:<id>`: notificaciones directas del usuario.
+- `audience:<ALL|ROL>`: notificaciones de difusión.
+- `security`: incidentes y accesos (ADMIN / SEGURIDAD).
+
+El backend se elige con PUBSUB_BACKEND:
+- InProcessBroker (por defecto): entrega solo dentro del proceso.
+- RedisBroker: publica en Redis (PUBSUB_REDIS_URL) y un hilo por proceso
+  reenvía los mensajes a las suscripciones locales; necesario con varios
+  workers ASGI.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Cola de eventos de una conexión. Si se llena, se marca como desbordada."""
+
+    def __init__(self, broker, canales, maxsize):
+        self.broker = broker
+        self.canales = frozenset(canales)
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=maxsize)
+        self.desbordada = False
+
+    def _poner(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+    def entregar(self, evento):
+        """Llamado desde cualquier hilo"""
+        self.loop.call_soon_threadsafe(self._poner, evento)
+
+    async def get(self, timeout=None):
+        """Siguiente evento, o None si vence el timeout"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Suscripciones por canal en memoria del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_canal = {}
+        self._secuencia = itertools.count(1)
+
+    def subscribe(self, canales, maxsize=None):
+        suscripcion = Subscription(self, canales, maxsize or getattr(settings, 'PUBSUB_QUEUE_SIZE', 100))
+        with self._lock:
+            for canal in suscripcion.canales:
+                self._por_canal.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def unsubscribe(self, suscripcion):
+        with self._lock:
+            for canal in suscripcion.canales:
+                suscriptores = self._por_canal.get(canal)
+                if suscriptores is not None:
+                    suscriptores.discard(suscripcion)
+                    if not suscriptores:
+                        del self._por_canal[canal]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._por_canal.values())) if self._por_canal else 0
+
+    def publish(self, canal, tipo, datos):
+        self._entregar_local(canal, {'id': next(self._secuencia), 'type': tipo, 'data': datos})
+
+    def _entregar_local(self, canal, evento):
+        with self._lock:
+            suscriptores = list(self._por_canal.get(canal, ()))
+        for suscripcion in suscriptores:
+            try:
+                suscripcion.entregar(evento)
+            except RuntimeError:
+                # El loop de la conexión ya se cerró
+                self.unsubscribe(suscripcion)
+
+
+class RedisBroker(InProcessBroker):
+    """Reparte eventos entre procesos vía Redis pub/sub"""
+
+    PREFIJO = 'pubsub:'
+
+    def __init__(self, url=None):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(url or settings.PUBSUB_REDIS_URL)
+        self._oyente = None
+        self._oyente_lock = threading.Lock()
+
+    def subscribe(self, canales, maxsize=None):
+        self._iniciar_oyente()
+        return super().subscribe(canales, maxsize)
+
+    def publish(self, canal, tipo, datos):
+        mensaje = json.dumps({'type': tipo, 'data': datos}, cls=DjangoJSONEncoder)
+        self._redis.publish(self.PREFIJO + canal, mensaje)
+
+    def _iniciar_oyente(self):
+        with self._oyente_lock:
+            if self._oyente is None or not self._oyente.is_alive():
+                self._oyente = threading.Thread(target=self._escuchar, name='pubsub-redis', daemon=True)
+                self._oyente.start()
+
+    def _escuchar(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(self.PREFIJO + '*')
+        for mensaje in pubsub.listen():
+            try:
+                canal = mensaje['channel'].decode()[len(self.PREFIJO):]
+                evento = json.loads(mensaje['data'])
+                evento['id'] = next(self._secuencia)
+                self._entregar_local(canal, evento)
+            except Exception:
+                logger.exception('Mensaje de pub/sub inválido')
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            ruta = getattr(settings, 'PUBSUB_BACKEND', 'smartcondominioia.pubsub.InProcessBroker')
+            _broker = import_string(ruta)()
+    return _broker
+
+
+def publish(canal, tipo, datos):
+    """Publica un evento; los errores del backend no afectan al que publica"""
+    try:
+        get_broker().publish(canal, tipo, datos)
+    except Exception:
+        logger.exception('No se pudo publicar el evento %s en %s', tipo, canal)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def audience_channel(audiencia):
+    return f'audience:{audiencia}'
+
+
+SECURITY_CHANNEL = 'security'
+SECURITY_ROLES = ('ADMIN', 'SEGURIDAD')
+
+
+def channels_for(user):
+    """Canales a los que se suscribe la conexión de un usuario"""
+    canales = [user_channel(user.pk), audience_channel('ALL'), audience_channel(user.rol)]
+    if user.rol in SECURITY_ROLES:
+        canales.append(SECURITY_CHANNEL)
+    return canales
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
@@ -45,6 +48,7 @@ INSTALLED_APPS = [
     'communication',
     'security',
     'finance',
+    'mediastore',
 ]
 AUTH_USER_MODEL = 'users.Usuario'
 
@@ -52,6 +56,7 @@ AUTH_USER_MODEL = 'users.Usuario'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'smartcondominioia.metrics.QueryMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'smartcondominioia.wsgi.application'
+ASGI_APPLICATION = 'smartcondominioia.asgi.application'
 
 
 # Database
@@ -97,6 +103,24 @@ DATABASES = {
     }
 }
 
+# Caché compartida entre procesos (contadores de no leídas, permisos, tokens):
+# CACHE_URL=redis://host:6379/1. Sin CACHE_URL la caché es local de cada proceso;
+# con DEBUG=False solo se admite declarando ALLOW_PROCESS_LOCAL_CACHE=True
+# (un único proceso). Ver smartcondominioia.shared_cache.
+# `manage.py test` corre en un único proceso (y fuerza DEBUG=False): ahí la
+# caché local es compartida y ALLOW_PROCESS_LOCAL_CACHE vale True por defecto.
+TESTING = sys.argv[1:2] == ['test']
+CACHE_URL = config('CACHE_URL', default='')
+ALLOW_PROCESS_LOCAL_CACHE = config('ALLOW_PROCESS_LOCAL_CACHE', default=TESTING, cast=bool)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 
 # Password validation
@@ -104,6 +128,17 @@ DATABASES = {
 # Desactivados para desarrollo - habilitar en producción
 AUTH_PASSWORD_VALIDATORS = []
 
+# Hash de contraseñas (users.hashers): Argon2id si argon2-cffi está instalado,
+# si no PBKDF2. Los hashes con otro algoritmo o costo se regeneran al iniciar sesión.
+PASSWORD_HASHERS = [
+    *(['users.hashers.TunedArgon2PasswordHasher'] if find_spec('argon2') else []),
+    'users.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+# Parámetros de Argon2id (memory_cost en KiB); medir con manage.py benchmark_login
+PASSWORD_ARGON2 = {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1}
+PASSWORD_PBKDF2_ITERATIONS = 1_000_000
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
@@ -126,6 +161,14 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 'evidence': fotos de visitantes y evidencia de incidentes, deduplicadas por sha256
+# (mediastore.storage.ContentAddressedStorage, también bajo MEDIA_ROOT)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'evidence': {'BACKEND': 'mediastore.storage.ContentAddressedStorage'},
+}
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React frontend
@@ -141,13 +184,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT; en lecturas arma el usuario desde los claims del token (users.authentication)
+        'users.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # page_size acotado (?page_size= hasta 500); el conjunto completo solo en streaming
+    'DEFAULT_PAGINATION_CLASS': 'smartcondominioia.pagination.BoundedPageNumberPagination',
     'PAGE_SIZE': 100,  # Aumentado de 10 a 100 para mostrar más usuarios
     'DEFAULT_FILTER_BACKENDS': [
+        'smartcondominioia.filters.TypedQueryFilter',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
@@ -161,14 +207,90 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    'UPDATE_LAST_LOGIN': False,  # last_login se escribe en lotes (users.last_login)
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Recalcula los claims de rol y unidades al rotar el refresh token
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.ClaimsTokenRefreshSerializer',
 }
 
+# Reconocimiento facial
+# Directorio donde se persiste la matriz de encodings (memory-mapped)
+FACE_INDEX_DIR = BASE_DIR / 'face_index'
+# Distancia euclidiana máxima para considerar que dos encodings son la misma persona
+FACE_MATCH_TOLERANCE = 0.6
+# Dimensión de los encodings faciales que calcula el servicio de IA
+FACE_ENCODING_DIM = 128
+
+# Ingesta masiva de registros de acceso desde cámaras
+ACCESS_LOG_INGEST_MAX_EVENTS = 10000
+ACCESS_LOG_INGEST_BATCH_SIZE = 1000
+# Tamaño máximo del cuerpo NDJSON (el parser deja de leer al superarlo)
+ACCESS_LOG_INGEST_MAX_BYTES = 10 * 1024 * 1024
+
+# Retención de registros de acceso (manage.py archive_access_logs)
+ACCESS_LOG_RETENTION_DAYS = 90  # Días en la tabla caliente
+ACCESS_LOG_ARCHIVE_RETENTION_DAYS = None  # Días en el archivo frío (None = conservar siempre)
+ACCESS_LOG_COLD_STORAGE_DIR = BASE_DIR / 'cold_storage'
+
+# Caché de autorización de placas: segundos entre recargas completas desde la BD
+PLATE_CACHE_TTL = 300
+
+# Generación masiva de cuotas (POST /api/finance/fee-runs/generate/, manage.py generate_fees)
+FEE_DUE_DAY = 10  # Día del mes en que vencen las cuotas generadas
+FEE_RUN_BATCH_SIZE = 1000  # Filas por bulk_create
+
+# Unidades de cada usuario para permisos por objeto (users.unit_access): segundos en caché
+PERMISSION_UNITS_CACHE_TTL = 300
+
+# Contador de no leídas en caché (communication.unread): segundos hasta recalcular desde la BD
+NOTIF_UNREAD_CACHE_TTL = 300
+
+# Stream en tiempo real (GET /api/communication/stream/, Server-Sent Events bajo ASGI)
+# Con varios workers ASGI: PUBSUB_BACKEND=smartcondominioia.pubsub.RedisBroker
+PUBSUB_BACKEND = config('PUBSUB_BACKEND', default='smartcondominioia.pubsub.InProcessBroker')
+PUBSUB_REDIS_URL = config('PUBSUB_REDIS_URL', default=CACHE_URL)
+PUBSUB_QUEUE_SIZE = 100  # Eventos en cola por conexión antes de pedir resync
+SSE_HEARTBEAT = 20  # Segundos entre comentarios de keep-alive
+SSE_RETRY_MS = 5000  # Reintento de reconexión sugerido al cliente
+
+# Exportaciones en streaming (GET .../export/): filas por lote del cursor del servidor
+EXPORT_CHUNK_SIZE = 2000
+
+# Derivados de imágenes subidas (mediastore): miniaturas sin EXIF, en segundo plano
+IMAGE_DERIVATIVE_SIZES = {'thumb': 200, 'medium': 800}  # Lado mayor en píxeles
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')  # JPEG como respaldo para clientes sin WebP
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_RUN_IN_PROCESS = True  # False si solo se usa `manage.py process_images`
+IMAGE_WORKERS = 2  # Hilos del pool local
+IMAGE_STALE_AFTER = 300  # Segundos para retomar una imagen de un worker caído
+IMAGE_MAX_ATTEMPTS = 3
+
+# Blobs sin referencias (manage.py collect_blobs): segundos antes de borrarlos
+COLLECT_BLOBS_GRACE_SECONDS = 3600
+
+# Intervalo (segundos) para escribir en lote los last_login de los logins (0 = en el momento)
+LAST_LOGIN_FLUSH_SECONDS = 10
+
+# Login: hilos de hashing por proceso, requests en espera y segundos de espera antes de responder 503
+LOGIN_HASH_WORKERS = 2
+LOGIN_HASH_QUEUE = 16
+LOGIN_HASH_TIMEOUT = 5
+
+# Filtro de Bloom de la lista negra de refresh tokens (users.blacklist_filter):
+# tokens sin expirar que admite antes de reconstruirse, tasa de falsos positivos y tamaño del LRU exacto
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 1_000_000
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_LRU_SIZE = 10_000
+
+# Métricas por endpoint (consultas SQL, tiempo de BD, serialización, latencia)
+METRICS_ENABLED = True
+# True: exceder el `query_budgets` de una vista lanza QueryBudgetExceeded (usar en tests)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
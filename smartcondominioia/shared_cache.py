@@ -0,0 +1,39 @@
+# smartcondominioia/shared_cache.py
+"""
+¿La caché por defecto es compartida entre procesos?
+
+Los contadores de no leídas, las unidades de los permisos, la revocación de
+claims de los tokens y la lista negra de refresh tokens guardan estado en
+la caché y lo leen desde cualquier worker. Con una caché local por proceso
+(LocMemCache) un worker no ve lo que escribe otro.
+
+- `shared_cache_available()`: True con un backend compartido (Redis,
+  Memcached, BD, archivos) o si ALLOW_PROCESS_LOCAL_CACHE declara que se
+  ejecuta un único proceso (desarrollo, tests).
+- El check `smartcondominioia.E001` falla con DEBUG=False y una caché local.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+BACKENDS_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_available(alias='default'):
+    if getattr(settings, 'ALLOW_PROCESS_LOCAL_CACHE', False):
+        return True
+    return settings.CACHES[alias]['BACKEND'] not in BACKENDS_LOCALES
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or shared_cache_available():
+        return []
+    return [Error(
+        'La caché por defecto es local de cada proceso y DEBUG=False.',
+        hint='Configure CACHE_URL=redis://host:6379/1, o ALLOW_PROCESS_LOCAL_CACHE=True '
+             'si se ejecuta un único proceso.',
+        id='smartcondominioia.E001',
+    )]
@@ -0,0 +1,86 @@
+from asgiref.sync import async_to_sync
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+
+from users.models import Usuario
+from .export import _contenido
+from .metrics import QueryBudgetExceeded, QueryMetricsMiddleware, registry
+
+
+class StreamingContentTests(SimpleTestCase):
+
+    def _partes(self, producidas):
+        for numero in range(3):
+            producidas.append(numero)
+            yield f'{numero}\n'
+
+    def test_asgi_consume_por_partes(self):
+        producidas = []
+        response = StreamingHttpResponse(_contenido(AsyncRequestFactory().get('/'), self._partes(producidas)))
+        self.assertTrue(response.is_async)
+
+        async def leer_dos():
+            contenido = aiter(response)
+            leidas = [await anext(contenido), await anext(contenido)]
+            await contenido.aclose()
+            return leidas
+
+        self.assertEqual(async_to_sync(leer_dos)(), [b'0\n', b'1\n'])
+        self.assertEqual(producidas, [0, 1])  # El tercer lote todavía no se generó
+
+    def test_wsgi_entrega_el_generador_sync(self):
+        producidas = []
+        response = StreamingHttpResponse(_contenido(RequestFactory().get('/'), self._partes(producidas)))
+        self.assertFalse(response.is_async)
+        self.assertEqual(next(iter(response)), b'0\n')
+        self.assertEqual(producidas, [0])
+
+
+class QueryMetricsMiddlewareTests(TestCase):
+    ENDPOINT = 'UnidadResidencialViewSet.list'  # Presupuesto: 5 consultas
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        # response.close() envía request_finished: no cerrar la conexión dentro del TestCase
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def _request(self):
+        request = RequestFactory().get('/api/users/unidades/')
+        request.resolver_match = resolve(request.path)
+        return request
+
+    def _consultas(self, cantidad):
+        for _ in range(cantidad):
+            Usuario.objects.exists()
+
+    def test_streaming_se_mide_al_cerrar(self):
+        def contenido():
+            self._consultas(2)
+            yield b'fila\n'
+
+        middleware = QueryMetricsMiddleware(lambda request: StreamingHttpResponse(contenido()))
+        response = middleware(self._request())
+        self.assertNotIn(self.ENDPOINT, registry.snapshot()['endpoints'])
+        self.assertEqual(b''.join(response), b'fila\n')
+        response.close()
+
+        queries = registry.snapshot()['endpoints'][self.ENDPOINT]['queries']
+        self.assertEqual((queries['count'], queries['sum']), (1, 2))
+        self.assertFalse(response.has_header('X-Query-Count'))
+        self._consultas(1)  # El wrapper ya no está instalado
+        self.assertEqual(registry.snapshot()['endpoints'][self.ENDPOINT]['queries']['sum'], 2)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_exceder_el_presupuesto_falla_en_modo_estricto(self):
+        def vista(request):
+            self._consultas(6)
+            return HttpResponse()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            QueryMetricsMiddleware(vista)(self._request())
+        self.assertEqual(registry.snapshot()['budget_violations'], {self.ENDPOINT: 1})
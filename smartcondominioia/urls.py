@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     
@@ -28,6 +30,7 @@ urlpatterns = [
     path('api/areas/', include('areas.urls')),
     path('api/communication/', include('communication.urls')),
     path('api/security/', include('security.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
     
     # DRF browsable API authentication
     path('api-auth/', include('rest_framework.urls')),
@@ -0,0 +1,149 @@
+# users/authentication.py
+"""
+Autenticación JWT sin consultar la tabla de usuarios en las lecturas.
+
+LoginView y el refresh emiten tokens con claims firmados: rol, unidades
+(propias y donde reside, las mismas de users.unit_access) y fecha de alta.
+En requests GET/HEAD/OPTIONS, ClaimsJWTAuthentication arma el usuario desde
+esos claims: una instancia de Usuario sin consultar la BD, con el resto de
+campos diferidos (si una vista los lee se cargan en ese momento) y con las
+unidades ya resueltas para los permisos.
+
+Se vuelve a cargar el usuario de la BD (como JWTAuthentication):
+- en escrituras (POST, PUT, PATCH, DELETE);
+- si el token es anterior a la marca de users.token_revocation (cambió el
+  rol, el estado o las unidades del usuario);
+- en tokens sin claims (emitidos antes) y en las acciones listadas en
+  `db_user_actions` de la vista (p. ej. /usuarios/me/, que serializa todo el
+  usuario);
+- siempre, si la caché no es compartida (smartcondominioia.shared_cache): la
+  marca de revocación no llegaría a los demás procesos.
+
+Los refresh tokens (ClaimsRefreshToken) consultan la lista negra a través
+del filtro en memoria de users.blacklist_filter.
+"""
+from datetime import datetime
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from smartcondominioia.shared_cache import shared_cache_available
+from .blacklist_filter import get_blacklist_index
+from .models import Usuario
+from .token_revocation import revoked_at
+from .unit_access import owned_unit_ids, unit_ids
+
+# Con más unidades el token no lleva claims y se usa la BD (tokens chicos)
+MAX_UNIDADES_EN_CLAIMS = 50
+
+
+def claims_for(user):
+    """Claims de autorización del usuario (una consulta si sus unidades no están en caché)"""
+    unidades = unit_ids(user)
+    if len(unidades) > MAX_UNIDADES_EN_CLAIMS:
+        return {}
+    return {
+        'rol': user.rol,
+        'units': sorted(unidades),
+        'own_units': sorted(owned_unit_ids(user)),
+        'since': user.fecha_creacion.isoformat(),
+    }
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """RefreshToken que verifica la lista negra en memoria (BD solo ante un probable positivo)"""
+
+    def check_blacklist(self):
+        if get_blacklist_index().contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        resultado = super().blacklist()  # La señal de BlacklistedToken lo anuncia a los demás procesos
+        get_blacklist_index().added(self.payload[api_settings.JTI_CLAIM])
+        return resultado
+
+
+def tokens_for(user):
+    """RefreshToken con los claims (el access token derivado los copia)"""
+    refresh = ClaimsRefreshToken.for_user(user)
+    refresh.payload.update(claims_for(user))
+    return refresh
+
+
+def user_from_claims(token):
+    """Usuario armado desde un token validado, o None si no se puede confiar en sus claims"""
+    if 'rol' not in token or not shared_cache_available():
+        return None
+    user_id = token[api_settings.USER_ID_CLAIM]
+    marca = revoked_at(user_id)
+    if marca is not None and token.get('iat', 0) <= marca:
+        return None
+    datos = {
+        'id': user_id,
+        'rol': token['rol'],
+        'is_active': True,
+        'fecha_creacion': datetime.fromisoformat(token['since']),
+    }
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in datos]
+    usuario = Usuario.from_db(DEFAULT_DB_ALIAS, campos, [datos[campo] for campo in campos])
+    usuario._unit_access = (frozenset(token['own_units']), frozenset(token['units']))
+    return usuario
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS and self._admite_claims(request):
+            return self.user_for_token(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def _admite_claims(self, request):
+        vista = (getattr(request, 'parser_context', None) or {}).get('view')
+        return getattr(vista, 'action', None) not in getattr(vista, 'db_user_actions', ())
+
+    def user_for_token(self, validated_token):
+        """Usuario desde los claims si son confiables; si no, desde la BD"""
+        return user_from_claims(validated_token) or self.get_user(validated_token)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh que recalcula los claims desde la BD (rol y unidades actuales) y
+    renueva el iat, así el nuevo access token vuelve a pasar la revocación.
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        usuario = Usuario.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if usuario is None:
+            raise AuthenticationFailed('Usuario inactivo o inexistente', code='user_inactive')
+        for claim in ('rol', 'units', 'own_units', 'since'):
+            refresh.payload.pop(claim, None)
+        refresh.payload.update(claims_for(usuario))
+        refresh.set_iat()
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            data['refresh'] = str(refresh)
+
+        return data
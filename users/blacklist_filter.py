@@ -0,0 +1,188 @@
+# users/blacklist_filter.py
+"""
+Acelerador en memoria de la lista negra de refresh tokens (token_blacklist).
+
+Cada proceso mantiene un filtro de Bloom con los JTI de los tokens en lista
+negra que aún no expiraron, más un LRU exacto de JTI confirmados:
+
+- "no está en el filtro" -> el token no está en la lista negra, sin consultar la BD;
+- "puede estar" -> LRU exacto y, si no está, una consulta por jti.
+
+El costo de verificar un refresh no crece con la tabla. El filtro se carga
+al primer uso (solo tokens sin expirar; los expirados ya fallan al
+decodificarse) y se reconstruye cuando supera su capacidad
+(manage.py purge_token_blacklist borra los expirados).
+
+Sincronización entre procesos: cada BlacklistedToken confirmado (señal
+post_save + on_commit) incrementa la generación en la caché compartida y
+guarda su jti bajo ese número. La generación es la marca de agua de lo
+confirmado: un proceso aplica las entradas en orden y solo responde "no
+está" sin consultar la BD si aplicó todas hasta la generación actual. Si una
+entrada falta (aún no escrita, o desalojada) responde desde la BD; si sigue
+faltando pasado ESPERA_ENTRADA, recarga el filtro completo.
+
+Requiere una caché compartida (smartcondominioia.shared_cache); si no la
+hay, cada verificación consulta la BD.
+"""
+import hashlib
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from smartcondominioia.shared_cache import shared_cache_available
+
+PREFIJO = 'token_blacklist'
+CLAVE_GENERACION = f'{PREFIJO}:gen'
+ENTRADA_TTL = 24 * 3600
+# Segundos que se espera una entrada anunciada antes de recargar desde la BD
+ESPERA_ENTRADA = 5
+# Con más entradas pendientes es más barato recargar el filtro
+MAX_ENTRADAS_POR_SINCRONIZACION = 1000
+
+
+def _clave_entrada(generacion):
+    return f'{PREFIJO}:entry:{generacion}'
+
+
+def _generacion_actual():
+    """Generación en la caché; si no existe se crea con una base aleatoria, así
+    un reinicio de la clave nunca coincide con lo que un proceso ya aplicó"""
+    generacion = cache.get(CLAVE_GENERACION)
+    if generacion is None:
+        cache.add(CLAVE_GENERACION, secrets.randbits(40) << 20, timeout=None)
+        generacion = cache.get(CLAVE_GENERACION)
+    return generacion
+
+
+def announce(jti):
+    """Publica un jti recién agregado a la lista negra (llamar después del commit)"""
+    _generacion_actual()
+    generacion = cache.incr(CLAVE_GENERACION)
+    cache.set(_clave_entrada(generacion), jti, ENTRADA_TTL)
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray con k posiciones por doble hashing"""
+
+    def __init__(self, capacidad, tasa_error):
+        self.capacidad = capacidad
+        self.bits = max(8, int(-capacidad * math.log(tasa_error) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacidad * math.log(2)))
+        self.arreglo = bytearray((self.bits + 7) // 8)
+        self.cantidad = 0
+
+    def _posiciones(self, valor):
+        digest = hashlib.blake2b(valor.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, valor):
+        for posicion in self._posiciones(valor):
+            self.arreglo[posicion >> 3] |= 1 << (posicion & 7)
+        self.cantidad += 1
+
+    def __contains__(self, valor):
+        return all(self.arreglo[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+
+class BlacklistIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filtro = None
+        self._confirmados = OrderedDict()
+        self._generacion = None
+        self._faltante_desde = None
+
+    def _config(self, nombre, por_defecto):
+        return getattr(settings, nombre, por_defecto)
+
+    def _cargar(self, generacion):
+        """Reconstruye el filtro con los tokens en lista negra sin expirar.
+        `generacion` se lee antes: todo lo anunciado hasta ahí ya está confirmado en la BD."""
+        self._filtro = BloomFilter(
+            self._config('TOKEN_BLACKLIST_BLOOM_CAPACITY', 1_000_000),
+            self._config('TOKEN_BLACKLIST_BLOOM_ERROR_RATE', 0.001),
+        )
+        filas = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list('token__jti', flat=True).order_by().iterator(chunk_size=10000)
+        )
+        for jti in filas:
+            self._filtro.add(jti)
+        self._generacion = generacion
+        self._faltante_desde = None
+
+    def _sincronizar(self):
+        """Aplica las entradas anunciadas; True si el filtro está al día con la generación actual"""
+        actual = _generacion_actual()
+        if (
+            self._filtro is None
+            or self._filtro.cantidad > self._filtro.capacidad
+            or actual < self._generacion
+            or actual - self._generacion > MAX_ENTRADAS_POR_SINCRONIZACION
+        ):
+            self._cargar(actual)
+            return True
+        if actual == self._generacion:
+            return True
+
+        pendientes = range(self._generacion + 1, actual + 1)
+        entradas = cache.get_many([_clave_entrada(generacion) for generacion in pendientes])
+        for generacion in pendientes:
+            jti = entradas.get(_clave_entrada(generacion))
+            if jti is None:
+                if self._faltante_desde is None:
+                    self._faltante_desde = time.monotonic()
+                elif time.monotonic() - self._faltante_desde > ESPERA_ENTRADA:
+                    self._cargar(actual)
+                    return True
+                return False
+            self._filtro.add(jti)
+            self._generacion = generacion
+            self._faltante_desde = None
+        return True
+
+    def _confirmar(self, jti):
+        self._confirmados[jti] = True
+        self._confirmados.move_to_end(jti)
+        while len(self._confirmados) > self._config('TOKEN_BLACKLIST_LRU_SIZE', 10_000):
+            self._confirmados.popitem(last=False)
+
+    def contains(self, jti):
+        """True si el token con ese jti está en la lista negra"""
+        if shared_cache_available():
+            with self._lock:
+                al_dia = self._sincronizar()
+                if al_dia and jti not in self._filtro:
+                    return False
+                if jti in self._confirmados:
+                    self._confirmados.move_to_end(jti)
+                    return True
+        # Probable positivo (o filtro no confiable): se confirma en la BD
+        if not BlacklistedToken.objects.filter(token__jti=jti).exists():
+            return False
+        with self._lock:
+            self._confirmar(jti)
+        return True
+
+    def added(self, jti):
+        """Registra localmente un token recién agregado (los demás procesos lo reciben por announce)"""
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.add(jti)
+            self._confirmar(jti)
+
+
+_index = BlacklistIndex()
+
+
+def get_blacklist_index():
+    return _index
@@ -0,0 +1,94 @@
+# users/credentials.py
+"""
+Verificación de credenciales del login.
+
+- Búsqueda por email sin distinguir mayúsculas, sobre el índice único
+  parcial de LOWER(email) (Usuario.con_email).
+- El hash (Argon2 / PBKDF2, ver users.hashers) corre en un pool acotado de
+  LOGIN_HASH_WORKERS hilos por proceso: como mucho esa cantidad de hashes
+  consume CPU a la vez. Con LOGIN_HASH_QUEUE requests esperando, los
+  siguientes esperan hasta LOGIN_HASH_TIMEOUT segundos y luego reciben
+  HashingBusy (el login responde 503) en lugar de acumularse.
+- Si el email no existe se verifica contra un hash de relleno con el mismo
+  costo: la respuesta tarda lo mismo y no revela qué emails existen.
+- Si el hasher preferido o su costo cambió, el hash se regenera en el pool y
+  se guarda con un UPDATE de la columna password.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.crypto import get_random_string
+
+from .models import Usuario
+
+
+class HashingBusy(Exception):
+    """El pool de hashing está saturado; el cliente debe reintentar"""
+
+
+_pool = None
+_cupos = None
+_pool_lock = threading.Lock()
+_hash_relleno = None
+
+
+def _config(nombre, por_defecto):
+    return getattr(settings, nombre, por_defecto)
+
+
+def _get_pool():
+    global _pool, _cupos
+    with _pool_lock:
+        if _pool is None:
+            trabajadores = _config('LOGIN_HASH_WORKERS', 2)
+            _pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='login-hash')
+            _cupos = threading.BoundedSemaphore(trabajadores + _config('LOGIN_HASH_QUEUE', 16))
+    return _pool, _cupos
+
+
+def _ejecutar(funcion, *args):
+    pool, cupos = _get_pool()
+    if not cupos.acquire(timeout=_config('LOGIN_HASH_TIMEOUT', 5)):
+        raise HashingBusy()
+    try:
+        return pool.submit(funcion, *args).result()
+    finally:
+        cupos.release()
+
+
+def _verificar(password, encoded):
+    """(válida, hash_nuevo): hash_nuevo si hay que regenerarlo con el hasher actual"""
+    nuevos = []
+    valida = check_password(password, encoded, setter=lambda raw: nuevos.append(make_password(raw)))
+    return valida, (nuevos[0] if nuevos else None)
+
+
+def _verificar_relleno(password):
+    global _hash_relleno
+    if _hash_relleno is None:
+        _hash_relleno = make_password(get_random_string(32))
+    return _verificar(password, _hash_relleno)
+
+
+def dummy_check(password):
+    """Hash con el mismo costo que uno real, para emails inexistentes"""
+    _ejecutar(_verificar_relleno, password)
+
+
+def authenticate_credentials(email, password):
+    """Usuario si el email y la contraseña son correctos, o None. Puede lanzar HashingBusy."""
+    user = Usuario.con_email(email).first()
+    if user is None:
+        dummy_check(password)
+        return None
+
+    valida, nuevo = _ejecutar(_verificar, password, user.password)
+    if not valida:
+        return None
+    if nuevo:
+        # Solo si nadie cambió la contraseña mientras tanto
+        Usuario.objects.filter(pk=user.pk, password=user.password).update(password=nuevo)
+        user.password = nuevo
+    return user
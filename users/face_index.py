@@ -0,0 +1,330 @@
+# users/face_index.py
+"""
+Índice vectorial de encodings faciales para reconocimiento en portería.
+
+Mantiene los encodings de todos los usuarios activos en una matriz NumPy
+contigua (float32) persistida en disco y cargada con memory-map, de modo que
+identificar un rostro cuesta un único cálculo de distancias por lotes.
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+def parse_encoding(valor):
+    """
+    Convierte el texto de `Usuario.encoding_facial` en un vector float32.
+    Acepta una lista JSON ("[0.1, 0.2, ...]") o valores separados por comas/espacios.
+    Retorna None si el texto está vacío o no es válido.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        datos = valor
+    else:
+        texto = str(valor).strip()
+        if not texto:
+            return None
+        try:
+            datos = json.loads(texto)
+        except ValueError:
+            datos = texto.replace(',', ' ').split()
+    try:
+        vector = np.asarray(datos, dtype=np.float32).ravel()
+    except (TypeError, ValueError):
+        return None
+    if vector.size == 0 or not np.all(np.isfinite(vector)):
+        return None
+    return vector
+
+
+class FaceIndex:
+    """
+    Matriz de encodings (N x D) + vector de ids de usuario.
+    Las lecturas usan una instantánea inmutable (ids, matriz, normas); las
+    escrituras construyen una nueva matriz, la persisten de forma atómica y
+    reemplazan la instantánea.
+
+    Varios procesos comparten el directorio: las escrituras se serializan con
+    un bloqueo de archivo y parten de la última generación en disco, y cada
+    consulta compara el mtime (e inodo) de `actual.json` con el de la
+    generación cargada para recargar la que haya escrito otro proceso.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = Path(directorio)
+        self._lock = threading.Lock()
+        self._instantanea = (
+            np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.float32)
+        )
+        self._generacion = 0
+        self._firma_cargada = None
+        self._cargado = False
+
+    @property
+    def _ruta_manifiesto(self):
+        return self.directorio / 'actual.json'
+
+    def _rutas(self, generacion):
+        return (
+            self.directorio / f'encodings-{generacion}.npy',
+            self.directorio / f'usuario_ids-{generacion}.npy',
+        )
+
+    def __len__(self):
+        self._asegurar_cargado()
+        return len(self._instantanea[0])
+
+    @property
+    def dimension(self):
+        self._asegurar_cargado()
+        matriz = self._instantanea[1]
+        return matriz.shape[1] if matriz.ndim == 2 else 0
+
+    # ---------- Carga y persistencia ----------
+
+    def _firma_manifiesto(self):
+        """(inodo, mtime) de actual.json: cada os.replace crea un archivo nuevo"""
+        try:
+            estado = os.stat(self._ruta_manifiesto)
+        except OSError:
+            return None
+        return estado.st_ino, estado.st_mtime_ns
+
+    def _al_dia(self):
+        return self._cargado and self._firma_manifiesto() == self._firma_cargada
+
+    @contextmanager
+    def _bloqueo_archivo(self):
+        """Bloqueo exclusivo entre procesos para escribir generaciones"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        with open(self.directorio / 'indice.lock', 'a+b') as archivo:
+            if fcntl is not None:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(archivo, fcntl.LOCK_UN)
+                else:
+                    archivo.seek(0)
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _asegurar_cargado(self):
+        if self._al_dia():
+            return
+        with self._lock:
+            if self._al_dia():
+                return
+            if not self._cargar_sin_lock():
+                with self._bloqueo_archivo():
+                    # Otro proceso pudo escribir una generación mientras se esperaba el bloqueo
+                    if not self._cargar_sin_lock():
+                        self._reconstruir_sin_lock()
+            self._cargado = True
+
+    def _cargar_sin_lock(self):
+        """Carga la generación del manifiesto; False si no hay una completa en disco"""
+        firma = self._firma_manifiesto()  # Antes de leer: si cambia después, se vuelve a cargar
+        generacion = self._leer_generacion()
+        if not generacion:
+            return False
+        ruta_matriz, ruta_ids = self._rutas(generacion)
+        try:
+            ids = np.load(ruta_ids)
+            matriz = np.load(ruta_matriz, mmap_mode='r' if len(ids) else None)
+        except (OSError, ValueError):
+            return False  # Generación reemplazada y borrada mientras se leía
+        self._generacion = generacion
+        self._firma_cargada = firma
+        self._publicar(ids, matriz)
+        return True
+
+    def _publicar(self, ids, matriz):
+        """Reemplaza la instantánea de lectura en una sola asignación"""
+        normas = np.einsum('ij,ij->i', matriz, matriz) if len(ids) else np.empty(0, dtype=np.float32)
+        self._instantanea = (ids, matriz, normas.astype(np.float32, copy=False))
+
+    def _leer_generacion(self):
+        try:
+            return json.loads(self._ruta_manifiesto.read_text())['generacion']
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _persistir(self, ids, matriz):
+        """
+        Escribe una nueva generación de archivos y la vuelve a abrir como memory-map
+        (con el bloqueo de archivo tomado).
+        Se usan archivos nuevos por generación porque un archivo mapeado no puede
+        reemplazarse en Windows mientras haya lecturas en curso.
+        """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        anterior = max(self._generacion, self._leer_generacion())
+        self._generacion = anterior + 1
+        ruta_matriz, ruta_ids = self._rutas(self._generacion)
+        np.save(ruta_matriz, matriz)
+        np.save(ruta_ids, ids)
+
+        temporal = self._ruta_manifiesto.with_suffix('.tmp')
+        temporal.write_text(json.dumps({'generacion': self._generacion}))
+        os.replace(temporal, self._ruta_manifiesto)
+        self._firma_cargada = self._firma_manifiesto()
+
+        if len(ids):
+            matriz = np.load(ruta_matriz, mmap_mode='r')
+        self._publicar(ids, matriz)
+
+        # Limpieza de la generación anterior (puede seguir mapeada en Windows)
+        for ruta in self._rutas(anterior):
+            try:
+                ruta.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def reconstruir(self):
+        """Reconstruye el índice completo desde la base de datos"""
+        with self._lock, self._bloqueo_archivo():
+            self._reconstruir_sin_lock()
+            self._cargado = True
+        return len(self._instantanea[0])
+
+    def _reconstruir_sin_lock(self):
+        from .models import Usuario
+
+        filas = (
+            Usuario.objects.filter(is_active=True)
+            .exclude(encoding_facial__isnull=True)
+            .exclude(encoding_facial='')
+            .values_list('id', 'encoding_facial')
+            .iterator(chunk_size=2000)
+        )
+        ids, vectores, dimension = [], [], None
+        for usuario_id, encoding in filas:
+            vector = parse_encoding(encoding)
+            if vector is None:
+                continue
+            if dimension is None:
+                dimension = vector.size
+            if vector.size != dimension:
+                logger.warning(
+                    'Encoding facial del usuario %s ignorado: dimensión %s, el índice usa %s',
+                    usuario_id, vector.size, dimension,
+                )
+                continue
+            ids.append(usuario_id)
+            vectores.append(vector)
+
+        if vectores:
+            matriz = np.vstack(vectores).astype(np.float32, copy=False)
+        else:
+            matriz = np.empty((0, 0), dtype=np.float32)
+        self._persistir(np.asarray(ids, dtype=np.int64), matriz)
+
+    # ---------- Actualización incremental ----------
+
+    def actualizar(self, usuario_id, encoding, activo=True):
+        """
+        Inserta, reemplaza o elimina el encoding de un usuario.
+        Retorna True si el índice cambió.
+        """
+        self._asegurar_cargado()
+        vector = parse_encoding(encoding) if activo else None
+
+        with self._lock, self._bloqueo_archivo():
+            # Partir de la última generación, aunque la haya escrito otro proceso
+            if self._firma_manifiesto() != self._firma_cargada and not self._cargar_sin_lock():
+                self._reconstruir_sin_lock()
+                return True
+            ids, matriz, _ = self._instantanea
+            posiciones = np.flatnonzero(ids == usuario_id)
+            pos = int(posiciones[0]) if posiciones.size else None
+
+            if vector is None:
+                if pos is None:
+                    return False
+                nuevos_ids = np.delete(ids, pos)
+                nueva_matriz = np.delete(matriz, pos, axis=0)
+            else:
+                if matriz.size and vector.size != matriz.shape[1]:
+                    logger.warning(
+                        'Encoding facial del usuario %s no indexado: dimensión %s, el índice usa %s',
+                        usuario_id, vector.size, matriz.shape[1],
+                    )
+                    return False
+                if pos is not None:
+                    if np.array_equal(matriz[pos], vector):
+                        return False
+                    nuevos_ids = ids
+                    nueva_matriz = np.array(matriz, dtype=np.float32)
+                    nueva_matriz[pos] = vector
+                elif matriz.size:
+                    nuevos_ids = np.append(ids, np.int64(usuario_id))
+                    nueva_matriz = np.vstack([matriz, vector[np.newaxis, :]])
+                else:
+                    nuevos_ids = np.asarray([usuario_id], dtype=np.int64)
+                    nueva_matriz = vector[np.newaxis, :].copy()
+
+            self._persistir(nuevos_ids, nueva_matriz)
+        return True
+
+    def eliminar(self, usuario_id):
+        return self.actualizar(usuario_id, None, activo=False)
+
+    # ---------- Búsqueda ----------
+
+    def buscar(self, encoding, tolerancia=None, k=1):
+        """
+        Retorna hasta `k` tuplas (usuario_id, distancia) ordenadas por distancia
+        euclidiana, filtrando las que superan la tolerancia.
+        """
+        self._asegurar_cargado()
+        vector = parse_encoding(encoding)
+        ids, matriz, normas = self._instantanea
+        if vector is None or not len(ids) or vector.size != matriz.shape[1]:
+            return []
+        if tolerancia is None:
+            tolerancia = getattr(settings, 'FACE_MATCH_TOLERANCE', 0.6)
+
+        # ||a - b||² = ||a||² - 2a·b + ||b||²  (un solo producto matriz-vector)
+        distancias = normas - 2.0 * (matriz @ vector) + float(vector @ vector)
+        np.maximum(distancias, 0.0, out=distancias)
+        k = min(k, len(ids))
+        candidatos = np.argpartition(distancias, k - 1)[:k]
+        candidatos = candidatos[np.argsort(distancias[candidatos])]
+
+        limite = tolerancia * tolerancia
+        return [
+            (int(ids[i]), float(np.sqrt(distancias[i])))
+            for i in candidatos if distancias[i] <= limite
+        ]
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def get_face_index():
+    """Instancia única del índice por proceso"""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = FaceIndex(getattr(settings, 'FACE_INDEX_DIR', settings.BASE_DIR / 'face_index'))
+    return _indice
@@ -0,0 +1,43 @@
+# users/hashers.py
+"""
+Hashers de contraseñas con costo configurable desde settings.
+
+- TunedArgon2PasswordHasher: Argon2id con PASSWORD_ARGON2 = {'time_cost',
+  'memory_cost' (KiB), 'parallelism'}. Requiere argon2-cffi.
+- TunedPBKDF2PasswordHasher: PBKDF2-SHA256 con PASSWORD_PBKDF2_ITERATIONS.
+
+Mantienen el nombre de algoritmo de Django ('argon2', 'pbkdf2_sha256'): los
+hashes existentes siguen validando, y si cambia el costo configurado
+`must_update` es verdadero y el hash se regenera en el próximo login
+(ver users.credentials).
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+ARGON2_POR_DEFECTO = {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1}
+
+
+def _argon2(parametro):
+    return getattr(settings, 'PASSWORD_ARGON2', {}).get(parametro, ARGON2_POR_DEFECTO[parametro])
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+
+    @property
+    def time_cost(self):
+        return _argon2('time_cost')
+
+    @property
+    def memory_cost(self):
+        return _argon2('memory_cost')
+
+    @property
+    def parallelism(self):
+        return _argon2('parallelism')
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,67 @@
+# users/last_login.py
+"""
+Actualización diferida de Usuario.last_login.
+
+El login no escribe en la tabla de usuarios: `record(user_id)` deja el
+instante en un buffer del proceso y un hilo lo vuelca cada
+LAST_LOGIN_FLUSH_SECONDS con un único UPDATE ... CASE (bulk_update) para
+todos los usuarios que iniciaron sesión en ese intervalo. Con 0 se escribe
+en el momento. Al terminar el proceso se vuelca lo pendiente.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Usuario
+
+logger = logging.getLogger(__name__)
+
+_pendientes = {}
+_lock = threading.Lock()
+_timer = None
+
+
+def record(user_id, momento=None):
+    """Registra un login; se escribe en el próximo volcado"""
+    global _timer
+    momento = momento or timezone.now()
+    intervalo = getattr(settings, 'LAST_LOGIN_FLUSH_SECONDS', 10)
+    if not intervalo:
+        Usuario.objects.filter(pk=user_id).update(last_login=momento)
+        return
+    with _lock:
+        _pendientes[user_id] = momento
+        if _timer is None:
+            _timer = threading.Timer(intervalo, _volcar)
+            _timer.daemon = True
+            _timer.start()
+
+
+def flush():
+    """Escribe los logins pendientes. Retorna cuántos usuarios se actualizaron."""
+    global _pendientes, _timer
+    with _lock:
+        lote, _pendientes, _timer = _pendientes, {}, None
+    if not lote:
+        return 0
+    Usuario.objects.bulk_update(
+        [Usuario(pk=user_id, last_login=momento) for user_id, momento in lote.items()],
+        ['last_login'], batch_size=500,
+    )
+    return len(lote)
+
+
+def _volcar():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Error al volcar last_login')
+    finally:
+        connections.close_all()
+
+
+atexit.register(_volcar)
@@ -0,0 +1,89 @@
+import json
+import os
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.crypto import get_random_string
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from users.models import Usuario
+from users.views import LoginView
+
+
+class Command(BaseCommand):
+    help = 'Mide logins por segundo (y por núcleo) con el hasher y el pool de hashing configurados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Cantidad de logins a medir')
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1,
+                            help='Logins simultáneos (hilos)')
+        parser.add_argument('--hash-only', action='store_true',
+                            help='Mide solo la verificación del hash, sin la vista ni la BD')
+
+    def handle(self, *args, **options):
+        password = get_random_string(24)
+        usuario = Usuario.objects.create_user(
+            username=f'benchmark-login-{get_random_string(8)}',
+            email=f'benchmark-login-{get_random_string(8)}@example.invalid',
+            password=password,
+        )
+        try:
+            hasher = identify_hasher(usuario.password)
+            self.stdout.write(f'Hasher: {hasher.algorithm} {self._parametros(hasher, usuario.password)}')
+            muestras = []
+            for _ in range(min(20, options['logins'])):
+                inicio = time.perf_counter()
+                check_password(password, usuario.password)
+                muestras.append((time.perf_counter() - inicio) * 1000)
+            self.stdout.write(f'Hash: mediana {statistics.median(muestras):.1f} ms en un hilo '
+                              f'(máximo teórico {1000 / statistics.median(muestras):.1f} por segundo y núcleo)')
+            if options['hash_only']:
+                return
+            self._medir_logins(usuario, password, options['logins'], options['concurrency'])
+        finally:
+            OutstandingToken.objects.filter(user=usuario).delete()
+            usuario.delete()
+
+    def _parametros(self, hasher, encoded):
+        resumen = hasher.safe_summary(encoded)
+        return {clave: valor for clave, valor in resumen.items() if clave not in ('algorithm', 'hash', 'salt')}
+
+    def _medir_logins(self, usuario, password, total, concurrencia):
+        vista = LoginView.as_view()
+        cuerpo = json.dumps({'email': usuario.email, 'password': password})
+        estados, lock = {}, threading.Lock()
+
+        def trabajar(cantidad):
+            fabrica = APIRequestFactory()
+            try:
+                for _ in range(cantidad):
+                    respuesta = vista(fabrica.post('/api/users/login/', cuerpo, content_type='application/json'))
+                    with lock:
+                        estados[respuesta.status_code] = estados.get(respuesta.status_code, 0) + 1
+            finally:
+                connections.close_all()
+
+        hilos = [
+            threading.Thread(target=trabajar, args=(total // concurrencia + (i < total % concurrencia),))
+            for i in range(concurrencia)
+        ]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        nucleos = min(concurrencia, getattr(settings, 'LOGIN_HASH_WORKERS', 2), os.cpu_count() or 1)
+        por_segundo = estados.get(200, 0) / duracion
+        self.stdout.write(f'Respuestas: {dict(sorted(estados.items()))}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{por_segundo:.1f} logins/s con {concurrencia} hilos; '
+            f'{por_segundo / nucleos:.1f} logins/s por núcleo ({nucleos} núcleos de hashing)'
+        ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Elimina por lotes los refresh tokens expirados (pendientes y en lista negra)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tokens por lote (un DELETE por tabla)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Segundos entre ejecuciones; 0 ejecuta una vez y termina')
+
+    def handle(self, *args, **options):
+        while True:
+            borrados = self._purgar(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{borrados} tokens expirados eliminados'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def _purgar(self, tamanio):
+        ahora = timezone.now()
+        total = 0
+        while True:
+            # Por id: los expirados son los más antiguos, el recorrido del PK se corta pronto
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=ahora)
+                .order_by('id').values_list('id', flat=True)[:tamanio]
+            )
+            if not ids:
+                return total
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
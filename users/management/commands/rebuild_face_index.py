@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.face_index import get_face_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice vectorial de encodings faciales desde la base de datos'
+
+    def handle(self, *args, **options):
+        total = get_face_index().reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Índice facial reconstruido con {total} encodings'))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='residente',
+            index=models.Index(fields=['activo', 'tipo_residente'], name='residente_activo_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol', 'is_active', 'id'], name='usuario_rol_activo_idx'),
+        ),
+    ]
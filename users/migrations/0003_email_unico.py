@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='usuario',
+            constraint=models.UniqueConstraint(condition=models.Q(('email', ''), _negated=True), fields=('email',), name='usuario_email_unico'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:41
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def verificar_duplicados(apps, schema_editor):
+    """Aborta con un mensaje claro si hay emails que solo difieren en mayúsculas"""
+    Usuario = apps.get_model('users', 'Usuario')
+    duplicados = list(
+        Usuario.objects.exclude(email='').order_by()
+        .values(email_normalizado=Lower('email'))
+        .annotate(cantidad=Count('id')).filter(cantidad__gt=1)
+        .values_list('email_normalizado', flat=True)[:50]
+    )
+    if duplicados:
+        raise RuntimeError(
+            'Hay usuarios con el mismo email en distintas mayúsculas; corríjalos antes de migrar. Emails: '
+            + ', '.join(duplicados)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_email_unico'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='usuario',
+            name='usuario_email_unico',
+        ),
+        migrations.AddConstraint(
+            model_name='usuario',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='usuario_email_unico'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 # users/models.py
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class Usuario(AbstractUser):
@@ -20,11 +21,40 @@ class Usuario(AbstractUser):
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
+        indexes = [
+            models.Index(fields=['rol', 'is_active', 'id'], name='usuario_rol_activo_idx'),
+        ]
+        constraints = [
+            # Búsqueda del login por email sin distinguir mayúsculas; los usuarios sin email quedan fuera
+            models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='usuario_email_unico'),
+        ]
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
     
     def __str__(self):
         return f"{self.username} ({self.get_rol_display()})"
+    
+    @classmethod
+    def con_email(cls, email):
+        """Usuarios con ese email sin distinguir mayúsculas (usa el índice de usuario_email_unico)"""
+        return cls.objects.alias(email_normalizado=Lower('email')).filter(
+            email_normalizado=email.lower()
+        ).exclude(email='')
+
+
+class UnidadResidencialQuerySet(models.QuerySet):
+    def con_residentes(self):
+        """
+        Carga propietario y residentes activos (con su usuario) en un número fijo de
+        consultas, para serializar listados de unidades sin N+1.
+        """
+        return self.select_related('propietario').prefetch_related(
+            models.Prefetch(
+                'residentes',
+                queryset=Residente.objects.filter(activo=True).select_related('usuario'),
+                to_attr='residentes_activos_cache'
+            )
+        )
 
 
 class UnidadResidencial(models.Model):
@@ -47,6 +77,8 @@ class UnidadResidencial(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     
+    objects = UnidadResidencialQuerySet.as_manager()
+    
     class Meta:
         ordering = ['numero_unidad']
         verbose_name = 'Unidad Residencial'
@@ -56,12 +88,22 @@ class UnidadResidencial(models.Model):
         return f"Unidad {self.numero_unidad}"
     
     def obtener_residentes_activos(self):
-        """Retorna los residentes activos de la unidad"""
+        """Retorna los residentes activos de la unidad (usa el prefetch de con_residentes si existe)"""
+        if hasattr(self, 'residentes_activos_cache'):
+            return self.residentes_activos_cache
         return self.residentes.filter(activo=True)
     
     def obtener_residente_principal(self):
         """Retorna el residente principal (propietario o inquilino principal)"""
+        if hasattr(self, 'residentes_activos_cache'):
+            return next((r for r in self.residentes_activos_cache if r.es_principal), None)
         return self.residentes.filter(activo=True, es_principal=True).first()
+    
+    def cantidad_residentes_activos(self):
+        """Cantidad de residentes activos"""
+        if hasattr(self, 'residentes_activos_cache'):
+            return len(self.residentes_activos_cache)
+        return self.residentes.filter(activo=True).count()
 
 
 class Residente(models.Model):
@@ -86,6 +128,9 @@ class Residente(models.Model):
     
     class Meta:
         ordering = ['-es_principal', '-fecha_creacion']
+        indexes = [
+            models.Index(fields=['activo', 'tipo_residente'], name='residente_activo_tipo_idx'),
+        ]
         verbose_name = 'Residente'
         verbose_name_plural = 'Residentes'
     
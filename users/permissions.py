@@ -5,79 +5,83 @@ Roles: ADMIN, RESIDENTE, SEGURIDAD, MANTENIMIENTO
 """
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from .models import UnidadResidencial
+from .unit_access import owned_unit_ids, unit_ids
 
-class IsAdmin(BasePermission):
+
+# Métodos permitidos en `metodos_por_rol`
+TODOS = None
+LECTURA = frozenset(SAFE_METHODS)
+
+
+class RolePermission(BasePermission):
+    """
+    Permiso por rol declarativo. `metodos_por_rol`: rol -> TODOS o conjunto de
+    métodos HTTP; `metodos_otros_roles` aplica al resto de los usuarios
+    autenticados. Se compila a frozensets al definir la clase, así cada
+    request es una búsqueda en un diccionario.
+    """
+    metodos_por_rol = {}
+    metodos_otros_roles = frozenset()
+    _metodos = {}
+    _metodos_otros = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._metodos = {
+            rol: TODOS if metodos is TODOS else frozenset(metodos)
+            for rol, metodos in cls.metodos_por_rol.items()
+        }
+        cls._metodos_otros = cls.metodos_otros_roles if cls.metodos_otros_roles is TODOS else frozenset(cls.metodos_otros_roles)
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        metodos = self._metodos.get(user.rol, self._metodos_otros)
+        return metodos is TODOS or request.method in metodos
+
+
+class IsAdmin(RolePermission):
     """
     Permite acceso solo a usuarios con rol ADMIN.
     """
     message = "Solo los administradores pueden realizar esta acción."
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.rol == 'ADMIN'
-        )
+    metodos_por_rol = {'ADMIN': TODOS}
 
 
-class IsAdminOrReadOnly(BasePermission):
+class IsAdminOrReadOnly(RolePermission):
     """
     ADMIN tiene acceso completo, otros roles solo lectura.
     """
     message = "Solo los administradores pueden modificar este recurso."
-    
-    def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if request.method in SAFE_METHODS:
-            return True
-        
-        return request.user.rol == 'ADMIN'
+    metodos_por_rol = {'ADMIN': TODOS}
+    metodos_otros_roles = LECTURA
 
 
-class IsAdminOrSecurity(BasePermission):
+class IsAdminOrSecurity(RolePermission):
     """
     Permite acceso a usuarios con rol ADMIN o SEGURIDAD.
     """
     message = "Solo administradores o personal de seguridad pueden realizar esta acción."
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.rol in ['ADMIN', 'SEGURIDAD']
-        )
+    metodos_por_rol = {'ADMIN': TODOS, 'SEGURIDAD': TODOS}
 
 
-class IsAdminOrSecurityOrReadOnly(BasePermission):
+class IsAdminOrSecurityOrReadOnly(RolePermission):
     """
     ADMIN/SEGURIDAD tienen acceso completo, otros roles solo lectura.
     """
     message = "Solo administradores o seguridad pueden modificar este recurso."
-    
-    def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if request.method in SAFE_METHODS:
-            return True
-        
-        return request.user.rol in ['ADMIN', 'SEGURIDAD']
+    metodos_por_rol = {'ADMIN': TODOS, 'SEGURIDAD': TODOS}
+    metodos_otros_roles = LECTURA
 
 
-class IsAdminOrMaintenance(BasePermission):
+class IsAdminOrMaintenance(RolePermission):
     """
     Permite acceso a usuarios con rol ADMIN o MANTENIMIENTO.
     """
     message = "Solo administradores o personal de mantenimiento pueden realizar esta acción."
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.rol in ['ADMIN', 'MANTENIMIENTO']
-        )
+    metodos_por_rol = {'ADMIN': TODOS, 'MANTENIMIENTO': TODOS}
 
 
 class IsOwnerOrAdmin(BasePermission):
@@ -94,13 +98,10 @@ class IsOwnerOrAdmin(BasePermission):
         if request.user.rol == 'ADMIN':
             return True
         
-        # Verificar si el usuario es el dueño
-        if hasattr(obj, 'propietario'):
-            return obj.propietario == request.user
-        if hasattr(obj, 'usuario'):
-            return obj.usuario == request.user
-        if hasattr(obj, 'residente'):
-            return obj.residente == request.user
+        # Verificar si el usuario es el dueño (por id, sin cargar la relación)
+        for campo in ('propietario_id', 'usuario_id', 'residente_id'):
+            if hasattr(obj, campo):
+                return getattr(obj, campo) == request.user.pk
         
         return False
 
@@ -118,122 +119,125 @@ class IsSelfOrAdmin(BasePermission):
         if request.user.rol == 'ADMIN':
             return True
         
-        return obj == request.user
+        return obj.pk == request.user.pk
 
 
-class CanManageVisits(BasePermission):
+class CanManageVisits(RolePermission):
     """
     ADMIN, SEGURIDAD: acceso completo
     RESIDENTE: solo sus propias visitas
     """
     message = "No tienes permiso para gestionar visitas."
-    
-    def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        # ADMIN y SEGURIDAD pueden todo
-        if request.user.rol in ['ADMIN', 'SEGURIDAD']:
-            return True
-        
-        # RESIDENTE puede crear y ver
-        if request.user.rol == 'RESIDENTE':
-            return request.method in SAFE_METHODS or request.method == 'POST'
-        
-        return False
+    # RESIDENTE puede crear y ver
+    metodos_por_rol = {'ADMIN': TODOS, 'SEGURIDAD': TODOS, 'RESIDENTE': LECTURA | {'POST'}}
     
     def has_object_permission(self, request, view, obj):
-        if request.user.rol in ['ADMIN', 'SEGURIDAD']:
+        if request.user.rol in ('ADMIN', 'SEGURIDAD'):
             return True
         
         # RESIDENTE solo puede ver/editar sus propias visitas
-        if hasattr(obj, 'residente'):
-            return obj.residente == request.user
-        if hasattr(obj, 'unidad'):
-            return obj.unidad.propietario == request.user
+        if hasattr(obj, 'residente_id'):
+            return obj.residente_id == request.user.pk
+        if hasattr(obj, 'unidad_id'):
+            return obj.unidad_id in owned_unit_ids(request.user)
         
         return False
 
 
-class CanManageFinances(BasePermission):
+def unit_id_of(obj):
+    """Unidad a la que pertenece un objeto, por FK id (Payment: fee.unit_id)"""
+    if isinstance(obj, UnidadResidencial):
+        return obj.pk
+    for campo in ('unidad_id', 'unit_id'):
+        if hasattr(obj, campo):
+            return getattr(obj, campo)
+    if hasattr(obj, 'fee_id'):
+        return obj.fee.unit_id  # Con select_related('fee') no consulta
+    return None
+
+
+class ResourcePermission(BasePermission):
+    """
+    Permiso derivado de ROLE_CAPABILITIES para el `recurso` de la clase.
+    Las acciones '_propio' se limitan a objetos de las unidades del usuario
+    (propias o donde reside), comprobado contra unit_ids(user).
+    """
+    recurso = None
+
+    def _alcance(self, request):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return None
+        return ROLE_CAPABILITIES.get(user.rol, {}).get(self.recurso, {}).get(request.method)
+
+    def has_permission(self, request, view):
+        return self._alcance(request) is not None
+
+    def has_object_permission(self, request, view, obj):
+        alcance = self._alcance(request)
+        if alcance == ALCANCE_PROPIO:
+            return unit_id_of(obj) in unit_ids(request.user)
+        return alcance == ALCANCE_TOTAL
+
+
+class CanManageFinances(ResourcePermission):
     """
     ADMIN: acceso completo
-    RESIDENTE: solo ver sus propios pagos
+    RESIDENTE: solo ver los registros de sus unidades (propias o donde reside)
     Otros: sin acceso
     """
     message = "No tienes permiso para acceder a información financiera."
-    
-    def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        # ADMIN puede todo
-        if request.user.rol == 'ADMIN':
-            return True
-        
-        # RESIDENTE solo puede ver
-        if request.user.rol == 'RESIDENTE':
-            return request.method in SAFE_METHODS
-        
-        return False
-    
-    def has_object_permission(self, request, view, obj):
-        if request.user.rol == 'ADMIN':
-            return True
-        
-        # RESIDENTE solo puede ver sus propios registros
-        if hasattr(obj, 'unidad'):
-            return obj.unidad.propietario == request.user
-        if hasattr(obj, 'residente'):
-            return obj.residente == request.user
-        
-        return False
+    recurso = 'finanzas'
 
 
-class CanManageAreas(BasePermission):
+class CanManageAreas(RolePermission):
     """
     ADMIN: acceso completo (CRUD de áreas)
     MANTENIMIENTO: puede actualizar estado de mantenimiento
     RESIDENTE: puede hacer reservas
     """
     message = "No tienes permiso para gestionar áreas comunes."
-    
-    def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        # ADMIN puede todo
-        if request.user.rol == 'ADMIN':
-            return True
-        
-        # MANTENIMIENTO puede ver y actualizar
-        if request.user.rol == 'MANTENIMIENTO':
-            return request.method in SAFE_METHODS or request.method in ['PUT', 'PATCH']
-        
-        # RESIDENTE puede ver y crear reservas
-        if request.user.rol == 'RESIDENTE':
-            return request.method in SAFE_METHODS or request.method == 'POST'
-        
-        return False
+    metodos_por_rol = {
+        'ADMIN': TODOS,
+        'MANTENIMIENTO': LECTURA | {'PUT', 'PATCH'},  # Ver y actualizar
+        'RESIDENTE': LECTURA | {'POST'},  # Ver y crear reservas
+    }
 
 
-class CanCreateAnnouncements(BasePermission):
+class CanCreateAnnouncements(RolePermission):
     """
     ADMIN, SEGURIDAD: pueden crear avisos
     RESIDENTE: solo puede ver avisos
     """
     message = "No tienes permiso para crear avisos."
-    
+    metodos_por_rol = {'ADMIN': TODOS, 'SEGURIDAD': TODOS}
+    # Otros solo pueden ver
+    metodos_otros_roles = LECTURA
+
+
+class CanModifyNotification(BasePermission):
+    """
+    Las notificaciones de difusión (sin usuario) solo las crea, edita o elimina
+    ADMIN: el resto no puede enviar `audience` ni dejar `user` vacío.
+    Marcarlas como leídas sigue permitido para su audiencia.
+    """
+    message = "Solo un administrador puede modificar notificaciones de difusión."
+
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
+        accion = getattr(view, 'action', None)
+        if accion not in ('create', 'update', 'partial_update') or request.user.rol == 'ADMIN':
+            return True
+        datos = request.data if hasattr(request.data, 'get') else {}
+        if datos.get('audience'):
             return False
-        
-        # ADMIN y SEGURIDAD pueden todo
-        if request.user.rol in ['ADMIN', 'SEGURIDAD']:
+        if accion == 'partial_update' and 'user' not in datos:
             return True
-        
-        # Otros solo pueden ver
-        return request.method in SAFE_METHODS
+        return bool(datos.get('user'))
+
+    def has_object_permission(self, request, view, obj):
+        if getattr(view, 'action', None) not in ('update', 'partial_update', 'destroy'):
+            return True
+        return obj.user_id is not None or request.user.rol == 'ADMIN'
 
 
 # Diccionario de permisos por rol (para endpoint de consulta)
@@ -247,6 +251,7 @@ ROLE_PERMISSIONS = {
         'avisos': ['crear', 'leer', 'actualizar', 'eliminar'],
         'finanzas': ['crear', 'leer', 'actualizar', 'eliminar'],
         'areas': ['crear', 'leer', 'actualizar', 'eliminar'],
+        'reservas': ['crear', 'leer', 'actualizar', 'eliminar'],
         'seguridad': ['crear', 'leer', 'actualizar', 'eliminar'],
         'reportes': ['leer', 'exportar'],
     },
@@ -259,6 +264,7 @@ ROLE_PERMISSIONS = {
         'avisos': ['crear', 'leer'],
         'finanzas': [],
         'areas': ['leer'],
+        'reservas': ['leer'],
         'seguridad': ['crear', 'leer', 'actualizar', 'eliminar'],
         'reportes': ['leer'],
     },
@@ -271,6 +277,7 @@ ROLE_PERMISSIONS = {
         'avisos': ['leer'],
         'finanzas': [],
         'areas': ['leer', 'actualizar'],
+        'reservas': ['leer'],
         'seguridad': [],
         'reportes': [],
     },
@@ -283,6 +290,7 @@ ROLE_PERMISSIONS = {
         'avisos': ['leer'],
         'finanzas': ['leer_propio'],
         'areas': ['leer', 'reservar'],
+        'reservas': ['crear', 'leer_propio', 'actualizar_propio', 'eliminar_propio'],
         'seguridad': [],
         'reportes': [],
     },
@@ -292,3 +300,40 @@ ROLE_PERMISSIONS = {
 def get_permissions_for_role(rol):
     """Retorna los permisos para un rol específico."""
     return ROLE_PERMISSIONS.get(rol, {})
+
+
+# Matriz compilada al importar: rol -> recurso -> método HTTP -> alcance
+ALCANCE_TOTAL = 'TOTAL'
+ALCANCE_PROPIO = 'PROPIO'
+METODOS_POR_ACCION = {
+    'crear': ('POST',),
+    'leer': tuple(SAFE_METHODS),
+    'actualizar': ('PUT', 'PATCH'),
+    'eliminar': ('DELETE',),
+    'reservar': ('POST',),
+}
+
+
+def _compilar(permisos):
+    matriz = {}
+    for rol, recursos in permisos.items():
+        for recurso, acciones in recursos.items():
+            metodos = matriz.setdefault(rol, {}).setdefault(recurso, {})
+            for accion in acciones:
+                base, propio, _ = accion.partition('_propio')
+                alcance = ALCANCE_PROPIO if propio else ALCANCE_TOTAL
+                for metodo in METODOS_POR_ACCION.get(base, ()):
+                    if metodos.get(metodo) != ALCANCE_TOTAL:  # El alcance total prevalece
+                        metodos[metodo] = alcance
+    return matriz
+
+
+ROLE_CAPABILITIES = _compilar(ROLE_PERMISSIONS)
+
+
+def has_capability(user, recurso, accion):
+    """Alcance (ALCANCE_TOTAL / ALCANCE_PROPIO) del usuario para la acción, o None"""
+    metodos = METODOS_POR_ACCION.get(accion)
+    if not metodos or not user or not user.is_authenticated:
+        return None
+    return ROLE_CAPABILITIES.get(user.rol, {}).get(recurso, {}).get(metodos[0])
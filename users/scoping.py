@@ -0,0 +1,57 @@
+# users/scoping.py
+"""
+Alcance por unidad de los querysets, aplicado en SQL antes de ejecutarlos.
+
+Según la capacidad de lectura del rol sobre `unit_scope_resource`
+(ROLE_CAPABILITIES):
+- alcance total: el queryset sin filtrar;
+- alcance propio: `WHERE <unit_scope_field> IN (<unidades del usuario>)`,
+  con las unidades precalculadas de users.unit_access (sin OR ni DISTINCT
+  sobre Residente / propietario);
+- sin capacidad: queryset vacío.
+
+Un objeto fuera del alcance no existe para la vista (404 en el detalle).
+"""
+from django.db.models import Q
+
+from .permissions import ALCANCE_TOTAL, has_capability
+from .unit_access import unit_ids
+
+
+class UnitScopedQuerysetMixin:
+    """
+    Atributos:
+    - unit_scope_resource: recurso de ROLE_PERMISSIONS ('finanzas', 'unidades', ...)
+    - unit_scope_field: ruta al id de la unidad ('unit_id', 'fee__unit_id', 'id'), o None
+      si el modelo no tiene unidad (alcance propio = solo unit_scope_user_field)
+    - unit_scope_user_field: opcional, además los objetos de los que el usuario es dueño ('owner_id')
+    Los ViewSets con get_queryset propio deben terminar con self.scope_to_units(queryset).
+    """
+    unit_scope_resource = None
+    unit_scope_field = 'unit_id'
+    unit_scope_user_field = None
+
+    def own_units(self, queryset, user=None):
+        """Solo los objetos de las unidades del usuario (propias o donde reside), sea cual sea su rol"""
+        user = user or self.request.user
+        if self.unit_scope_field is None:
+            return queryset.filter(**{self.unit_scope_user_field: user.pk})
+        ids = unit_ids(user)
+        condicion = Q(**{f'{self.unit_scope_field}__in': ids})
+        if self.unit_scope_user_field:
+            condicion |= Q(**{self.unit_scope_user_field: user.pk})
+        elif not ids:
+            return queryset.none()
+        return queryset.filter(condicion)
+
+    def scope_to_units(self, queryset):
+        user = self.request.user
+        alcance = has_capability(user, self.unit_scope_resource, 'leer')
+        if alcance == ALCANCE_TOTAL:
+            return queryset
+        if alcance is None:
+            return queryset.none()
+        return self.own_units(queryset, user)
+
+    def get_queryset(self):
+        return self.scope_to_units(super().get_queryset())
@@ -1,17 +1,31 @@
+import json
+
+import numpy as np
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from .models import Usuario, UnidadResidencial, Residente
+from mediastore.fields import ImageVariantsField
+
+
+def validar_email_unico(serializer, value):
+    """El email identifica al usuario en el login (índice único usuario_email_unico, sin distinguir mayúsculas)"""
+    instancia = getattr(serializer, 'instance', None)
+    if value and Usuario.con_email(value).exclude(pk=getattr(instancia, 'pk', None)).exists():
+        raise serializers.ValidationError("Ya existe un usuario con este email")
+    return value
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
     """Serializer completo para Usuario"""
     unidades_propias = serializers.StringRelatedField(many=True, read_only=True)
+    foto_variants = ImageVariantsField(source='foto')
     
     class Meta:
         model = Usuario
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
-            'rol', 'telefono', 'foto', 'email_verificado',
+            'rol', 'telefono', 'foto', 'foto_variants', 'email_verificado',
             'unidades_propias', 'is_active',
             'fecha_creacion', 'fecha_actualizacion'
         ]
@@ -30,6 +44,9 @@ class UsuarioCrearSerializer(serializers.ModelSerializer):
             'first_name', 'last_name', 'rol', 'telefono', 'foto'
         ]
     
+    def validate_email(self, value):
+        return validar_email_unico(self, value)
+    
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError({"password": "Los passwords no coinciden"})
@@ -66,6 +83,9 @@ class UsuarioActualizarSerializer(serializers.ModelSerializer):
             'email', 'first_name', 'last_name',
             'telefono', 'foto', 'is_active'
         ]
+    
+    def validate_email(self, value):
+        return validar_email_unico(self, value)
 
 
 class UsuarioSimpleSerializer(serializers.ModelSerializer):
@@ -80,6 +100,51 @@ class UsuarioSimpleSerializer(serializers.ModelSerializer):
         return obj.get_full_name() or obj.username
 
 
+class EncodingFacialField(serializers.Field):
+    """Vector de FACE_ENCODING_DIM floats finitos (lista o texto JSON); se guarda como texto JSON"""
+    default_error_messages = {
+        'invalid': 'El encoding facial debe ser una lista de {dimension} números.',
+    }
+
+    def to_internal_value(self, data):
+        dimension = getattr(settings, 'FACE_ENCODING_DIM', 128)
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail('invalid', dimension=dimension)
+        if not isinstance(data, (list, tuple)) or any(isinstance(valor, (bool, str)) for valor in data):
+            self.fail('invalid', dimension=dimension)
+        try:
+            vector = np.asarray(data, dtype=np.float64)
+        except (TypeError, ValueError):
+            self.fail('invalid', dimension=dimension)
+        if vector.shape != (dimension,) or not np.all(np.isfinite(vector)):
+            self.fail('invalid', dimension=dimension)
+        return json.dumps(vector.tolist())
+
+    def to_representation(self, value):
+        return value
+
+
+class SubirFotoSerializer(serializers.Serializer):
+    """Foto y/o encoding facial de un usuario"""
+    foto = serializers.ImageField(required=False)
+    encoding_facial = EncodingFacialField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("No se proporcionó ninguna foto")
+        return attrs
+
+
+class IdentificacionFacialSerializer(serializers.Serializer):
+    """Serializer para identificar un rostro contra el índice facial"""
+    encoding = serializers.ListField(child=serializers.FloatField(), min_length=1)
+    tolerancia = serializers.FloatField(required=False, min_value=0)
+    max_resultados = serializers.IntegerField(required=False, default=1, min_value=1, max_value=10)
+
+
 # ===================== RESIDENTE SERIALIZERS =====================
 
 class ResidenteSerializer(serializers.ModelSerializer):
@@ -161,7 +226,7 @@ class UnidadResidencialSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion']
     
     def get_cantidad_residentes(self, obj):
-        return obj.residentes.filter(activo=True).count()
+        return obj.cantidad_residentes_activos()
 
 
 class UnidadResidencialCrearSerializer(serializers.ModelSerializer):
@@ -0,0 +1,69 @@
+# users/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .models import Usuario, UnidadResidencial, Residente
+from .face_index import get_face_index
+from . import blacklist_filter, unit_access
+from .token_revocation import revoke
+
+
+@receiver(post_save, sender=Usuario)
+def sincronizar_encoding_facial(sender, instance, **kwargs):
+    """Mantiene el índice facial al día cuando cambia el encoding o el estado del usuario"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'encoding_facial', 'is_active'} & set(update_fields):
+        return
+    usuario_id, encoding, activo = instance.pk, instance.encoding_facial, instance.is_active
+    transaction.on_commit(lambda: get_face_index().actualizar(usuario_id, encoding, activo=activo))
+
+
+@receiver(post_delete, sender=Usuario)
+def quitar_encoding_facial(sender, instance, **kwargs):
+    usuario_id = instance.pk
+    transaction.on_commit(lambda: get_face_index().eliminar(usuario_id))
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def revocar_claims(sender, instance, created=False, update_fields=None, **kwargs):
+    """Los tokens emitidos llevan el rol: al cambiar rol o estado vuelven a validarse contra la BD"""
+    if created or (update_fields is not None and not {'rol', 'is_active'} & set(update_fields)):
+        return
+    revoke([instance.pk])
+
+
+# ---------- Unidades en caché para permisos (unit_access) ----------
+
+@receiver(pre_save, sender=UnidadResidencial)
+@receiver(pre_save, sender=Residente)
+def capturar_usuario_previo(sender, instance, update_fields=None, **kwargs):
+    """Propietario / usuario guardado en la BD, para invalidar también al anterior"""
+    campo = 'propietario_id' if sender is UnidadResidencial else 'usuario_id'
+    instance._usuario_previo = None
+    if instance.pk and (update_fields is None or campo[:-3] in update_fields):
+        instance._usuario_previo = sender.objects.filter(pk=instance.pk).values_list(campo, flat=True).first()
+
+
+@receiver(post_save, sender=UnidadResidencial)
+@receiver(post_delete, sender=UnidadResidencial)
+def invalidar_unidades_propietario(sender, instance, **kwargs):
+    unit_access.forget([instance.propietario_id, getattr(instance, '_usuario_previo', None)])
+
+
+@receiver(post_save, sender=Residente)
+@receiver(post_delete, sender=Residente)
+def invalidar_unidades_residente(sender, instance, **kwargs):
+    unit_access.forget([instance.usuario_id, getattr(instance, '_usuario_previo', None)])
+
+
+# ---------- Lista negra de refresh tokens (blacklist_filter) ----------
+
+@receiver(post_save, sender=BlacklistedToken)
+def anunciar_token_en_lista_negra(sender, instance, created, **kwargs):
+    """Avisa a los demás procesos (después del commit) para que agreguen el jti a su filtro"""
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: blacklist_filter.announce(jti))
@@ -1,3 +1,184 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .authentication import tokens_for, user_from_claims
+from .blacklist_filter import BlacklistIndex
+from .credentials import authenticate_credentials
+from .face_index import FaceIndex
+from .models import Residente, UnidadResidencial, Usuario
+from .serializers import UsuarioActualizarSerializer
+
+
+class BlacklistIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(username='r', email='r@x.com', password='p')
+
+    def _token_en_lista_negra(self):
+        token = tokens_for(self.usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+        return token['jti']
+
+    def test_otro_proceso_ve_el_token_anunciado(self):
+        otro = BlacklistIndex()
+        self.assertFalse(otro.contains('sin-uso'))  # Filtro cargado antes del blacklist
+        jti = self._token_en_lista_negra()
+        with self.assertNumQueries(0):
+            self.assertFalse(otro.contains('otro-jti'))
+        self.assertTrue(otro.contains(jti))
+
+    def test_entrada_faltante_consulta_la_bd(self):
+        otro = BlacklistIndex()
+        otro.contains('sin-uso')
+        jti = self._token_en_lista_negra()
+        cache.delete_many([key for key in [f'token_blacklist:entry:{cache.get("token_blacklist:gen")}']])
+        self.assertTrue(otro.contains(jti))
+        with self.assertNumQueries(1):
+            self.assertFalse(otro.contains('otro-jti'))
+
+    @override_settings(ALLOW_PROCESS_LOCAL_CACHE=False)
+    def test_sin_cache_compartida_siempre_consulta_la_bd(self):
+        otro = BlacklistIndex()
+        token = tokens_for(self.usuario)
+        token.blacklist()  # Sin ejecutar on_commit: nunca se anuncia
+        self.assertTrue(otro.contains(token['jti']))
+        with self.assertNumQueries(1):
+            self.assertFalse(otro.contains('otro-jti'))
+
+
+class ClaimsAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(username='c', email='c@x.com', password='p')
+
+    def test_claims_con_cache_compartida(self):
+        token = tokens_for(self.usuario).access_token
+        with self.assertNumQueries(0):
+            self.assertEqual(user_from_claims(token).pk, self.usuario.pk)
+
+    @override_settings(ALLOW_PROCESS_LOCAL_CACHE=False)
+    def test_sin_cache_compartida_no_confia_en_los_claims(self):
+        self.assertIsNone(user_from_claims(tokens_for(self.usuario).access_token))
+
+
+class FaceIndexTests(TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def test_otro_proceso_ve_la_nueva_generacion(self):
+        indice, otro = FaceIndex(self.directorio), FaceIndex(self.directorio)
+        self.assertEqual(len(otro), 0)
+        indice.actualizar(1, [0.0, 1.0])
+        self.assertEqual(otro.buscar([0.0, 1.0]), [(1, 0.0)])
+
+    def test_escritura_parte_de_la_ultima_generacion(self):
+        indice, otro = FaceIndex(self.directorio), FaceIndex(self.directorio)
+        self.assertEqual(len(indice), len(otro))
+        indice.actualizar(1, [0.0, 1.0])
+        otro.actualizar(2, [1.0, 0.0])  # Sin perder el encoding que escribió el otro
+        self.assertEqual(len(FaceIndex(self.directorio)), 2)
+
+    def test_dimension_distinta_se_registra(self):
+        indice = FaceIndex(self.directorio)
+        indice.actualizar(1, [0.0, 1.0])
+        with self.assertLogs('users.face_index', level='WARNING'):
+            self.assertFalse(indice.actualizar(2, [0.0, 1.0, 2.0]))
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = Usuario.objects.create_user(username='adm', email='adm@x.com', password='p', rol='ADMIN')
+        for numero in range(3):
+            propietario = Usuario.objects.create_user(username=f'p{numero}', email=f'p{numero}@x.com', password='p')
+            unidad = UnidadResidencial.objects.create(numero_unidad=f'U{numero}', propietario=propietario)
+            for tipo in ('PROPIETARIO_RESIDENTE', 'FAMILIAR'):
+                Residente.objects.create(
+                    usuario=propietario, unidad=unidad, tipo_residente=tipo, fecha_ingreso=timezone.now().date()
+                )
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for(self.admin).access_token}')
+
+    def test_unidades_dentro_del_presupuesto(self):
+        self.assertEqual(self.cliente.get('/api/users/unidades/').status_code, 200)
+        unidad = UnidadResidencial.objects.first()
+        self.assertEqual(self.cliente.get(f'/api/users/unidades/{unidad.pk}/').status_code, 200)
+
+    def test_usuarios_dentro_del_presupuesto(self):
+        for url in ('/api/users/usuarios/', '/api/users/usuarios/todos/', '/api/users/usuarios/por_rol/?rol=RESIDENTE'):
+            with self.subTest(url=url):
+                self.assertEqual(self.cliente.get(url).status_code, 200)
+
+
+class EmailCaseTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='ana', email='Ana@X.com', password='p')
+
+    def test_login_sin_distinguir_mayusculas(self):
+        self.assertEqual(authenticate_credentials('ana@x.COM', 'p'), self.usuario)
+        self.assertIsNone(authenticate_credentials('ana@x.com', 'otra'))
+
+    def test_email_unico_sin_distinguir_mayusculas(self):
+        otro = Usuario.objects.create_user(username='otro', email='otro@x.com', password='p')
+        serializer = UsuarioActualizarSerializer(otro, data={'email': 'ANA@x.com'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+        with self.assertRaises(IntegrityError):
+            Usuario.objects.create_user(username='ana2', email='ana@x.com', password='p')
+
+    def test_emails_vacios_no_chocan(self):
+        Usuario.objects.create_user(username='s1', email='', password='p')
+        Usuario.objects.create_user(username='s2', email='', password='p')
+        self.assertIsNone(authenticate_credentials('', 'p'))
+
+
+class SubirFotoTests(TestCase):
+
+    def setUp(self):
+        self.residente = Usuario.objects.create_user(username='res', email='res@x.com', password='p')
+        self.vecino = Usuario.objects.create_user(username='vec', email='vec@x.com', password='p')
+        self.guardia = Usuario.objects.create_user(username='seg', email='seg@x.com', password='p', rol='SEGURIDAD')
+        self.admin = Usuario.objects.create_user(username='adm', email='adm@x.com', password='p', rol='ADMIN')
+
+    def _subir(self, autor, usuario, encoding):
+        cliente = APIClient()
+        cliente.force_authenticate(autor)
+        return cliente.post(f'/api/users/usuarios/{usuario.pk}/subir_foto/', {'encoding_facial': encoding}, format='json')
+
+    def test_residente_no_carga_encodings(self):
+        encoding = [0.1] * 128
+        self.assertEqual(self._subir(self.residente, self.vecino, encoding).status_code, 403)
+        self.assertEqual(self._subir(self.residente, self.residente, encoding).status_code, 403)
+        self.vecino.refresh_from_db()
+        self.residente.refresh_from_db()
+        self.assertIsNone(self.vecino.encoding_facial)
+        self.assertIsNone(self.residente.encoding_facial)
+
+    def test_seguridad_solo_el_propio(self):
+        self.assertEqual(self._subir(self.guardia, self.vecino, [0.1] * 128).status_code, 403)
+        self.assertEqual(self._subir(self.guardia, self.guardia, [0.1] * 128).status_code, 200)
+
+    def test_admin_carga_encoding_valido(self):
+        self.assertEqual(self._subir(self.admin, self.vecino, '[' + ', '.join(['0.5'] * 128) + ']').status_code, 200)
+        self.vecino.refresh_from_db()
+        self.assertEqual(len(json.loads(self.vecino.encoding_facial)), 128)
+
+    def test_forma_invalida(self):
+        for encoding in ([0.1] * 3, [[0.1] * 128], ['x'] * 128, [True] * 128, 'no-json', '[' + ', '.join(['NaN'] * 128) + ']'):
+            with self.subTest(encoding=str(encoding)[:20]):
+                self.assertEqual(self._subir(self.admin, self.vecino, encoding).status_code, 400)
@@ -0,0 +1,40 @@
+# users/token_revocation.py
+"""
+Lista de revocación de los claims de los access tokens (ver users.authentication).
+
+`revoke(user_ids)` marca en la caché compartida el momento en que cambiaron
+el rol, el estado o las unidades de cada usuario. Los tokens emitidos antes
+de esa marca ya no se creen: el request vuelve a cargar el usuario de la BD.
+La marca dura lo mismo que un access token (después ya no queda ninguno
+anterior válido). Solo se confía en los claims con una caché compartida
+(ver users.authentication.user_from_claims).
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _clave(user_id):
+    return f'auth:revoked:{user_id}'
+
+
+def revoke(user_ids):
+    """Invalida los claims de los tokens emitidos hasta ahora (después del commit)"""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+
+    def marcar():
+        ahora = time.time()
+        cache.set_many(
+            {_clave(user_id): ahora for user_id in user_ids},
+            int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 60,
+        )
+    transaction.on_commit(marcar)
+
+
+def revoked_at(user_id):
+    """Timestamp de la última revocación del usuario, o None"""
+    return cache.get(_clave(user_id))
@@ -0,0 +1,76 @@
+# users/unit_access.py
+"""
+Unidades de cada usuario para los permisos a nivel de objeto.
+
+`unit_ids(user)` (propias o donde reside activamente) y `owned_unit_ids(user)`
+se resuelven con una consulta y se guardan en la caché compartida
+(PERMISSION_UNITS_CACHE_TTL) y en el propio objeto usuario durante el
+request; los permisos comparan `obj.unidad_id in unit_ids(user)` sin
+recorrer claves foráneas.
+
+Las señales de UnidadResidencial y Residente invalidan la entrada (y los
+claims de unidades de los tokens, ver users.authentication); las
+actualizaciones masivas de residentes deben llamar a `forget_unit`.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import UnidadResidencial, Residente
+from .token_revocation import revoke
+
+
+def _clave(user_id):
+    return f'perm:units:{user_id}'
+
+
+def _cargar(user):
+    """(propias, todas) como frozensets de ids"""
+    clave = _clave(user.pk)
+    valor = cache.get(clave)
+    if valor is None:
+        filas = (
+            UnidadResidencial.objects
+            .filter(Q(propietario_id=user.pk) | Q(residentes__usuario_id=user.pk, residentes__activo=True))
+            .values_list('id', 'propietario_id').distinct().order_by()
+        )
+        filas = list(filas)
+        valor = (
+            tuple(unidad for unidad, propietario in filas if propietario == user.pk),
+            tuple(unidad for unidad, _ in filas),
+        )
+        cache.set(clave, valor, getattr(settings, 'PERMISSION_UNITS_CACHE_TTL', 300))
+    return frozenset(valor[0]), frozenset(valor[1])
+
+
+def _memo(user):
+    memo = getattr(user, '_unit_access', None)
+    if memo is None:
+        memo = user._unit_access = _cargar(user)
+    return memo
+
+
+def owned_unit_ids(user):
+    """Ids de las unidades de las que el usuario es propietario"""
+    return _memo(user)[0]
+
+
+def unit_ids(user):
+    """Ids de las unidades propias o donde el usuario reside activamente"""
+    return _memo(user)[1]
+
+
+def forget(user_ids):
+    """Invalida las unidades en caché de los usuarios y en sus tokens (después del commit)"""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if user_ids:
+        claves = [_clave(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(claves))
+        revoke(user_ids)
+
+
+def forget_unit(unidad):
+    """Invalida al propietario y a todos los residentes (activos o no) de la unidad"""
+    residentes = Residente.objects.filter(unidad=unidad).values_list('usuario_id', flat=True)
+    forget([unidad.propietario_id, *residentes])
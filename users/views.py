@@ -1,25 +1,32 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.db.models import Q
 from django.utils import timezone
 from .models import Usuario, UnidadResidencial, Residente
 from .serializers import (
     UsuarioSerializer, UsuarioCrearSerializer, UsuarioActualizarSerializer,
     UnidadResidencialSerializer, UnidadResidencialCrearSerializer, UnidadResidencialActualizarSerializer,
-    ResidenteSerializer, ResidenteCrearSerializer, ResidenteActualizarSerializer
+    ResidenteSerializer, ResidenteCrearSerializer, ResidenteActualizarSerializer,
+    UsuarioSimpleSerializer, IdentificacionFacialSerializer, SubirFotoSerializer
 )
 from .permissions import (
-    IsAdmin, IsAdminOrReadOnly, IsSelfOrAdmin, IsOwnerOrAdmin,
+    IsAdmin, IsAdminOrReadOnly, IsAdminOrSecurity, IsSelfOrAdmin, IsOwnerOrAdmin,
     ROLE_PERMISSIONS, get_permissions_for_role
 )
+from .face_index import get_face_index
+from . import last_login, unit_access
+from .authentication import ClaimsRefreshToken, tokens_for
+from .credentials import HashingBusy, authenticate_credentials
+from .scoping import UnitScopedQuerysetMixin
+from smartcondominioia.metrics import InstrumentedViewMixin
+from smartcondominioia.filters import TypedQueryFilter
+from smartcondominioia.pagination import BoundedListMixin
 
 
-class LoginView(APIView):
+class LoginView(InstrumentedViewMixin, APIView):
     """
     Vista de login que retorna tokens JWT
     POST /api/users/login/
@@ -37,17 +44,16 @@ class LoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Buscar usuario por email
+        # Buscar usuario por email y verificar contraseña (pool de hashing acotado, ver users.credentials)
         try:
-            user = Usuario.objects.get(email=email)
-        except Usuario.DoesNotExist:
+            user = authenticate_credentials(email, password)
+        except HashingBusy:
             return Response(
-                {"error": "Credenciales inválidas"},
-                status=status.HTTP_401_UNAUTHORIZED
+                {"error": "Demasiados inicios de sesión simultáneos, intente nuevamente"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"}
             )
-        
-        # Verificar contraseña
-        if not user.check_password(password):
+        if user is None:
             return Response(
                 {"error": "Credenciales inválidas"},
                 status=status.HTTP_401_UNAUTHORIZED
@@ -59,8 +65,9 @@ class LoginView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Generar tokens JWT
-        refresh = RefreshToken.for_user(user)
+        # Generar tokens JWT (con rol y unidades como claims, ver users.authentication)
+        refresh = tokens_for(user)
+        last_login.record(user.pk)
         
         return Response({
             "refresh": str(refresh),
@@ -76,7 +83,7 @@ class LoginView(APIView):
         }, status=status.HTTP_200_OK)
 
 
-class LogoutView(APIView):
+class LogoutView(InstrumentedViewMixin, APIView):
     """
     Vista de logout que invalida el refresh token
     POST /api/users/logout/
@@ -93,7 +100,7 @@ class LogoutView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
             
             return Response(
@@ -107,22 +114,33 @@ class LogoutView(APIView):
             )
 
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(InstrumentedViewMixin, BoundedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión completa de usuarios
     Endpoints:
-    - GET /usuarios/ - Listar todos los usuarios
+    - GET /usuarios/ - Listar todos los usuarios (filtros: rol, is_active)
     - POST /usuarios/ - Crear nuevo usuario
     - GET /usuarios/{id}/ - Obtener detalle de usuario
     - PUT /usuarios/{id}/ - Actualizar usuario
     - DELETE /usuarios/{id}/ - Eliminar usuario
     - GET /usuarios/me/ - Obtener usuario actual
-    - GET /usuarios/por_rol/ - Filtrar usuarios por rol
+    - GET /usuarios/por_rol/?rol=ADMIN - Filtrar usuarios por rol (paginado)
+    - GET /usuarios/todos/ - Todos los usuarios (paginado; ?stream=true para NDJSON completo)
+    - POST /usuarios/{id}/subir_foto/ - Subir foto y/o encoding facial
+    - POST /usuarios/identificar_rostro/ - Identificar un encoding facial
     """
     queryset = Usuario.objects.all()
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering_fields = ['username', 'fecha_creacion']
+    ordering = ['id']
+    query_filters = {
+        'rol': ('rol', serializers.ChoiceField(choices=Usuario.ROLES)),
+        'is_active': ('is_active', serializers.BooleanField()),
+    }
+    query_budgets = {'list': 5, 'retrieve': 4, 'me': 3, 'por_rol': 5, 'todos': 5}
+    # Serializa el usuario completo: se carga de la BD y no desde los claims del token
+    db_user_actions = ('me',)
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -134,17 +152,19 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action == 'create':
             return [IsAdmin()]
-        elif self.action in ['update', 'partial_update', 'destroy']:
+        elif self.action in ['update', 'partial_update', 'destroy', 'subir_foto']:
             return [IsSelfOrAdmin()]
         elif self.action in ['me', 'roles', 'permisos', 'mis_permisos']:
             return [IsAuthenticated()]
-        elif self.action in ['list', 'por_rol', 'cambiar_rol']:
+        elif self.action in ['list', 'por_rol', 'todos', 'cambiar_rol']:
             return [IsAdmin()]
+        elif self.action == 'identificar_rostro':
+            return [IsAdminOrSecurity()]
         return [IsAuthenticated()]
     
     def get_queryset(self):
         # Los permisos ya controlan el acceso, no necesitamos filtrar aquí
-        return Usuario.objects.all()
+        return Usuario.objects.prefetch_related('unidades_propias')
     
     @action(detail=False, methods=['get'])
     def me(self, request):
@@ -154,12 +174,9 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def por_rol(self, request):
-        """Filtrar usuarios por rol (solo ADMIN)"""
-        rol = request.query_params.get('rol', None)
-        if rol:
-            usuarios = Usuario.objects.filter(rol=rol)
-            serializer = UsuarioSerializer(usuarios, many=True)
-            return Response(serializer.data)
+        """Filtrar usuarios por rol (solo ADMIN); el filtro lo aplica query_filters"""
+        if request.query_params.get('rol'):
+            return self.bounded_list(self.get_queryset(), UsuarioSerializer)
         return Response(
             {"error": "El parámetro 'rol' es requerido"},
             status=status.HTTP_400_BAD_REQUEST
@@ -176,10 +193,8 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def todos(self, request):
-        """Listar TODOS los usuarios sin paginación (solo ADMIN)"""
-        usuarios = Usuario.objects.all()
-        serializer = UsuarioSerializer(usuarios, many=True)
-        return Response(serializer.data)
+        """Listar todos los usuarios (solo ADMIN): paginado, o completo en streaming con ?stream=true"""
+        return self.bounded_list(self.get_queryset(), UsuarioSerializer)
     
     @action(detail=False, methods=['get'])
     def permisos(self, request):
@@ -229,26 +244,60 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def subir_foto(self, request, pk=None):
-        """Endpoint para subir foto del usuario (para reconocimiento facial)"""
+        """
+        Endpoint para subir foto del usuario (para reconocimiento facial)
+        Acepta opcionalmente 'encoding_facial' calculado por el servicio de IA
+        (solo ADMIN/SEGURIDAD); el índice facial se actualiza automáticamente al guardar.
+        """
         usuario = self.get_object()
-        if 'foto' in request.FILES:
-            usuario.foto = request.FILES['foto']
-            usuario.save()
-            return Response(
-                {"mensaje": "Foto actualizada correctamente"},
-                status=status.HTTP_200_OK
-            )
+        serializer = SubirFotoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        if 'encoding_facial' in datos and not IsAdminOrSecurity().has_permission(request, self):
+            self.permission_denied(request, message="Solo administradores o seguridad pueden cargar encodings faciales.")
+        
+        for campo, valor in datos.items():
+            setattr(usuario, campo, valor)
+        usuario.save()
         return Response(
-            {"error": "No se proporcionó ninguna foto"},
-            status=status.HTTP_400_BAD_REQUEST
+            {"mensaje": "Foto actualizada correctamente"},
+            status=status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['post'])
+    def identificar_rostro(self, request):
+        """
+        Identificar a quién pertenece un encoding facial (ADMIN/SEGURIDAD)
+        Body: {"encoding": [0.12, -0.03, ...], "tolerancia": 0.6, "max_resultados": 1}
+        """
+        serializer = IdentificacionFacialSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        
+        coincidencias = get_face_index().buscar(
+            datos['encoding'],
+            tolerancia=datos.get('tolerancia'),
+            k=datos['max_resultados']
         )
+        usuarios = Usuario.objects.in_bulk([usuario_id for usuario_id, _ in coincidencias])
+        resultados = [
+            {
+                "usuario": UsuarioSimpleSerializer(usuarios[usuario_id]).data,
+                "distancia": round(distancia, 4)
+            }
+            for usuario_id, distancia in coincidencias if usuario_id in usuarios
+        ]
+        return Response({
+            "identificado": bool(resultados),
+            "coincidencias": resultados
+        })
 
 
-class UnidadResidencialViewSet(viewsets.ModelViewSet):
+class UnidadResidencialViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de unidades residenciales
     Endpoints:
-    - GET /unidades/ - Listar todas las unidades
+    - GET /unidades/ - Listar unidades (RESIDENTE: solo las propias o donde reside)
     - POST /unidades/ - Crear nueva unidad
     - GET /unidades/{id}/ - Obtener detalle de unidad
     - PUT /unidades/{id}/ - Actualizar unidad
@@ -262,6 +311,9 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['numero_unidad', 'propietario__username', 'propietario__email']
     ordering_fields = ['numero_unidad', 'fecha_creacion', 'estado_ocupacion']
+    unit_scope_resource = 'unidades'
+    unit_scope_field = 'id'
+    query_budgets = {'list': 5, 'retrieve': 4}
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -270,11 +322,17 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
             return UnidadResidencialActualizarSerializer
         return UnidadResidencialSerializer
     
+    def get_queryset(self):
+        queryset = UnidadResidencial.objects.all()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.con_residentes()
+        return self.scope_to_units(queryset)
+    
     @action(detail=True, methods=['get'])
     def residentes(self, request, pk=None):
         """Obtener residentes activos de la unidad"""
         unidad = self.get_object()
-        residentes = unidad.residentes.filter(activo=True)
+        residentes = unidad.residentes.filter(activo=True).select_related('usuario', 'unidad')
         serializer = ResidenteSerializer(residentes, many=True)
         return Response(serializer.data)
     
@@ -355,6 +413,7 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
             activo=False,
             fecha_salida=timezone.now().date()
         )
+        unit_access.forget_unit(unidad)  # update() no emite señales
         
         # Crear registro del inquilino
         residente = Residente.objects.create(
@@ -392,6 +451,7 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
         residentes = Residente.objects.filter(unidad=unidad, activo=True)
         cantidad = residentes.count()
         residentes.update(activo=False, fecha_salida=fecha_salida)
+        unit_access.forget_unit(unidad)  # update() no emite señales
         
         # Cambiar estado a vacante
         unidad.estado_ocupacion = 'VACANTE'
@@ -405,17 +465,8 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def mis_unidades(self, request):
         """Obtener las unidades del usuario actual (como propietario o residente)"""
-        # Unidades que posee
-        propias = UnidadResidencial.objects.filter(propietario=request.user)
-        
-        # Unidades donde es residente activo
-        ids_residencia = Residente.objects.filter(
-            usuario=request.user, activo=True
-        ).values_list('unidad_id', flat=True)
-        residiendo = UnidadResidencial.objects.filter(id__in=ids_residencia)
-        
-        # Combinar sin duplicados
-        unidades = (propias | residiendo).distinct()
+        # Ids precalculados en users.unit_access (sin OR sobre Residente)
+        unidades = self.own_units(UnidadResidencial.objects.con_residentes())
         serializer = UnidadResidencialSerializer(unidades, many=True)
         return Response(serializer.data)
     
@@ -424,7 +475,7 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
         """Filtrar unidades por estado de ocupación"""
         estado = request.query_params.get('estado')
         if estado:
-            unidades = UnidadResidencial.objects.filter(estado_ocupacion=estado)
+            unidades = UnidadResidencial.objects.filter(estado_ocupacion=estado).con_residentes()
             serializer = UnidadResidencialSerializer(unidades, many=True)
             return Response(serializer.data)
         return Response(
@@ -433,24 +484,32 @@ class UnidadResidencialViewSet(viewsets.ModelViewSet):
         )
 
 
-class ResidenteViewSet(viewsets.ModelViewSet):
+class ResidenteViewSet(InstrumentedViewMixin, UnitScopedQuerysetMixin, BoundedListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de residentes
     Endpoints:
-    - GET /residentes/ - Listar todos los residentes
+    - GET /residentes/ - Listar residentes, RESIDENTE solo los de sus unidades (filtros: activo, tipo, unidad, usuario)
     - POST /residentes/ - Registrar nuevo residente
     - GET /residentes/{id}/ - Obtener detalle de residente
     - PUT /residentes/{id}/ - Actualizar residente
     - DELETE /residentes/{id}/ - Desactivar residente
     - POST /residentes/{id}/terminar_residencia/ - Terminar residencia
-    - GET /residentes/activos/ - Solo residentes activos
-    - GET /residentes/por_tipo/ - Filtrar por tipo
+    - GET /residentes/activos/ - Solo residentes activos (paginado; ?stream=true para NDJSON completo)
+    - GET /residentes/por_tipo/?tipo=INQUILINO - Filtrar por tipo (paginado)
     """
     queryset = Residente.objects.all()
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [TypedQueryFilter, filters.SearchFilter, filters.OrderingFilter]
+    query_filters = {
+        'activo': ('activo', serializers.BooleanField()),
+        'tipo': ('tipo_residente', serializers.ChoiceField(choices=Residente.TIPO_RESIDENTE)),
+        'unidad': ('unidad_id', serializers.IntegerField()),
+        'usuario': ('usuario_id', serializers.IntegerField()),
+    }
     search_fields = ['usuario__username', 'usuario__email', 'usuario__first_name', 'unidad__numero_unidad']
     ordering_fields = ['fecha_creacion', 'fecha_ingreso', 'es_principal']
+    unit_scope_resource = 'residentes'
+    unit_scope_field = 'unidad_id'
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -462,18 +521,17 @@ class ResidenteViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def activos(self, request):
         """Obtener solo residentes activos"""
-        residentes = Residente.objects.filter(activo=True)
-        serializer = ResidenteSerializer(residentes, many=True)
-        return Response(serializer.data)
+        return self.bounded_list(
+            self.get_queryset().filter(activo=True).select_related('usuario', 'unidad'), ResidenteSerializer
+        )
     
     @action(detail=False, methods=['get'])
     def por_tipo(self, request):
         """Filtrar residentes por tipo"""
-        tipo = request.query_params.get('tipo')
-        if tipo:
-            residentes = Residente.objects.filter(tipo_residente=tipo, activo=True)
-            serializer = ResidenteSerializer(residentes, many=True)
-            return Response(serializer.data)
+        if request.query_params.get('tipo'):
+            return self.bounded_list(
+                self.get_queryset().filter(activo=True).select_related('usuario', 'unidad'), ResidenteSerializer
+            )
         return Response(
             {"error": "El parámetro 'tipo' es requerido (PROPIETARIO_RESIDENTE, INQUILINO, FAMILIAR, AUTORIZADO)"},
             status=status.HTTP_400_BAD_REQUEST